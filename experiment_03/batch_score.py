@@ -0,0 +1,9 @@
+# ======================================
+# 离线批量打分入口（CSV / Parquet）
+# 示例：python batch_score.py data/raw/housing.csv reports/predictions.parquet --workers 4
+# ======================================
+
+from src.models.predict_model import main
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,12 @@
 # ======================================
 
 from src.app_fast import app
+from src.config.settings import settings
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=7777)
\ No newline at end of file
+    if settings.SERVER_WORKERS > 1:
+        # 多进程需要以导入字符串启动；配合 SHARED_MODEL_ENABLED，各 worker 映射同一份模型文件
+        uvicorn.run("src.app_fast:app", host="0.0.0.0", port=7777, workers=settings.SERVER_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=7777)
@@ -1,59 +1,357 @@
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.exceptions import RequestValidationError
-from pydantic import BaseModel
-import mlflow
-from mlflow import MlflowClient
+from fastapi.responses import Response
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from contextlib import asynccontextmanager
 
 # 导入工具类
-from .utils.mlflow_artifact_loader import MLflowArtifactLoader
+from .utils.mlflow_artifact_loader import MLflowArtifactLoader, SharedArtifactPool, artifact_cache
 from .utils.middleware import middleware_manager
-from .utils.security import jwt_manager
-from .utils.exceptions import validation_exception_handler, general_exception_handler
+from .utils.security import jwt_manager, token_cache
+from .utils.exceptions import (
+    validation_exception_handler, general_exception_handler,
+    ServiceOverloadedError, overload_exception_handler
+)
+from .config.settings import settings
+from .features.transformer import FeatureTransformer, RAW_FEATURES, CATEGORICAL_FEATURE
+from .models.compiled_forest import try_compile, load_shared, share, shared_lock
+from .utils.micro_batcher import MicroBatcher
+from .utils.inference_executor import AdmissionSlot, InferenceExecutor
+from .utils.prediction_cache import PredictionCache
+from .utils.model_watcher import ModelWatcher
+from .utils.model_router import ModelRouter
+from .utils.readiness import Readiness, LOADING, WARMING_UP, READY, FAILED
+from .utils import wire_formats
+from .utils.streaming import iter_ndjson_chunks, SpooledPipe, DuplexStreamingResponse
+from .utils.metrics import registry, prediction_stage_seconds, observe_parse_stage, timed_dependency
 
 # ======================================
 # 🔧 MLflow 配置
 # ======================================
-MLFLOW_TRACKING_URI = "http://localhost:5555"
-mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+MLFLOW_TRACKING_URI = settings.MLFLOW_TRACKING_URI
 MODEL_NAME = "HousingPriceModel"
-client = MlflowClient()
+MODEL_ALIAS = "production_v1"
+client = None  # 首次加载模型时创建，导入本模块不连接任何服务
+
+
+def get_client():
+    """首次调用时才导入 mlflow、设置 Tracking URI 并创建 MlflowClient"""
+    global client
+    if client is None:
+        import mlflow
+        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+        client = mlflow.MlflowClient()
+    return client
 
 # 全局变量
-model = None
-encoder = None
-scaler = None
-expected_columns = None
+micro_batcher = None
+model_watchers = {}  # 别名 -> ModelWatcher
+startup_task = None  # 后台加载 + 预热任务，服务在加载期间即可响应 /health 和 /ready
+readiness = Readiness()
 
-# ======================================
-# 🌱 生命周期管理
-# ======================================
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global model, encoder, scaler, expected_columns
-    print("🚀 应用启动中：加载模型...")
+# 多版本路由：别名 -> ServingState，按 MODEL_ROUTES 权重分流，可选影子版本
+router = ModelRouter(
+    settings.MODEL_ROUTES or {MODEL_ALIAS: 1.0},
+    shadow_alias=settings.SHADOW_MODEL_ALIAS,
+    shadow_max_pending=settings.SHADOW_MAX_PENDING
+)
+
+# 多个版本间内容相同的 encoder / scaler / feature_columns 只保留一份
+artifact_pool = SharedArtifactPool()
+
+# 专用推理线程池（有界准入队列，过载时快速拒绝）
+inference_executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue_size=settings.INFERENCE_QUEUE_SIZE,
+    retry_after=settings.OVERLOAD_RETRY_AFTER_SECONDS
+)
+
+# 预测结果缓存（模型版本变化时自动失效）
+prediction_cache = PredictionCache(
+    max_size=settings.PREDICTION_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS
+) if settings.PREDICTION_CACHE_ENABLED else None
+
+# 📈 预测路径各阶段耗时（标签预先绑定，热路径上不做查找）
+STAGE_PARSE = prediction_stage_seconds.labels("parse_validate")
+STAGE_JWT = prediction_stage_seconds.labels("jwt")
+STAGE_FEATURES = prediction_stage_seconds.labels("features")
+STAGE_ENCODING = prediction_stage_seconds.labels("encoding")
+STAGE_INFERENCE = prediction_stage_seconds.labels("inference")
+STAGE_SERIALIZATION = prediction_stage_seconds.labels("serialization")
+STAGE_MICRO_BATCH = prediction_stage_seconds.labels("micro_batch")  # 提交到微批队列至拿到结果
+STAGE_BATCH_TRANSFORM = prediction_stage_seconds.labels("batch_transform")  # 批量路径，每批一次
+STAGE_BATCH_INFERENCE = prediction_stage_seconds.labels("batch_inference")
+
+registry.gauge("inference_in_flight", "Inference tasks running or queued in the inference pool",
+               fn=lambda: inference_executor.in_flight)
+registry.counter("inference_rejected_total", "Inference tasks rejected because the queue was full",
+                 fn=lambda: inference_executor.rejected)
+registry.counter("prediction_cache_hits_total", "Prediction cache hits",
+                 fn=lambda: prediction_cache.hits if prediction_cache is not None else 0)
+registry.counter("prediction_cache_misses_total", "Prediction cache misses",
+                 fn=lambda: prediction_cache.misses if prediction_cache is not None else 0)
+
+# 🔀 多版本分流与影子打分
+routed_requests_total = registry.counter("model_routed_requests_total", "Requests routed to each model alias", ("alias",))
+shadow_prediction_seconds = registry.histogram("shadow_prediction_seconds", "Shadow model scoring latency in seconds")
+shadow_prediction_abs_delta = registry.histogram(
+    "shadow_prediction_abs_delta", "Absolute difference between shadow and primary predictions",
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000))
+
+# JWT 校验单独计时，并从“解析与校验”阶段中扣除
+verify_token = timed_dependency(STAGE_JWT, jwt_manager.verify_token)
 
+def resolve_model_alias(alias: str = MODEL_ALIAS):
+    """
+    解析模型别名，返回 (version, run_id)。
+    解析结果会写入本地 artifact 缓存；Tracking Server 不可用时使用上一次的解析结果兜底。
+    """
+    cache_name = f"alias-{MODEL_NAME}-{alias}"
     try:
-        model_uri = f"models:/{MODEL_NAME}@production_v1"
-        model = mlflow.pyfunc.load_model(model_uri)
-        print("✅ 模型加载成功")
+        mv = get_client().get_model_version_by_alias(MODEL_NAME, alias)
+    except Exception as e:
+        cached = artifact_cache.get_named(cache_name) if artifact_cache is not None else None
+        if cached is None:
+            raise
+        print(f"⚠️ 无法解析模型别名 {alias}（{e}），使用本地缓存: v{cached['version']}")
+        return cached["version"], cached["run_id"]
+
+    version, run_id = str(mv.version), mv.run_id
+    if artifact_cache is not None:
+        artifact_cache.put_named(cache_name, {"version": version, "run_id": run_id})
+    return version, run_id
+
+
+def timed(label: str, fn, *args):
+    """执行 fn 并打印耗时"""
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"⏱️ {label}: {(time.perf_counter() - start) * 1000:.0f} ms")
+    return result
+
 
-        run_id = model.metadata.run_id
-        run = client.get_run(run_id)
-        artifact_uri = run.info.artifact_uri
+def load_model_artifacts(model_version: str, run_id: str, load_model: bool = True):
+    """
+    并行加载模型与依赖文件，返回 (model, encoder, scaler, feature_columns)；load_model=False 时 model 为 None。
+    runs:/ URI 指向不可变内容，命中本地缓存时不会访问 Tracking Server；
+    依赖文件与已加载版本内容相同时复用同一个对象
+    """
+    get_client()  # 确保已设置 Tracking URI（别名可能来自本地缓存，尚未创建 client）
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="loader") as pool:
+        model_future = pool.submit(load_pyfunc_model, model_version, run_id) if load_model else None
+        artifact_futures = [
+            pool.submit(timed, f"加载 {name}", MLflowArtifactLoader.load_joblib,
+                        f"runs:/{run_id}/{name}", None, artifact_pool)
+            for name in ("ocean_encoder.pkl", "scaler.pkl", "feature_columns.pkl")
+        ]
+        encoder, scaler, feature_columns = [future.result() for future in artifact_futures]
+        model = model_future.result() if model_future is not None else None
+        return model, encoder, scaler, feature_columns
 
-        encoder = MLflowArtifactLoader.load_joblib(f"{artifact_uri}/ocean_encoder.pkl")
-        scaler = MLflowArtifactLoader.load_joblib(f"{artifact_uri}/scaler.pkl")
-        feature_columns = MLflowArtifactLoader.load_joblib(f"{artifact_uri}/feature_columns.pkl")
 
-        expected_columns = feature_columns
-        print("✅ 依赖文件加载完成")
+def load_pyfunc_model(model_version: str, run_id: str):
+    """下载并加载注册表中的 pyfunc 模型（调用前需已通过 get_client() 设置 Tracking URI）"""
+    model_uri = f"models:/{MODEL_NAME}/{model_version}"
+    return timed(f"加载模型 {model_uri}", MLflowArtifactLoader.load_pyfunc_model, model_uri, run_id)
+
+def shared_model_dir(model_version: str, run_id: str):
+    """共享模型目录（SHARED_MODEL_ENABLED 时）；run_id 区分不同注册表中的同号版本"""
+    if not settings.SHARED_MODEL_ENABLED:
+        return None
+    return os.path.join(settings.SHARED_MODEL_DIR, f"{MODEL_NAME}-v{model_version}-{run_id}")
+
+
+def compile_model(model):
+    """编译 pyfunc 模型中的原始森林；无法编译时返回 None"""
+    try:
+        return try_compile(model.get_raw_model())
     except Exception as e:
-        print(f"❌ 加载失败: {e}")
-        raise
+        print(f"⚠️ 无法获取原始模型（{e}），回退到 model.predict")
+        return None
+
+
+def build_predictor(model, transformer):
+    """按 INFERENCE_ENGINE 构造推理函数：compiled 时绕过 pyfunc 和 sklearn 的通用 predict 路径"""
+    if settings.INFERENCE_ENGINE == "compiled":
+        compiled = compile_model(model)
+        if compiled is not None:
+            return compiled.predict
+    return lambda x: model.predict(transformer.to_frame(x))
+
+
+class ServingState:
+    """
+    一个模型版本的全部推理依赖（模型、encoder、scaler、特征列、转换器、推理函数）。
+    热更新时整体替换路由中的引用；请求开始时只选择一次 state，
+    因此进行中的请求始终在同一个版本上完成。
+    forest 为已从共享目录映射的编译森林，此时 model 可以为 None。
+    """
+
+    def __init__(self, version: str, run_id: str, model, encoder, scaler, expected_columns,
+                 transformer: FeatureTransformer = None, forest=None):
+        self.version = version
+        self.run_id = run_id
+        self.model = model
+        self.encoder = encoder
+        self.scaler = scaler
+        self.expected_columns = expected_columns
+        # 编译特征转换器（与原逻辑一致：此服务不做标准化）
+        self.transformer = transformer or FeatureTransformer(encoder, expected_columns)
+        # ndarray -> 预测值，由 INFERENCE_ENGINE / 共享模型决定
+        self.predictor = forest.predict if forest is not None else build_predictor(model, self.transformer)
+        self.warmup = None  # 预热耗时统计，预热完成后才切入流量
+
+
+def load_serving_state(model_version: str, run_id: str) -> ServingState:
+    """
+    加载指定版本并构造完整的 ServingState（同步，启动和热更新共用）。
+    其他别名已在服务同一版本时直接复用；encoder 和特征列相同时复用已编译的转换器。
+    共享目录中已有该版本的森林时直接映射，不再下载和反序列化模型
+    """
+    live = router.live_states()
+    for existing in live:
+        if existing.version == model_version:
+            return existing
+    shared_dir = shared_model_dir(model_version, run_id)
+    if shared_dir is None:
+        model, encoder, scaler, feature_columns = load_model_artifacts(model_version, run_id)
+        forest = None
+    else:
+        # 依赖文件在后台下载，不占用共享目录的锁（各 worker 的下载互不等待）
+        get_client()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifacts") as pool:
+            artifacts = pool.submit(load_model_artifacts, model_version, run_id, False)
+            model = None
+            with shared_lock(shared_dir):
+                forest = load_shared(shared_dir)
+                if forest is None:
+                    # 第一个加载该版本的 worker：下载并编译后写入共享目录，随后改用映射的副本并释放模型对象
+                    model = load_pyfunc_model(model_version, run_id)
+                    compiled = compile_model(model)
+                    if compiled is not None:
+                        forest, model = share(compiled, shared_dir), None
+            _, encoder, scaler, feature_columns = artifacts.result()
+    transformer = next((s.transformer for s in live
+                        if s.encoder is encoder and s.expected_columns is feature_columns), None)
+    return ServingState(model_version, run_id, model, encoder, scaler, feature_columns, transformer, forest=forest)
+
+
+def swap_state(alias: str, new_state: ServingState):
+    """原子替换某个别名的服务状态，预测缓存绑定到新的版本组合，并释放不再引用的共享对象"""
+    router.set(alias, new_state)
+    live = router.live_states()
+    if prediction_cache is not None:
+        prediction_cache.bind_version(",".join(sorted({s.version for s in live})))
+    artifact_pool.prune(obj for s in live for obj in (s.encoder, s.scaler, s.expected_columns))
+
+def load_warm_state(model_version: str, run_id: str) -> ServingState:
+    """加载并预热（同步，启动和热更新共用）：新版本在切入流量前付清首次调用的开销"""
+    state = load_serving_state(model_version, run_id)
+    if state.warmup is None:
+        state.warmup = warm_up(state)
+    return state
+
+
+def activate_state(alias: str, new_state: ServingState):
+    """切入流量；主版本就绪后 /ready 返回 200（启动失败后由热更新加载成功时同样恢复）"""
+    swap_state(alias, new_state)
+    if alias == primary_alias():
+        readiness.set_phase(READY)
+
+
+def primary_alias() -> str:
+    """第一个分流别名，/ready 以它加载并预热完成为准"""
+    return next(iter(router.weights))
+
+
+async def load_models():
+    """
+    启动时依次加载全部别名。主版本失败时 /ready 报告 failed（热更新启用时继续按周期重试）；
+    其余别名（金丝雀、影子）失败时只记录日志，由热更新重试
+    """
+    readiness.set_phase(LOADING)
+    for alias in router.aliases:
+        try:
+            startup_begin = time.perf_counter()
+            # 先解析别名得到具体版本，保证加载的模型与缓存 key 中的版本一致
+            model_version, run_id = await asyncio.to_thread(timed, f"解析模型别名 {alias}", resolve_model_alias, alias)
+            # 拿到 run_id 后并行下载依赖文件，同时反序列化模型
+            state = await asyncio.to_thread(load_serving_state, model_version, run_id)
+            if alias == primary_alias():
+                readiness.set_phase(WARMING_UP)
+            if state.warmup is None:
+                state.warmup = await asyncio.to_thread(warm_up, state)
+            activate_state(alias, state)
+            print(f"✅ 模型加载成功: {MODEL_NAME}@{alias} v{model_version}，"
+                  f"加载总耗时 {(time.perf_counter() - startup_begin) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"❌ 加载失败（{alias}）: {e}")
+            if alias == primary_alias():
+                readiness.set_phase(FAILED, str(e))
+    if readiness.ready:
+        print("✅ 依赖文件加载完成，服务已就绪")
+
+
+async def start_model_watchers():
+    for alias in router.aliases:
+        model_watchers[alias] = ModelWatcher(
+            partial(resolve_model_alias, alias),
+            load_warm_state,
+            on_swap=partial(activate_state, alias),
+            current_version_fn=lambda alias=alias: getattr(router.get(alias), "version", None),
+            interval_seconds=settings.MODEL_WATCH_INTERVAL_SECONDS,
+            name=alias
+        )
+        await model_watchers[alias].start()
+
+
+async def startup_models():
+    await load_models()
+    if settings.MODEL_WATCH_ENABLED:
+        await start_model_watchers()
+
+# ======================================
+# 🌱 生命周期管理
+# ======================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global micro_batcher, startup_task
+    print("🚀 应用启动中：后台加载模型，就绪前 /ready 返回 503...")
+    startup_task = asyncio.create_task(startup_models())
+
+    if settings.MICRO_BATCH_ENABLED:
+        micro_batcher = MicroBatcher(
+            predict_micro_batch,
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+            max_wait_us=settings.MICRO_BATCH_MAX_WAIT_US,
+            executor=inference_executor.pool
+        )
+        await micro_batcher.start()
 
     yield
+
+    startup_task.cancel()
+    try:
+        await startup_task
+    except asyncio.CancelledError:
+        pass
+    for watcher in model_watchers.values():
+        await watcher.stop()
+    model_watchers.clear()
+    router.shutdown()
+    if micro_batcher is not None:
+        await micro_batcher.stop()
+        micro_batcher = None
     print("🛑 应用关闭")
 
 # ======================================
@@ -67,9 +365,11 @@ app = FastAPI(
 
 # 🔌 注册中间件
 middleware_manager.setup_cors(app)
+middleware_manager.setup_metrics(app)
 
 # 🔌 注册异常处理器
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.add_exception_handler(ServiceOverloadedError, overload_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 # ======================================
@@ -110,57 +410,428 @@ class HouseFeatures(BaseModel):
             }
         }
 
+
+# 📡 传输格式：JSON / MessagePack；Arrow IPC 为列式格式，只用于批量接口
+SINGLE_FORMATS = (wire_formats.JSON, wire_formats.MSGPACK)
+BATCH_FORMATS = (wire_formats.JSON, wire_formats.MSGPACK, wire_formats.ARROW)
+house_list_adapter = TypeAdapter(List[HouseFeatures])
+
+
+def request_body_doc(schema: dict, formats) -> dict:
+    """请求体由接口自行解析，在 OpenAPI 中补充各格式的说明"""
+    binary = {"type": "string", "format": "binary"}
+    content = {media_type: {"schema": schema if media_type == wire_formats.JSON else binary} for media_type in formats}
+    return {"requestBody": {"required": True, "content": content}}
+
+
+def request_validation_error(e: ValidationError) -> RequestValidationError:
+    """与 FastAPI 解析请求体时的 422 响应格式保持一致"""
+    return RequestValidationError([
+        {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False, include_input=False)
+    ])
+
+
+async def parse_house(request: Request) -> HouseFeatures:
+    """单条请求体：JSON（由 pydantic 直接从字节校验，不经过中间 dict）或 MessagePack"""
+    media_type = wire_formats.request_format(request.headers.get("content-type"), SINGLE_FORMATS)
+    body = await request.body()
+    try:
+        if media_type == wire_formats.MSGPACK:
+            return HouseFeatures.model_validate(wire_formats.loads_msgpack(body))
+        return HouseFeatures.model_validate_json(body)
+    except ValidationError as e:
+        raise request_validation_error(e)
+
 # ======================================
 # 🎯 预测接口（JWT 保护）
 # ======================================
-@app.post("/predict")
-def predict_price(
-    house: HouseFeatures,
-    payload: dict = Depends(jwt_manager.verify_token)  # 🔐 JWT 验证
+def predict_one(current: ServingState, house: HouseFeatures, record: bool = True) -> dict:
+    """单条预测（同步，运行在线程池中）；record=False 时不计入阶段耗时指标（预热）"""
+    try:
+        start = time.perf_counter()
+        x = current.transformer.numeric_one(house)
+        features_done = time.perf_counter()
+        x = current.transformer.encode_one(house, x)
+        encoding_done = time.perf_counter()
+        prediction = current.predictor(x)
+        if record:
+            STAGE_FEATURES.observe(features_done - start)
+            STAGE_ENCODING.observe(encoding_done - features_done)
+            STAGE_INFERENCE.observe(time.perf_counter() - encoding_done)
+        predicted_price = prediction[0] if len(prediction) > 0 else 0
+
+        return {"predicted_price": round(float(predicted_price), 2)}
+
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"预测失败: {str(e)}")
+
+
+def predict_micro_batch(items: list) -> list:
+    """
+    微批调度器的批处理函数：items 为 (state, house)，返回与输入等长的逐条结果。
+    热更新前后提交的请求可能落在同一批里，按各自的版本分组推理
+    """
+    groups = {}
+    for i, (current, house) in enumerate(items):
+        groups.setdefault(id(current), (current, []))[1].append(i)
+
+    results = [None] * len(items)
+    for current, indices in groups.values():
+        group_results = predict_group(current, [items[i][1] for i in indices])
+        for i, result in zip(indices, group_results):
+            results[i] = result
+    return results
+
+
+def predict_group(current: ServingState, houses: List[HouseFeatures]) -> list:
+    """同一版本的一组请求：一次 model.predict，返回与输入等长的逐条结果"""
+    try:
+        start = time.perf_counter()
+        x_final, valid_mask, errors = current.transformer.transform_batch(houses)
+        transform_done = time.perf_counter()
+        predictions = iter(current.predictor(x_final) if len(x_final) > 0 else [])
+        STAGE_BATCH_TRANSFORM.observe(transform_done - start)
+        STAGE_BATCH_INFERENCE.observe(time.perf_counter() - transform_done)
+    except Exception as e:
+        return [HTTPException(status_code=400, detail=f"预测失败: {str(e)}") for _ in houses]
+
+    results = []
+    for i, is_valid in enumerate(valid_mask):
+        if is_valid:
+            results.append({"predicted_price": round(float(next(predictions)), 2)})
+        else:
+            results.append(HTTPException(status_code=400, detail=f"预测失败: {errors[i]}"))
+    return results
+
+
+def shadow_predict(shadow: ServingState, house: HouseFeatures, primary_price: float):
+    """影子打分（运行在路由器的影子线程中）：只记录耗时和与主版本的预测差异"""
+    start = time.perf_counter()
+    result = predict_one(shadow, house)
+    seconds = time.perf_counter() - start
+    router.record_shadow(primary_price, result["predicted_price"], seconds)
+    shadow_prediction_seconds.observe(seconds)
+    shadow_prediction_abs_delta.observe(abs(result["predicted_price"] - primary_price))
+
+
+def render_result(content, media_type: str = wire_formats.JSON, headers: dict = None) -> Response:
+    """显式序列化响应（JSON 使用 orjson），以便单独统计序列化耗时"""
+    start = time.perf_counter()
+    response = wire_formats.render(content, media_type, headers)
+    STAGE_SERIALIZATION.observe(time.perf_counter() - start)
+    return response
+
+
+@app.post("/predict", openapi_extra=request_body_doc(HouseFeatures.model_json_schema(), SINGLE_FORMATS))
+async def predict_price(
+    request: Request,
+    payload: dict = Depends(verify_token),  # 🔐 JWT 验证
+    house: HouseFeatures = Depends(parse_house)
 ):
+    """请求体和响应为 JSON 或 MessagePack（按 Content-Type / Accept 协商）"""
+    observe_parse_stage(STAGE_PARSE)
+    response_type = wire_formats.response_format(request.headers.get("accept"), SINGLE_FORMATS)
+    alias, current = route_request()  # 本次请求固定使用同一个版本，不受热更新影响
+    headers = {"X-Model-Alias": alias, "X-Model-Version": current.version}
+
+    # 🗃️ 缓存命中时直接返回，跳过特征构造和推理
+    cache_key = None
+    result = None
+    if prediction_cache is not None:
+        cache_key = prediction_cache.make_key(house.model_dump(), current.version)
+        result = prediction_cache.get(cache_key)
+
+    if result is None:
+        if micro_batcher is not None:
+            start = time.perf_counter()
+            result = await inference_executor.run_queued(partial(micro_batcher.enqueue, (current, house)))
+            STAGE_MICRO_BATCH.observe(time.perf_counter() - start)
+        else:
+            result = await inference_executor.run(predict_one, current, house)
+        if cache_key is not None:
+            prediction_cache.put(cache_key, result)
+
+    # 👥 影子版本在响应之外异步打分
+    router.submit_shadow(shadow_predict, house, result["predicted_price"])
+    return render_result(result, response_type, headers)
+
+
+def route_request():
+    """按分流权重选择 (alias, state)，并计入对应别名的请求数；尚无已加载的版本时返回 503"""
     try:
-        features = {
-            'longitude': house.longitude,
-            'latitude': house.latitude,
-            'housing_median_age': house.housing_median_age,
-            'total_rooms': house.total_rooms,
-            'total_bedrooms': house.total_bedrooms,
-            'population': house.population,
-            'households': house.households,
-            'median_income': house.median_income,
-            'rooms_per_household': house.total_rooms / house.households,
-            'bedrooms_per_room': house.total_bedrooms / house.total_rooms,
-            'population_per_household': house.population / house.households,
-            'ocean_proximity': house.ocean_proximity
-        }
+        alias, current = router.choose()
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail=f"模型尚未就绪（{readiness.phase}）",
+                            headers={"Retry-After": str(settings.OVERLOAD_RETRY_AFTER_SECONDS)})
+    routed_requests_total.labels(alias).inc()
+    return alias, current
 
-        df = pd.DataFrame([features])
-        numerical_cols = [col for col in df.columns if col != 'ocean_proximity']
-        x_numerical = df[numerical_cols]
-        x_categorical = df[['ocean_proximity']]
+# ======================================
+# 📦 批量预测接口（JWT 保护）
+# ======================================
+@app.post("/predict/batch", openapi_extra=request_body_doc(house_list_adapter.json_schema(), BATCH_FORMATS))
+async def predict_price_batch(
+    request: Request,
+    payload: dict = Depends(verify_token)  # 🔐 JWT 验证
+):
+    """
+    请求体：JSON / MessagePack 记录数组，MessagePack 列式字典 {列名: 值列表}，或 Arrow IPC 流（列式）。
+    列式输入直接转换为数组，不为每行构造 HouseFeatures。
+    响应按 Accept 返回 JSON / MessagePack（{"results", "count", "failed"}）或 Arrow IPC
+    （index、predicted_price、error 三列，失败行 predicted_price 为 null）
+    """
+    media_type = wire_formats.request_format(request.headers.get("content-type"), BATCH_FORMATS)
+    response_type = wire_formats.response_format(request.headers.get("accept"), BATCH_FORMATS)
+    body = await request.body()
+    raw, categories = await inference_executor.run(decode_batch, body, media_type)
+    if len(raw) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"批量记录数 {len(raw)} 超过上限 {settings.BATCH_MAX_SIZE}"
+        )
+    if len(raw) == 0:
+        predictions, errors = np.empty(0), {}
+    else:
+        _, current = route_request()
+        predictions, errors = await inference_executor.run(score_columns, current, raw, categories)
 
-        x_categorical_encoded = encoder.transform(x_categorical)
-        encoded_columns = encoder.get_feature_names_out(['ocean_proximity'])
-        x_categorical_df = pd.DataFrame(x_categorical_encoded, columns=encoded_columns, index=df.index)
+    start = time.perf_counter()
+    if response_type == wire_formats.ARROW:
+        response = wire_formats.render_arrow_batch(predictions, errors)
+    else:
+        response = wire_formats.render(batch_results(predictions, errors), response_type)
+    STAGE_SERIALIZATION.observe(time.perf_counter() - start)
+    return response
 
-        x_final = pd.concat([x_numerical, x_categorical_df], axis=1)
-        x_final = x_final.reindex(columns=expected_columns, fill_value=0)
 
-        prediction = model.predict(x_final)
-        predicted_price = prediction[0] if len(prediction) > 0 else 0
+def decode_batch(body: bytes, media_type: str):
+    """批量请求体 -> (原始数值矩阵, 类别列)（同步，运行在推理线程池中）"""
+    if media_type == wire_formats.ARROW:
+        return wire_formats.read_arrow(body, RAW_FEATURES, CATEGORICAL_FEATURE)
+    try:
+        if media_type == wire_formats.MSGPACK:
+            data = wire_formats.loads_msgpack(body)
+            if isinstance(data, dict):
+                return wire_formats.columns_to_arrays(data, RAW_FEATURES, CATEGORICAL_FEATURE)
+            houses = house_list_adapter.validate_python(data)
+        else:
+            houses = house_list_adapter.validate_json(body)
+    except ValidationError as e:
+        raise request_validation_error(e)
+    return FeatureTransformer.to_arrays(houses)
 
-        return {"predicted_price": round(float(predicted_price), 2)}
 
+def score_columns(current: ServingState, raw: np.ndarray, categories: list, record: bool = True):
+    """列式批量预测，返回 (predictions, errors)：predictions 与输入等长，无效行为 NaN"""
+    try:
+        start = time.perf_counter()
+        x_final, valid_mask, errors = current.transformer.transform_arrays(raw, categories)
+        transform_done = time.perf_counter()
+        predictions = np.full(len(valid_mask), np.nan)
+        if len(x_final) > 0:
+            predictions[valid_mask] = np.asarray(current.predictor(x_final), dtype=float).ravel()
+        if record:
+            STAGE_BATCH_TRANSFORM.observe(transform_done - start)
+            STAGE_BATCH_INFERENCE.observe(time.perf_counter() - transform_done)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"预测失败: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"批量预测失败: {str(e)}")
+    return predictions, errors
+
+
+def batch_results(predictions: np.ndarray, errors: dict) -> dict:
+    """按原始顺序组装逐行结果"""
+    results = [
+        {"index": i, "error": errors[i]} if i in errors else {"index": i, "predicted_price": round(price, 2)}
+        for i, price in enumerate(predictions.tolist())
+    ]
+    return {"results": results, "count": len(results), "failed": len(errors)}
+
+
+def predict_batch(current: ServingState, houses: List[HouseFeatures], record: bool = True) -> dict:
+    """批量预测（同步，运行在推理线程池中）"""
+    return batch_results(*score_columns(current, *FeatureTransformer.to_arrays(houses), record=record))
+
+# ======================================
+# 🔥 预热
+# ======================================
+WARMUP_BARRIER_TIMEOUT_SECONDS = 1.0
+
+def warmup_houses(n: int) -> List[HouseFeatures]:
+    """合成请求：以接口示例为基准，逐条改变收入和房龄，让各棵树走不同的分支"""
+    example = HouseFeatures.model_config["json_schema_extra"]["example"]
+    return [
+        HouseFeatures(**{**example, "median_income": 0.5 + (i * 1.37) % 14.5,
+                         "housing_median_age": 1 + (i * 7) % 52})
+        for i in range(n)
+    ]
+
+
+def warm_up(state: ServingState) -> dict:
+    """
+    切入流量前在推理线程池中用合成请求预热：WARMUP_PREDICTIONS 次单条预测分摊到池中的各个线程
+    （每个线程的转换器缓冲区都提前分配），另外跑一次 WARMUP_BATCH_SIZE 行的批量预测（两者各自独立，设为 0 时跳过），
+    让 NumPy / sklearn 的首次调用开销在真实请求之前付清。预热请求不计入阶段耗时指标；任何一次预测失败时抛出异常
+    """
+    start = time.perf_counter()
+    pool = inference_executor.pool
+    stats = {"predictions": 0}
+    if settings.WARMUP_PREDICTIONS > 0:
+        houses = warmup_houses(settings.WARMUP_PREDICTIONS)
+        threads = min(inference_executor.max_workers, len(houses))
+        barrier = threading.Barrier(threads)
+        futures = [pool.submit(warm_up_thread, state, houses[i::threads], barrier) for i in range(threads)]
+        per_thread = [future.result() for future in futures]
+        latencies = [ms for thread_latencies in per_thread for ms in thread_latencies]
+        stats.update({
+            "predictions": len(latencies),
+            "threads": threads,
+            "first_ms": round(max(thread_latencies[0] for thread_latencies in per_thread), 3),
+            "p50_ms": round(float(np.median(latencies)), 3),
+            "max_ms": round(max(latencies), 3),
+        })
+    if settings.WARMUP_BATCH_SIZE > 0:
+        begin = time.perf_counter()
+        result = pool.submit(predict_batch, state, warmup_houses(settings.WARMUP_BATCH_SIZE), False).result()
+        if result["failed"]:
+            raise RuntimeError(f"预热批量预测失败: {result['results'][0]}")
+        stats.update({"batch_size": settings.WARMUP_BATCH_SIZE,
+                      "batch_ms": round((time.perf_counter() - begin) * 1000, 3)})
+    stats["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    single = (f"{stats['predictions']} 次单条预测（{stats['threads']} 个线程，首次 {stats['first_ms']:.2f} ms，"
+              f"p50 {stats['p50_ms']:.2f} ms）") if stats["predictions"] else "跳过单条预测"
+    batch = f"{stats['batch_size']} 行批量预测" if "batch_size" in stats else "跳过批量预测"
+    print(f"🔥 v{state.version} 预热完成: {single}，{batch}，共 {stats['total_ms']:.0f} ms")
+    return stats
+
+
+def warm_up_thread(state: ServingState, houses: List[HouseFeatures], barrier: threading.Barrier) -> List[float]:
+    """
+    在一个推理线程上依次预测，返回每次的耗时（毫秒）。先在 barrier 等齐其他预热任务，
+    保证各任务分别占用不同的线程；线程池正忙（热更新时仍在服务请求）等不齐时，已开始的任务照常预热
+    """
+    try:
+        barrier.wait(timeout=WARMUP_BARRIER_TIMEOUT_SECONDS)
+    except threading.BrokenBarrierError:
+        pass
+    latencies = []
+    for house in houses:
+        begin = time.perf_counter()
+        predict_one(state, house, record=False)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    return latencies
+
+# ======================================
+# 🌊 流式批量预测接口（NDJSON，JWT 保护）
+# ======================================
+@app.post("/predict/stream")
+async def predict_price_stream(
+    request: Request,
+    payload: dict = Depends(verify_token)  # 🔐 JWT 验证
+):
+    """
+    请求体为 NDJSON（每行一条 HouseFeatures），响应逐行返回
+    {"index": i, "predicted_price": ...} 或 {"index": i, "error": ...}，index 为记录序号（跳过空行）。
+    按 STREAM_CHUNK_SIZE 行分块读取、推理、写出，内存占用与上传大小无关
+    """
+    _, current = route_request()  # 整个流使用同一个版本
+    # 整个流占用一个推理名额：过载时在写响应头之前直接返回 429/503；
+    # 响应结束后，名额等仍在线程池中执行的分块完成才释放
+    slot = inference_executor.admit()
+    return DuplexStreamingResponse(stream_predictions(request, current, slot), on_close=slot.close)
+
+
+async def stream_predictions(request: Request, current: ServingState, slot: AdmissionSlot):
+    """响应体：读取请求体和推理在后台任务中进行，结果经 SpooledPipe 流出"""
+    pipe = SpooledPipe(settings.STREAM_SPOOL_MEMORY_BYTES)
+    producer = asyncio.create_task(score_ndjson_upload(request, current, pipe, slot))
+    try:
+        async for data in pipe:
+            yield data
+    finally:
+        producer.cancel()
+        pipe.discard()
+
+
+async def score_ndjson_upload(request: Request, current: ServingState, pipe: SpooledPipe, slot: AdmissionSlot):
+    offset = 0
+    try:
+        chunks = iter_ndjson_chunks(request.stream(), settings.STREAM_CHUNK_SIZE, settings.STREAM_MAX_LINE_BYTES)
+        async for lines in chunks:
+            chunk = slot.track(inference_executor.pool.submit(predict_stream_chunk, current, lines, offset))
+            data = await asyncio.wrap_future(chunk)
+            pipe.write(data)
+            offset += len(lines)
+    except ValueError as e:
+        # 响应头已发出，错误以最后一行返回
+        pipe.write(wire_formats.dumps_json({"index": offset, "error": str(e)}) + b"\n")
+    except ClientDisconnect:
+        pass
+    except Exception as e:
+        pipe.close(e)
+        return
+    pipe.close()
+
+
+def predict_stream_chunk(current: ServingState, lines: List[bytes], offset: int) -> bytes:
+    """解析并预测一个分块（同步，运行在推理线程池中），返回该分块的 NDJSON 文本"""
+    results = [None] * len(lines)
+    houses, positions = [], []
+    for i, line in enumerate(lines):
+        try:
+            houses.append(HouseFeatures.model_validate_json(line))
+            positions.append(i)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'body'}: {err['msg']}" for err in e.errors())
+            results[i] = {"index": offset + i, "error": f"无效记录: {detail}"}
+
+    if houses:
+        try:
+            scored = predict_batch(current, houses)["results"]
+        except HTTPException as e:
+            scored = [{"index": 0, "error": e.detail}] * len(houses)
+        for i, result in zip(positions, scored):
+            results[i] = {**result, "index": offset + i}
+
+    return b"".join(wire_formats.dumps_json(result) + b"\n" for result in results)
+
+# ======================================
+# 📊 运行时统计
+# ======================================
+@app.get("/stats")
+def runtime_stats():
+    return {
+        "readiness": readiness.stats(),
+        "model": {"name": MODEL_NAME, **router.stats()},
+        "model_watcher": {alias: watcher.stats() for alias, watcher in model_watchers.items()} or {"enabled": False},
+        "shared_artifacts": artifact_pool.stats(),
+        "inference_executor": inference_executor.stats(),
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else {"enabled": False},
+        "jwt_cache": token_cache.stats() if token_cache is not None else {"enabled": False},
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else {"enabled": False}
+    }
 
 # ======================================
 # 🧪 健康检查
 # ======================================
 @app.get("/health")
 def health_check():
+    """存活检查：进程能响应即可，不依赖模型是否加载"""
     return {"status": "healthy"}
 
+
+@app.get("/ready")
+def readiness_check():
+    """就绪检查：主版本加载并预热完成后返回 200，此前（或加载失败时）返回 503"""
+    content = {
+        **readiness.stats(),
+        "models": {
+            alias: {"version": state.version, "warmup": state.warmup}
+            for alias, state in router.states.items()
+        },
+    }
+    return wire_formats.FastJSONResponse(content, status_code=200 if readiness.ready else 503)
+
 # ======================================
 # 🎉 根路由
 # ======================================
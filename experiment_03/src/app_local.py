@@ -1,13 +1,44 @@
-import pandas as pd
+import os
+
 from fastapi import FastAPI, HTTPException
-import joblib
 from pydantic import BaseModel
 
-# 加载模型 和 scaler
-model = joblib.load("models/rf_model.pkl")
-encoder = joblib.load("models/ocean_encoder.pkl")
-scaler = joblib.load("models/scaler.pkl")
-expected_columns = joblib.load("models/feature_columns.pkl")
+from .features.transformer import FeatureTransformer
+from .models.compiled_forest import try_compile
+from .models.model_bundle import ModelBundle, source_files
+from .config.settings import settings
+
+
+# 没有模型包时加载的 joblib 文件；模型包过期时改为加载导出它时使用的文件
+sources = source_files("models/rf_model.pkl", "models")
+
+bundle = ModelBundle.load(settings.MODEL_BUNDLE_PATH) if os.path.exists(settings.MODEL_BUNDLE_PATH) else None
+if bundle is not None:
+    # 导出后模型文件或预处理产物已变化（如重新训练后未重新导出）时回退到 joblib
+    stale = bundle.stale_sources()
+    if stale:
+        sources = {**sources, **bundle.metadata.get("source_files", {})}
+        print(f"⚠️ 模型包 {settings.MODEL_BUNDLE_PATH} 导出后来源文件已变化（{', '.join(stale)}），"
+              f"改用 joblib 加载 {sources['model']}；请重新运行 make bundle")
+        bundle = None
+
+if bundle is not None:
+    # 加载紧凑模型包（mmap，不反序列化 sklearn 对象）
+    transformer = bundle.transformer()
+    predict = bundle.predict
+    print(f"✅ 已加载模型包: {settings.MODEL_BUNDLE_PATH}（{bundle.forest.n_trees} 棵树）")
+else:
+    import joblib
+
+    # 加载模型 和 scaler
+    model = joblib.load(sources["model"])
+    encoder = joblib.load(sources["ocean_encoder.pkl"])
+    scaler = joblib.load(sources["scaler.pkl"])
+    expected_columns = joblib.load(sources["feature_columns.pkl"])
+    transformer = FeatureTransformer(encoder, expected_columns, scaler=scaler)
+    # INFERENCE_ENGINE=compiled 时使用展平后的 NumPy 森林推理（结果与 model.predict 一致）
+    compiled_forest = try_compile(model) if settings.INFERENCE_ENGINE == "compiled" else None
+    predict = compiled_forest.predict if compiled_forest is not None else model.predict
 app = FastAPI(title="House Price Prediction")
 
 class HouseFeatures(BaseModel):
@@ -25,45 +56,11 @@ class HouseFeatures(BaseModel):
 @app.post("/predict")
 def predict_price(house: HouseFeatures):
     try:
-        # 构造原始特征
-        features = {
-            'longitude': house.longitude,
-            'latitude': house.latitude,
-            'housing_median_age': house.housing_median_age,
-            'total_rooms': house.total_rooms,
-            'total_bedrooms': house.total_bedrooms,
-            'population': house.population,
-            'households': house.households,
-            'median_income': house.median_income,
-            'rooms_per_household': house.total_rooms / house.households,
-            'bedrooms_per_room': house.total_bedrooms / house.total_rooms,
-            'population_per_household': house.population / house.households,
-            'ocean_proximity': house.ocean_proximity
-        }
-
-        # 转为 DataFrame
-        df = pd.DataFrame([features])
-        # 提取数值和类别特征
-        numerical_cols = [col for col in df.columns if col != 'ocean_proximity']
-        x_numerical = df[numerical_cols]
-        x_categorical = df[['ocean_proximity']]
-
-        # 使用 OneHotEncoder 编码（自动处理未知类别）
-        x_categorical_encoded = encoder.transform(x_categorical)
-        encoded_columns = encoder.get_feature_names_out(['ocean_proximity'])
-        x_categorical_df = pd.DataFrame(x_categorical_encoded, columns=encoded_columns, index=df.index)
-
-        # 拼接
-        x_final = pd.concat([x_numerical, x_categorical_df], axis=1)
-
-        # 确保列顺序与训练时一致
-        x_final = x_final.reindex(columns=expected_columns, fill_value=0)
-
-        # 标准化
-        x_scaled = scaler.transform(x_final)
+        # 构造特征 + 独热编码 + 列对齐 + 标准化（预编译转换器，直接写入 float 数组）
+        x_scaled = transformer.transform_one(house)
 
         # 预测
-        prediction = model.predict(x_scaled)[0]
+        prediction = predict(x_scaled)[0]
 
         return {"predicted_price": round(prediction, 2)}
 
@@ -1,6 +1,6 @@
 # config/settings.py
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # 🌐 CORS 配置
@@ -13,6 +13,68 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "my-super-secret-jwt-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # 已验证令牌缓存：重复令牌跳过签名校验，有效期不超过令牌的 exp
+    JWT_CACHE_ENABLED: bool = True
+    JWT_CACHE_MAX_SIZE: int = 10000
+    JWT_CACHE_TTL_SECONDS: float = 300
+
+    # 🔧 MLflow 配置（基准测试等场景可指向本地 sqlite 替身）
+    MLFLOW_TRACKING_URI: str = "http://localhost:5555"
+
+    # 📦 批量预测配置
+    BATCH_MAX_SIZE: int = 10000  # /predict/batch 单次请求允许的最大记录数
+    STREAM_CHUNK_SIZE: int = 1000  # /predict/stream 每次读取、推理、写出的行数
+    STREAM_MAX_LINE_BYTES: int = 65536  # /predict/stream 单行最大字节数
+    STREAM_SPOOL_MEMORY_BYTES: int = 1048576  # 未发送的结果超过此大小后暂存到磁盘
+
+    # ⚡ 动态微批配置（默认关闭）：合并并发的 /predict 请求为一次 model.predict
+    MICRO_BATCH_ENABLED: bool = False
+    MICRO_BATCH_MAX_SIZE: int = 64  # 单批最大记录数
+    MICRO_BATCH_MAX_WAIT_US: int = 2000  # 收集窗口（微秒）
+
+    # 🚦 推理线程池与背压：执行中 + 排队中的任务超过上限时立即拒绝
+    INFERENCE_WORKERS: int = 4
+    INFERENCE_QUEUE_SIZE: int = 64
+    OVERLOAD_STATUS_CODE: int = 503  # 可改为 429
+    OVERLOAD_RETRY_AFTER_SECONDS: int = 1
+
+    # 🗃️ 预测结果缓存（LRU + TTL，key 含模型版本）
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_SIZE: int = 10000
+    PREDICTION_CACHE_TTL_SECONDS: float = 300
+
+    # 💾 本地 artifact 缓存：重复加载读本地文件，Tracking Server 不可用时从缓存启动
+    ARTIFACT_CACHE_ENABLED: bool = True
+    ARTIFACT_CACHE_DIR: str = ".artifact_cache"
+    ARTIFACT_CACHE_MAX_MB: int = 2048
+
+    # 🌲 推理引擎：sklearn（model.predict）或 compiled（展平后的 NumPy 森林，结果逐位一致）
+    INFERENCE_ENGINE: str = "sklearn"
+
+    # 📦 紧凑模型包（app_local）：文件存在时以 mmap 方式加载，代替反序列化 joblib 文件（总是使用编译推理引擎）
+    MODEL_BUNDLE_PATH: str = "models/model.bundle"
+
+    # 🧠 共享内存模型：编译后的森林保存为 .npy 并以只读 mmap 加载，同一主机上的 worker 共享一份物理内存，
+    # 后启动的 worker 不再下载和反序列化模型（总是使用编译推理引擎）
+    SHARED_MODEL_ENABLED: bool = False
+    SHARED_MODEL_DIR: str = ".shared_models"
+    SERVER_WORKERS: int = 1  # main.py 启动的 uvicorn worker 进程数
+
+    # 🔄 模型热更新：定期检查注册表别名，指向新版本时后台加载并原子切换
+    MODEL_WATCH_ENABLED: bool = True
+    MODEL_WATCH_INTERVAL_SECONDS: float = 30
+
+    # 🔀 多版本服务：别名 -> 分流权重（JSON，如 {"production_v1": 0.9, "canary": 0.1}），为空时只服务 production_v1
+    MODEL_ROUTES: Dict[str, float] = {}
+    SHADOW_MODEL_ALIAS: str = ""  # 影子别名：异步打分，只记录耗时和预测差异，不影响响应
+    SHADOW_MAX_PENDING: int = 100  # 影子任务积压上限，超过后丢弃
+
+    # 🔥 预热：每个版本切入流量前先用合成请求跑单条预测和一次批量预测，/ready 在主版本预热完成后才返回 200
+    WARMUP_PREDICTIONS: int = 20  # 单条预测次数（分摊到推理线程池的各个线程），0 表示跳过单条预测
+    WARMUP_BATCH_SIZE: int = 64  # 批量预测的行数，0 表示跳过批量路径
+
+    # 📈 Prometheus 指标（/metrics）：请求数、错误数、进行中请求数、各阶段耗时直方图
+    METRICS_ENABLED: bool = True
 
     # 🛠️ 应用配置
     DEBUG: bool = True
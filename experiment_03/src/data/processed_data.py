@@ -0,0 +1,94 @@
+"""
+处理后数据的读写：每个数据集（x_train / y_train / x_test / y_test）保存为一个 Parquet 文件。
+
+- 列式二进制格式，读取时不需要解析文本、转换浮点数，可以只读取需要的列
+- dtype="float32" 时特征列以 float32 保存（体积减半；随机森林训练时本身就把特征转换为 float32，结果不变），
+  目标列始终保持 float64
+- 文件的 schema metadata 记录格式版本、dtype、行列数、来源和生成时间，不读数据即可查看
+- 找不到 .parquet 时回退读取旧的 .csv，已有的处理结果不需要重新生成
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+PROCESSED_DIR = "data/processed"
+FORMAT_VERSION = 1
+METADATA_KEY = b"housing"  # schema metadata 中本项目使用的键
+DTYPES = ("float32", "float64")
+
+
+def processed_path(name: str, directory: str = PROCESSED_DIR, suffix: str = ".parquet") -> str:
+    return os.path.join(directory, f"{name}{suffix}")
+
+
+def save_processed(frames: Dict[str, pd.DataFrame], directory: str = PROCESSED_DIR, dtype: str = "float64",
+                   targets: Sequence[str] = ("y_train", "y_test"), metadata: Optional[dict] = None) -> Dict[str, str]:
+    """
+    保存多个数据集，返回 {名称: 路径}。
+
+    Args:
+        frames: {名称: DataFrame}，如 {"x_train": x_train, "y_train": y_train.to_frame()}
+        dtype: 特征列的浮点类型（float32 / float64），targets 中的数据集不做转换
+        metadata: 额外写入 schema metadata 的信息（如来源文件）
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if dtype not in DTYPES:
+        raise ValueError(f"不支持的 dtype: {dtype}，可选: {DTYPES}")
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, frame in frames.items():
+        if name not in targets:
+            frame = frame.astype(dtype)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        info = {
+            "format_version": FORMAT_VERSION,
+            "name": name,
+            "dtype": "float64" if name in targets else dtype,
+            "rows": table.num_rows,
+            "columns": table.column_names,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            **(metadata or {}),
+        }
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            METADATA_KEY: json.dumps(info, ensure_ascii=False).encode("utf-8"),
+        })
+        paths[name] = processed_path(name, directory)
+        pq.write_table(table, paths[name])
+    return paths
+
+
+def read_metadata(name: str, directory: str = PROCESSED_DIR) -> dict:
+    """只读取文件尾部的 schema，返回 save_processed 写入的 metadata"""
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(processed_path(name, directory))
+    raw = (schema.metadata or {}).get(METADATA_KEY)
+    if raw is None:
+        return {"name": name, "columns": schema.names}
+    return json.loads(raw.decode("utf-8"))
+
+
+def load_processed(name: str, directory: str = PROCESSED_DIR, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """读取一个数据集；columns 不为空时只读取这些列（Parquet 按列读取，其余列不解码）"""
+    path = processed_path(name, directory)
+    if os.path.exists(path):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    csv_path = processed_path(name, directory, ".csv")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"找不到处理后的数据 {path}，请先运行特征工程（make features）")
+    print(f"⚠️ 未找到 {path}，读取旧格式 {csv_path}（重新运行特征工程可改为 Parquet）")
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def load_target(name: str, directory: str = PROCESSED_DIR) -> np.ndarray:
+    """读取目标列为一维数组（y_train / y_test 只有一列）"""
+    return load_processed(name, directory).iloc[:, 0].to_numpy()
@@ -1,22 +1,35 @@
 """
 模型评估：计算 MSE、R² 等指标，并将指标记录到 MLflow
+
+用法（在 experiment_03 目录下）：
+    python -m src.evaluate.evaluate --n_estimators 100 --max_depth 5
 """
 import argparse
-import pandas as pd
 import numpy as np
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import mlflow
 import joblib
 import json
 import os
+import sys
+
+if __package__:
+    from ..data.processed_data import load_processed, load_target
+else:
+    # 直接以脚本运行（python src/evaluate/evaluate.py ...）时没有包上下文，把 experiment_03 加入搜索路径后按绝对路径导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from src.data.processed_data import load_processed, load_target
 
 # 配置 MLflow
 TRACKING_URI = "http://localhost:5555"
 EXPERIMENT_NAME = "housing-price-experiment"
 RUN_NAME = "housing_price_rf_test"
 
-mlflow.set_tracking_uri(TRACKING_URI)
-mlflow.set_experiment(EXPERIMENT_NAME)
+
+def configure_mlflow():
+    """设置 Tracking URI 和实验（评估时调用，导入本模块不连接 Tracking Server）"""
+    mlflow.set_tracking_uri(TRACKING_URI)
+    mlflow.set_experiment(EXPERIMENT_NAME)
 
 
 def find_run_by_params(n_estimators, max_depth):
@@ -46,20 +59,27 @@ def find_run_by_params(n_estimators, max_depth):
     return runs[0]
 
 
-def evaluate_model(n_estimators=100, max_depth=5):
+def evaluate_model(n_estimators=100, max_depth=5, model=None, x_test=None, y_test=None, run_id=None):
+    """
+    评估并把指标记录到训练 Run，返回指标字典。
+    model / x_test / y_test 为空时从本地文件读取；run_id 为空时按参数查找训练 Run
+    """
     print(f"📊 正在评估模型: n_estimators={n_estimators}, max_depth={max_depth}")
 
-    # ✅ 加载本地模型（按参数命名）
-    model_filename = f"rf_model_n{n_estimators}_d{max_depth}.pkl"
-    model_path = os.path.join("models", model_filename)
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"模型文件 {model_path} 不存在，请训练后再进行评估！")
+    if model is None:
+        # ✅ 加载本地模型（按参数命名）
+        model_filename = f"rf_model_n{n_estimators}_d{max_depth}.pkl"
+        model_path = os.path.join("models", model_filename)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"模型文件 {model_path} 不存在，请训练后再进行评估！")
 
-    model = joblib.load(model_path)
+        model = joblib.load(model_path)
 
-    # 加载测试数据
-    x_test = pd.read_csv('data/processed/x_test.csv')
-    y_test = pd.read_csv('data/processed/y_test.csv').values.ravel()
+    if x_test is None:
+        # 加载测试数据，只读取模型训练时使用的列（Parquet 按列读取）
+        feature_names = getattr(model, "feature_names_in_", None)
+        x_test = load_processed("x_test", columns=list(feature_names) if feature_names is not None else None)
+        y_test = load_target("y_test")
 
     # 预测
     y_pred = model.predict(x_test)
@@ -74,12 +94,13 @@ def evaluate_model(n_estimators=100, max_depth=5):
 
     # ✅ 在 MLflow 中记录指标（关联到训练 Run）
     try:
-        run = find_run_by_params(n_estimators, max_depth)
-        with mlflow.start_run(run_id=run.info.run_id):
+        configure_mlflow()
+        run_id = run_id or find_run_by_params(n_estimators, max_depth).info.run_id
+        with mlflow.start_run(run_id=run_id):
             mlflow.log_metrics(metrics)
             mlflow.set_tag("evaluation", "test_set")
             mlflow.log_param("eval_dataset", "test_set_v1")
-        print(f"✅ 指标已记录到 MLflow Run ID: {run.info.run_id}")
+        print(f"✅ 指标已记录到 MLflow Run ID: {run_id}")
     except Exception as e:
         print(f"⚠️ 无法记录到 MLflow: {e}")
 
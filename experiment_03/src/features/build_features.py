@@ -1,13 +1,25 @@
 """
 特征工程，标准化处理
+
+用法（在 experiment_03 目录下）：
+    python -m src.features.build_features --dtype float32
 """
+import argparse
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 import joblib
 import os
+import sys
+
+if __package__:
+    from ..data.processed_data import save_processed, DTYPES
+else:
+    # 直接以脚本运行（python src/features/build_features.py ...）时没有包上下文，把 experiment_03 加入搜索路径后按绝对路径导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from src.data.processed_data import save_processed, DTYPES
 
-def create_features():
+def create_features(dtype="float64"):
     print("🛠️ 正在进行特征工程...")
     df = pd.read_csv('data/raw/housing.csv')
     x = df.drop('median_house_value', axis=1).copy()
@@ -65,12 +77,13 @@ def create_features():
     x_train_scaled = scaler.fit_transform(x_train)
     x_test_scaled = scaler.transform(x_test)
 
-    # 保存处理后的数据
-    os.makedirs("data/processed", exist_ok=True)
-    pd.DataFrame(x_train_scaled,columns=x_encoded.columns).to_csv("data/processed/x_train.csv", index=False)
-    pd.DataFrame(y_train).to_csv("data/processed/y_train.csv", index=False)
-    pd.DataFrame(x_test_scaled, columns=x_encoded.columns).to_csv("data/processed/x_test.csv", index=False)
-    pd.DataFrame(y_test).to_csv("data/processed/y_test.csv", index=False)
+    # 保存处理后的数据（Parquet，特征列按 dtype 保存）
+    save_processed({
+        "x_train": pd.DataFrame(x_train_scaled, columns=x_encoded.columns),
+        "y_train": pd.DataFrame(y_train).reset_index(drop=True),
+        "x_test": pd.DataFrame(x_test_scaled, columns=x_encoded.columns),
+        "y_test": pd.DataFrame(y_test).reset_index(drop=True),
+    }, dtype=dtype, metadata={"source": "data/raw/housing.csv", "scaled": True, "test_size": 0.2, "random_state": 42})
 
     # 保存训练时的特征列顺序
     os.makedirs("models", exist_ok=True)
@@ -78,7 +91,11 @@ def create_features():
     joblib.dump(scaler, "models/scaler.pkl")
     joblib.dump(x_encoded.columns.tolist(), "models/feature_columns.pkl")
 
-    print("✅ 特征工程完成，数据已保存")
+    print(f"✅ 特征工程完成，数据已保存（Parquet，特征 {dtype}）")
 
 if __name__ == '__main__':
-    create_features()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dtype", choices=DTYPES, default="float64", help="特征列的浮点类型（float32 体积减半，随机森林结果不变）")
+    args = parser.parse_args()
+
+    create_features(args.dtype)
\ No newline at end of file
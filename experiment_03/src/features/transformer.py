@@ -0,0 +1,224 @@
+"""
+在线推理用的特征转换器：启动时由 encoder / scaler / feature_columns 编译一次，
+请求时直接把特征写入预分配的 float 数组，替代逐请求的 DataFrame 构造、concat 和 reindex
+"""
+import threading
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 请求中直接携带的数值字段（顺序即 build_features 中的列顺序）
+RAW_FEATURES = [
+    'longitude', 'latitude', 'housing_median_age', 'total_rooms', 'total_bedrooms',
+    'population', 'households', 'median_income'
+]
+# 在线构造的比率特征
+RATIO_FEATURES = ['rooms_per_household', 'bedrooms_per_room', 'population_per_household']
+NUMERICAL_FEATURES = RAW_FEATURES + RATIO_FEATURES
+CATEGORICAL_FEATURE = 'ocean_proximity'
+# 类别缺失（null / NaN）的行视为无效输入，与 /predict 中必填字段缺失一致，不按未知类别编码为全 0
+MISSING_CATEGORY_ERROR = f"缺少 {CATEGORICAL_FEATURE}"
+
+
+class CategoryTable(NamedTuple):
+    """OneHotEncoder 的查表形式：与 encoder.transform 逐位一致，使用时不依赖 sklearn / pandas"""
+    names: List[str]  # 编码后的列名（get_feature_names_out）
+    categories: List[str]  # 已知类别
+    rows: np.ndarray  # shape=(len(categories), len(names))，每个已知类别的编码结果
+    unknown: Optional[np.ndarray]  # 未知类别的编码结果；None 表示未知类别报错（handle_unknown='error'）
+
+    @classmethod
+    def from_encoder(cls, encoder) -> "CategoryTable":
+        """用 encoder 对每个已知类别和一个未知类别各编码一次"""
+        import pandas as pd
+
+        categories = list(encoder.categories_[0])
+        rows = np.asarray(encoder.transform(pd.DataFrame({CATEGORICAL_FEATURE: categories})), dtype=np.float64)
+        try:
+            unknown = encoder.transform(pd.DataFrame({CATEGORICAL_FEATURE: ['__unknown_category__']}))
+            unknown = np.asarray(unknown[0], dtype=np.float64)
+        except ValueError:
+            unknown = None
+        return cls(list(encoder.get_feature_names_out([CATEGORICAL_FEATURE])), categories, rows, unknown)
+
+
+class ScalerParams(NamedTuple):
+    """StandardScaler 的参数，已按特征列顺序对齐（with_mean / with_std 为 False 时分别为 0 / 1）"""
+    mean: np.ndarray
+    scale: np.ndarray
+
+    @classmethod
+    def from_scaler(cls, scaler, columns: Sequence[str]) -> "ScalerParams":
+        n = len(columns)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n)
+        names = getattr(scaler, 'feature_names_in_', None)
+        if names is not None and list(names) != list(columns):
+            order = [list(names).index(col) for col in columns]
+            mean, scale = mean[order], scale[order]
+        return cls(np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64))
+
+
+class FeatureTransformer:
+    """
+    编译后的特征转换器，与 build_features 中
+    "比率特征 -> OneHotEncoder -> reindex(expected_columns, fill_value=0) -> StandardScaler"
+    的结果逐位一致。
+
+    Args:
+        encoder: 训练时拟合的 OneHotEncoder，或其查表形式 CategoryTable
+        expected_columns: 训练时的特征列顺序（feature_columns.pkl）
+        scaler: 训练时拟合的 StandardScaler 或 ScalerParams；为 None 时不做标准化
+    """
+
+    def __init__(self, encoder, expected_columns: Sequence[str], scaler=None):
+        self.columns = list(expected_columns)
+        self.n_features = len(self.columns)
+        position = {col: i for i, col in enumerate(self.columns)}
+
+        # 固定列映射：数值特征 -> 输出列下标（不在 expected_columns 中的特征被丢弃）
+        self._numeric_src = np.array(
+            [i for i, col in enumerate(NUMERICAL_FEATURES) if col in position], dtype=np.intp)
+        self._numeric_dst = np.array(
+            [position[col] for col in NUMERICAL_FEATURES if col in position], dtype=np.intp)
+
+        # 类别 -> (列下标, 取值) 查表：用 encoder 对每个已知类别编码一次得到
+        table = encoder if isinstance(encoder, CategoryTable) else CategoryTable.from_encoder(encoder)
+        self._onehot_dst = np.array(
+            [position[name] for name in table.names if name in position], dtype=np.intp)
+        keep = [j for j, name in enumerate(table.names) if name in position]
+        self._category_values = {
+            category: np.asarray(table.rows[k], dtype=np.float64)[keep]
+            for k, category in enumerate(table.categories)
+        }
+        # 未知类别：handle_unknown='ignore' 时全 0，'error' 时与 encoder 一样报错
+        self._unknown_values = None if table.unknown is None else np.asarray(table.unknown, dtype=np.float64)[keep]
+
+        # 标准化参数按 expected_columns 对齐
+        self._mean = None
+        self._scale = None
+        if scaler is not None:
+            params = scaler if isinstance(scaler, ScalerParams) else ScalerParams.from_scaler(scaler, self.columns)
+            self._mean, self._scale = params
+
+        self._local = threading.local()
+
+    def _category_row(self, category: str) -> np.ndarray:
+        values = self._category_values.get(category)
+        if values is None:
+            if self._unknown_values is None:
+                raise ValueError(f"未知的 {CATEGORICAL_FEATURE} 类别: {category}")
+            values = self._unknown_values
+        return values
+
+    def _scaled(self, x: np.ndarray, out: np.ndarray) -> np.ndarray:
+        if self._mean is None:
+            return x
+        np.subtract(x, self._mean, out=out)
+        np.divide(out, self._scale, out=out)
+        return out
+
+    def _buffers(self):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = (np.zeros((1, self.n_features)), np.zeros((1, self.n_features)))
+            self._local.buffers = buffers
+        return buffers
+
+    def transform_one(self, house) -> np.ndarray:
+        """
+        单条记录转换，返回 shape=(1, n_features) 的数组。
+
+        返回值是当前线程复用的缓冲区，在下一次调用前有效（调用方不应长期持有）。
+        """
+        return self.encode_one(house, self.numeric_one(house))
+
+    def numeric_one(self, house) -> np.ndarray:
+        """transform_one 的第一步：原始数值特征 + 比率特征写入缓冲区"""
+        x, _ = self._buffers()
+        numeric = (
+            house.longitude, house.latitude, house.housing_median_age, house.total_rooms,
+            house.total_bedrooms, house.population, house.households, house.median_income,
+            house.total_rooms / house.households,
+            house.total_bedrooms / house.total_rooms,
+            house.population / house.households,
+        )
+        x[0, self._numeric_dst] = np.take(numeric, self._numeric_src)
+        return x
+
+    def encode_one(self, house, x: np.ndarray) -> np.ndarray:
+        """transform_one 的第二步：类别 one-hot 写入对应列（即 encoder + reindex），再做标准化"""
+        _, scaled = self._buffers()
+        x[0, self._onehot_dst] = self._category_row(house.ocean_proximity)
+        return self._scaled(x, scaled)
+
+    def transform_batch(self, houses: List):
+        """
+        批量转换。
+
+        Returns:
+            (x, valid_mask, errors)：x 只包含有效行；valid_mask 标记原始顺序中的有效行；
+            errors 为 {原始下标: 错误信息}（如除零导致的 inf/nan、未知类别）
+        """
+        return self.transform_arrays(*self.to_arrays(houses))
+
+    @staticmethod
+    def to_arrays(houses: List) -> Tuple[np.ndarray, List[str]]:
+        """记录列表 -> (原始数值矩阵 shape=(n, len(RAW_FEATURES)), 类别列)，即 transform_arrays 的输入"""
+        raw = np.array(
+            [(h.longitude, h.latitude, h.housing_median_age, h.total_rooms,
+              h.total_bedrooms, h.population, h.households, h.median_income) for h in houses],
+            dtype=np.float64
+        ).reshape(len(houses), len(RAW_FEATURES))
+        return raw, [h.ocean_proximity for h in houses]
+
+    def transform_arrays(self, raw: np.ndarray, categories: Sequence[str], allow_missing: bool = False):
+        """
+        列式输入转换：raw 为 shape=(n, len(RAW_FEATURES)) 的数值矩阵，categories 为类别列。
+        返回值同 transform_batch。
+
+        allow_missing=True 时 NaN（缺失值）与训练时一样传给模型，只有 ±inf 视为无效行；
+        用于离线批量打分（原始数据中的 total_bedrooms 存在缺失）
+        """
+        n = raw.shape[0]
+        numeric = np.empty((n, len(NUMERICAL_FEATURES)))
+        numeric[:, :len(RAW_FEATURES)] = raw
+        with np.errstate(divide='ignore', invalid='ignore'):
+            numeric[:, 8] = raw[:, 3] / raw[:, 6]
+            numeric[:, 9] = raw[:, 4] / raw[:, 3]
+            numeric[:, 10] = raw[:, 5] / raw[:, 6]
+
+        # 逐行校验：问题行单独报错，不影响其它行
+        finite = ~np.isinf(numeric) if allow_missing else np.isfinite(numeric)
+        valid_mask = finite.all(axis=1)
+        errors = {}
+        for i in np.flatnonzero(~valid_mask):
+            bad_columns = [NUMERICAL_FEATURES[j] for j in np.flatnonzero(~finite[i])]
+            errors[int(i)] = f"特征计算结果非有限值: {', '.join(bad_columns)}"
+
+        onehot = np.empty((n, len(self._onehot_dst)))
+        for i, category in enumerate(categories):
+            if category is None or category != category:  # None / NaN
+                valid_mask[i] = False
+                errors.setdefault(i, MISSING_CATEGORY_ERROR)
+                onehot[i] = 0
+                continue
+            try:
+                onehot[i] = self._category_row(category)
+            except ValueError as e:
+                valid_mask[i] = False
+                errors.setdefault(i, str(e))
+
+        x = np.zeros((int(valid_mask.sum()), self.n_features))
+        x[:, self._numeric_dst] = numeric[valid_mask][:, self._numeric_src]
+        x[:, self._onehot_dst] = onehot[valid_mask]
+        return self._scaled(x, x), valid_mask, errors
+
+    def to_frame(self, x: np.ndarray) -> "pd.DataFrame":
+        """包装为带列名的 DataFrame（供按列签名校验输入的 pyfunc 模型使用）"""
+        import pandas as pd
+
+        return pd.DataFrame(x, columns=self.columns, copy=False)
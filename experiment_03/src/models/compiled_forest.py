@@ -0,0 +1,259 @@
+"""
+随机森林推理引擎：把 RandomForestRegressor 的所有树展平成连续的 NumPy 数组，
+用向量化的方式同时遍历所有树，单条和批量预测都绕过 sklearn 通用 predict 路径的
+输入校验和线程调度。预测结果与 model.predict 逐位一致。
+"""
+import json
+import os
+import shutil
+import uuid
+import warnings
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+# sklearn 内部把输入转换为 float32 后再与 float64 阈值比较
+INPUT_DTYPE = np.float32
+
+# save / load 时写出的数组（每个数组一个 .npy 文件）
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "missing_go_to_left", "roots", "children")
+META_FILE = "forest.json"
+
+
+class CompiledForest:
+    """
+    展平后的随机森林。
+
+    所有树的节点按顺序拼接，节点下标为全局下标：
+        feature / threshold / left / right / value / missing_go_to_left
+    叶子节点的 left/right 指向自身，遍历 max_depth 步后所有样本都停在叶子上。
+    children 为 left/right 交错排列的数组，children[2 * node + go_right] 即下一个节点。
+    """
+
+    # 批量预测时每次处理的行数，限制 (n_trees, rows) 中间数组的内存
+    CHUNK_ROWS = 4096
+
+    def __init__(self, feature, threshold, left, right, value, missing_go_to_left, roots,
+                 max_depth: int, n_features: int, children=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_go_to_left = missing_go_to_left
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.n_trees = len(roots)
+        self.has_missing = bool(missing_go_to_left.any())
+        self.children = np.stack([left, right], axis=1).ravel() if children is None else children
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompiledForest":
+        """由已训练的 RandomForestRegressor 编译"""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("仅支持单输出回归森林")
+        estimators = getattr(forest, "estimators_", None)
+        if not estimators:
+            raise ValueError(f"不支持的模型类型: {type(forest).__name__}")
+
+        features, thresholds, lefts, rights, values, missing, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0])
+            node_missing = getattr(tree, "missing_go_to_left", None)
+            missing.append(np.zeros(n_nodes, dtype=bool) if node_missing is None
+                           else np.asarray(node_missing, dtype=bool) & ~is_leaf)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            missing_go_to_left=np.concatenate(missing),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=forest.n_features_in_,
+        )
+
+    def compact(self) -> "CompiledForest":
+        """
+        紧凑副本：float32 阈值 + int32 下标。
+        输入在比较前已转换为 float32，阈值向 -inf 取整到 float32 后，
+        对任意 float32 输入 x 有 x <= t64 ⇔ x <= t32，预测结果与原森林逐位一致
+        """
+        if len(self.children) >= np.iinfo(np.int32).max:
+            raise ValueError("节点数超出 int32 范围")
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        children = self.children.astype(np.int32)
+        return CompiledForest(
+            feature=self.feature.astype(np.int32),
+            threshold=threshold,
+            left=children[0::2],
+            right=children[1::2],
+            value=self.value,
+            missing_go_to_left=self.missing_go_to_left,
+            roots=self.roots.astype(np.int32),
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+            children=children,
+        )
+
+    def save(self, directory: str):
+        """
+        保存为一组 .npy 文件。先写入同级临时目录再重命名，多个进程同时保存时
+        只有一个成功，其余丢弃自己的副本，读者不会看到写了一半的目录
+        """
+        tmp_dir = f"{directory}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+        try:
+            for name in ARRAY_NAMES:
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"max_depth": self.max_depth, "n_features": self.n_features, "n_trees": self.n_trees}, f)
+            os.rename(tmp_dir, directory)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CompiledForest":
+        """
+        加载 save 写出的目录。mmap=True 时数组以只读方式映射到内存，
+        同一主机上加载同一目录的进程共享一份物理内存，也不需要反序列化
+        """
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in ARRAY_NAMES}
+        forest = cls(max_depth=meta["max_depth"], n_features=meta["n_features"], **arrays)
+        if forest.n_trees != meta["n_trees"]:
+            raise ValueError(f"森林文件不完整: {directory}")
+        return forest
+
+    def _leaves(self, x: np.ndarray) -> np.ndarray:
+        """返回 shape=(n_trees, n_rows) 的叶子节点下标"""
+        n_rows = x.shape[0]
+        x_flat = x.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * self.n_features)[None, :]
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        check_missing = self.has_missing and bool(np.isnan(x_flat).any())
+        for _ in range(self.max_depth):
+            x_node = x_flat.take(row_offsets + self.feature.take(nodes))
+            # NaN 的比较结果为 False，默认走右侧；missing_go_to_left 的节点改走左侧
+            go_right = ~(x_node <= self.threshold.take(nodes))
+            if check_missing:
+                go_right ^= np.isnan(x_node) & self.missing_go_to_left.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return nodes
+
+    def predict(self, x) -> np.ndarray:
+        x = np.ascontiguousarray(x, dtype=INPUT_DTYPE)
+        if x.ndim != 2 or x.shape[1] != self.n_features:
+            raise ValueError(f"输入应为 (n, {self.n_features}) 的矩阵，实际为 {x.shape}")
+
+        out = np.zeros(x.shape[0], dtype=np.float64)
+        for start in range(0, x.shape[0], self.CHUNK_ROWS):
+            chunk = out[start:start + self.CHUNK_ROWS]
+            # 与 sklearn 相同：按树的顺序逐棵累加，再除以树的数量
+            for tree_values in self.value.take(self._leaves(x[start:start + self.CHUNK_ROWS])):
+                chunk += tree_values
+        out /= self.n_trees
+        return out
+
+    def probe_inputs(self, n_rows: int = 256, seed: int = 0) -> np.ndarray:
+        """用各特征的分裂阈值构造探测样本（覆盖阈值两侧及恰好等于阈值的情况）"""
+        rng = np.random.default_rng(seed)
+        internal = self.left != np.arange(len(self.left))
+        x = np.zeros((n_rows, self.n_features))
+        for j in range(self.n_features):
+            # 含缺失值的分裂可能使用 inf 作为阈值，探测样本只取有限值
+            candidates = self.threshold[internal & (self.feature == j) & np.isfinite(self.threshold)]
+            if len(candidates) == 0:
+                continue
+            picked = rng.choice(candidates, n_rows)
+            x[:, j] = picked + rng.choice([-1e-3, 0.0, 1e-3], n_rows) * np.maximum(np.abs(picked), 1.0)
+        return x
+
+    def matches(self, forest, x=None) -> bool:
+        """校验编译结果与 forest.predict 逐位一致"""
+        x = self.probe_inputs() if x is None else x
+        with warnings.catch_warnings():
+            # forest 以 DataFrame 训练时，传入 ndarray 会提示缺少特征名
+            warnings.simplefilter("ignore", UserWarning)
+            expected = forest.predict(x)
+        return bool(np.array_equal(self.predict(x), expected))
+
+
+def try_compile(forest):
+    """编译并校验与 forest.predict 一致；失败时返回 None，由调用方回退到 forest.predict"""
+    try:
+        compiled = CompiledForest.from_sklearn(forest)
+        if not compiled.matches(forest):
+            print("⚠️ 编译推理引擎校验不一致，回退到 model.predict")
+            return None
+    except Exception as e:
+        print(f"⚠️ 无法编译模型（{e}），回退到 model.predict")
+        return None
+    print(f"✅ 使用编译推理引擎: {compiled.n_trees} 棵树, max_depth={compiled.max_depth}")
+    return compiled
+
+
+@contextmanager
+def shared_lock(directory: str):
+    """
+    同一主机上的进程互斥地准备同一个共享目录：同时启动的 worker 中只有一个编译并写入，
+    其余等待后直接映射。不支持 fcntl 的平台（Windows）上不加锁，并发写入仍由 save 的原子重命名保证
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(directory)), exist_ok=True)
+    with open(f"{directory}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_shared(directory: str) -> Optional[CompiledForest]:
+    """从共享目录以 mmap 方式加载；目录不存在或已损坏时返回 None"""
+    if not os.path.isdir(directory):
+        return None
+    try:
+        forest = CompiledForest.load(directory)
+    except Exception as e:
+        print(f"⚠️ 无法加载共享模型 {directory}（{e}），重新编译")
+        return None
+    print(f"✅ 已映射共享模型: {directory}（{forest.n_trees} 棵树）")
+    return forest
+
+
+def share(compiled: CompiledForest, directory: str) -> CompiledForest:
+    """保存到共享目录并以 mmap 方式重新加载，使当前进程也使用共享的物理页；保存失败时返回原对象"""
+    try:
+        compiled.save(directory)
+        return CompiledForest.load(directory)
+    except Exception as e:
+        print(f"⚠️ 无法写入共享模型 {directory}（{e}），使用进程内副本")
+        return compiled
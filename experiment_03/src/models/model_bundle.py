@@ -0,0 +1,232 @@
+"""
+紧凑模型包：把随机森林和预处理参数写入一个带版本号的文件，加载时整体 mmap，不需要 joblib / sklearn 反序列化。
+
+文件布局（小端）：
+    MAGIC（8 字节） | 头部长度（uint64） | 头部 JSON（UTF-8） | 对齐填充 | 数组数据
+头部 JSON 记录格式版本、特征列顺序、类别列名与类别、各数组的 dtype / shape / 偏移和数据区的 sha256；
+数组按 64 字节对齐，加载时直接以只读视图引用 mmap 的数据，多个进程共享同一份物理页。
+
+森林以 CompiledForest.compact() 的形式保存（float32 阈值 + int32 下标），预测结果与原模型逐位一致；
+encoder 保存为查表形式（CategoryTable），scaler 保存为按列对齐的 mean / scale。
+导出时在 metadata 中记录各来源文件的路径（source_files）和 sha256（sources），
+加载方可据此判断模型包是否仍与导出时使用的训练产物一致。
+
+用法（在 experiment_03 目录下）：
+    python -m src.models.model_bundle --model models/rf_model.pkl --output models/model.bundle
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..features.transformer import CategoryTable, FeatureTransformer, ScalerParams
+from .compiled_forest import CompiledForest
+
+MAGIC = b"HPMODEL\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# 森林中需要保存的数组（left / right 由 children 的切片视图得到）
+FOREST_ARRAYS = ("feature", "threshold", "children", "value", "missing_go_to_left", "roots")
+# 与模型文件一起导出的预处理产物
+ARTIFACT_FILES = ("ocean_encoder.pkl", "scaler.pkl", "feature_columns.pkl")
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def source_files(model_path: str, artifacts_dir: str) -> Dict[str, str]:
+    """模型包的来源文件 {名称: 路径}；模型文件固定记为 "model"，与导出时的文件名无关"""
+    return {"model": model_path, **{name: os.path.join(artifacts_dir, name) for name in ARTIFACT_FILES}}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelBundle:
+    """紧凑模型包：编译后的森林 + 类别查表 + 标准化参数 + 特征列顺序"""
+
+    def __init__(self, forest: CompiledForest, categories: CategoryTable, scaler: Optional[ScalerParams],
+                 columns: List[str], metadata: Optional[dict] = None):
+        self.forest = forest
+        self.categories = categories
+        self.scaler = scaler
+        self.columns = list(columns)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_sklearn(cls, model, encoder, scaler, columns, metadata: Optional[dict] = None) -> "ModelBundle":
+        """由训练产物构造，并校验紧凑森林与 model.predict 逐位一致"""
+        import sklearn
+
+        forest = CompiledForest.from_sklearn(model).compact()
+        if not forest.matches(model):
+            raise ValueError("紧凑森林与原模型的预测结果不一致")
+        metadata = {"model_type": type(model).__name__, "sklearn_version": sklearn.__version__, **(metadata or {})}
+        return cls(forest, CategoryTable.from_encoder(encoder),
+                   ScalerParams.from_scaler(scaler, columns) if scaler is not None else None,
+                   columns, metadata)
+
+    def transformer(self) -> FeatureTransformer:
+        return FeatureTransformer(self.categories, self.columns, scaler=self.scaler)
+
+    def predict(self, x) -> np.ndarray:
+        return self.forest.predict(x)
+
+    def stale_sources(self) -> List[str]:
+        """
+        导出后内容已变化（sha256 不同）的来源文件名称，按导出时记录的路径检查；已不存在的文件跳过。
+        未记录来源的旧模型包无法确认，视为模型文件已变化
+        """
+        paths = self.metadata.get("source_files")
+        if not paths:
+            return ["model"]
+        recorded = self.metadata.get("sources") or {}
+        return [name for name, path in paths.items()
+                if os.path.exists(path) and recorded.get(name) != file_sha256(path)]
+
+    # ------------------------------------------------------------------
+    # 写出
+    # ------------------------------------------------------------------
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {name: getattr(self.forest, name) for name in FOREST_ARRAYS}
+        arrays["category_rows"] = self.categories.rows
+        if self.categories.unknown is not None:
+            arrays["category_unknown"] = self.categories.unknown
+        if self.scaler is not None:
+            arrays["scaler_mean"], arrays["scaler_scale"] = self.scaler
+        return {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    def save(self, path: str):
+        """写入临时文件后 os.replace，读者不会看到写了一半的文件"""
+        arrays = self._arrays()
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        data = bytearray(offset)
+        for name, array in arrays.items():
+            start = layout[name]["offset"]
+            data[start:start + array.nbytes] = array.tobytes()
+
+        header = json.dumps({
+            "format_version": FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "metadata": self.metadata,
+            "forest": {"max_depth": self.forest.max_depth, "n_features": self.forest.n_features,
+                       "n_trees": self.forest.n_trees},
+            "columns": self.columns,
+            "categorical": {"names": self.categories.names, "categories": self.categories.categories},
+            "arrays": layout,
+            "data_sha256": hashlib.sha256(data).hexdigest(),
+        }, ensure_ascii=False).encode("utf-8")
+        prefix = MAGIC + struct.pack("<Q", len(header)) + header
+        prefix += b"\0" * (_align(len(prefix)) - len(prefix))
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as f:
+            f.write(prefix)
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    @staticmethod
+    def read_header(path: str) -> dict:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是模型包文件: {path}")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的模型包版本: {header.get('format_version')}（当前 {FORMAT_VERSION}）")
+        header["data_offset"] = _align(len(MAGIC) + 8 + header_len)
+        return header
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, verify: bool = False) -> "ModelBundle":
+        """
+        加载模型包。mmap=True 时所有数组都是文件的只读视图（不复制）；
+        verify=True 时校验数据区的 sha256（需要读取整个文件）
+        """
+        header = cls.read_header(path)
+        if mmap:
+            buffer = np.memmap(path, dtype=np.uint8, mode="r", offset=header["data_offset"])
+        else:
+            with open(path, "rb") as f:
+                f.seek(header["data_offset"])
+                buffer = np.frombuffer(f.read(), dtype=np.uint8)
+        if verify and hashlib.sha256(buffer).hexdigest() != header["data_sha256"]:
+            raise ValueError(f"模型包数据校验失败: {path}")
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            start = spec["offset"]
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+        children = arrays["children"]
+        forest = CompiledForest(
+            feature=arrays["feature"], threshold=arrays["threshold"],
+            left=children[0::2], right=children[1::2],
+            value=arrays["value"], missing_go_to_left=arrays["missing_go_to_left"], roots=arrays["roots"],
+            max_depth=header["forest"]["max_depth"], n_features=header["forest"]["n_features"],
+            children=children,
+        )
+        categorical = header["categorical"]
+        categories = CategoryTable(categorical["names"], categorical["categories"],
+                                   arrays["category_rows"], arrays.get("category_unknown"))
+        scaler = ScalerParams(arrays["scaler_mean"], arrays["scaler_scale"]) if "scaler_mean" in arrays else None
+        return cls(forest, categories, scaler, header["columns"], header["metadata"])
+
+
+def export_bundle(model_path: str, artifacts_dir: str, output_path: str, metadata: Optional[dict] = None) -> dict:
+    """读取 joblib 训练产物并导出模型包，返回大小对比"""
+    import joblib
+
+    sources = source_files(model_path, artifacts_dir)
+    bundle = ModelBundle.from_sklearn(
+        *(joblib.load(sources[name]) for name in ("model", *ARTIFACT_FILES)),
+        metadata={"source": os.path.basename(model_path),
+                  "source_files": sources,
+                  "sources": {name: file_sha256(path) for name, path in sources.items()},
+                  **(metadata or {})},
+    )
+    bundle.save(output_path)
+    ModelBundle.load(output_path, verify=True)  # 写出后完整读回校验一次
+
+    joblib_bytes = sum(os.path.getsize(path) for path in sources.values())
+    bundle_bytes = os.path.getsize(output_path)
+    print(f"✅ 模型包已导出: {output_path}（{bundle.forest.n_trees} 棵树，"
+          f"{bundle_bytes / 1024:.0f} KB，joblib 文件共 {joblib_bytes / 1024:.0f} KB）")
+    return {"bundle_bytes": bundle_bytes, "joblib_bytes": joblib_bytes}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导出紧凑模型包（可 mmap 加载）")
+    parser.add_argument("--model", default="models/rf_model.pkl")
+    parser.add_argument("--artifacts_dir", default="models", help="ocean_encoder.pkl / scaler.pkl / feature_columns.pkl 所在目录")
+    parser.add_argument("--output", default="models/model.bundle")
+    args = parser.parse_args(argv)
+    return export_bundle(args.model, args.artifacts_dir, args.output)
+
+
+if __name__ == "__main__":
+    main()
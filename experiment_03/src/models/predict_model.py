@@ -0,0 +1,213 @@
+"""
+离线批量打分：分块读取 CSV / Parquet，在进程池中并行预测，按输入顺序写出结果。
+
+使用与 app_local 相同的本地 artifact（rf_model.pkl、ocean_encoder.pkl、scaler.pkl、feature_columns.pkl），
+输出保留输入的全部列，并追加 predicted_price 和 error 两列（无效行 predicted_price 为空）。
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ..features.transformer import FeatureTransformer, RAW_FEATURES, CATEGORICAL_FEATURE, MISSING_CATEGORY_ERROR
+from .compiled_forest import try_compile
+
+INPUT_COLUMNS = RAW_FEATURES + [CATEGORICAL_FEATURE]
+
+
+class BatchScorer:
+    """一个进程内的打分器：特征转换 + 推理（compiled 引擎可用时绕过 sklearn 的 predict）"""
+
+    def __init__(self, model, encoder, scaler, expected_columns, engine: str = "compiled"):
+        self.model = model
+        self.transformer = FeatureTransformer(encoder, expected_columns, scaler=scaler)
+        compiled = try_compile(model) if engine == "compiled" else None
+        if compiled is not None:
+            self._predict = compiled.predict
+        else:
+            self._predict = lambda x: model.predict(self.transformer.to_frame(x))
+
+    @classmethod
+    def load(cls, model_path: str, artifacts_dir: str, engine: str = "compiled") -> "BatchScorer":
+        return cls(
+            joblib.load(model_path),
+            joblib.load(os.path.join(artifacts_dir, "ocean_encoder.pkl")),
+            joblib.load(os.path.join(artifacts_dir, "scaler.pkl")),
+            joblib.load(os.path.join(artifacts_dir, "feature_columns.pkl")),
+            engine=engine,
+        )
+
+    def score(self, raw: np.ndarray, categories) -> Tuple[np.ndarray, Dict[int, str]]:
+        """返回 (predictions, errors)：predictions 与输入等长，无效行为 NaN"""
+        x, valid_mask, errors = self.transformer.transform_arrays(raw, categories, allow_missing=True)
+        predictions = np.full(len(valid_mask), np.nan)
+        if len(x) > 0:
+            predictions[valid_mask] = self._predict(x)
+        return predictions, errors
+
+
+# ======================================
+# 🧵 进程池 worker
+# ======================================
+_scorer: Optional[BatchScorer] = None
+
+
+def _init_worker(model_path: str, artifacts_dir: str, engine: str):
+    """每个 worker 进程只加载一次模型和依赖"""
+    global _scorer
+    _scorer = BatchScorer.load(model_path, artifacts_dir, engine)
+
+
+def _score_chunk(raw: np.ndarray, categories: list):
+    return _scorer.score(raw, categories)
+
+
+# ======================================
+# 📥 读取 / 📤 写出
+# ======================================
+def _file_format(path: str) -> str:
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def read_chunks(path: str, chunk_size: int) -> Tuple[Iterator[pd.DataFrame], Optional[int]]:
+    """分块读取输入文件，返回 (分块迭代器, 总行数)；CSV 不预先统计行数"""
+    if _file_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        batches = parquet_file.iter_batches(batch_size=chunk_size)
+        return (batch.to_pandas() for batch in batches), parquet_file.metadata.num_rows
+    return pd.read_csv(path, chunksize=chunk_size), None
+
+
+class ChunkWriter:
+    """按顺序追加写出分块：CSV 直接追加，Parquet 每个分块写为一个 row group"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = _file_format(path)
+        self._writer = None
+        self._first = True
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, chunk: pd.DataFrame):
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            chunk.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _split_inputs(chunk: pd.DataFrame):
+    missing = [col for col in INPUT_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"输入文件缺少列: {missing}")
+    raw = chunk[RAW_FEATURES].to_numpy(dtype=np.float64)
+    # 缺失的类别保留为 None，由转换器报告为无效行（不当作未知类别打分）
+    categories = chunk[CATEGORICAL_FEATURE].astype(object).where(chunk[CATEGORICAL_FEATURE].notna(), None).tolist()
+    return raw, categories
+
+
+def _attach_results(chunk: pd.DataFrame, predictions: np.ndarray, errors: Dict[int, str]) -> pd.DataFrame:
+    out = chunk.reset_index(drop=True)
+    out["predicted_price"] = predictions.round(2)
+    error_column = pd.Series(None, index=out.index, dtype=object)
+    for i, message in errors.items():
+        error_column.iat[i] = message
+    out["error"] = error_column
+    return out
+
+
+# ======================================
+# 🚀 批量打分
+# ======================================
+def score_file(input_path: str, output_path: str, model_path: str = "models/rf_model.pkl",
+               artifacts_dir: str = "models", chunk_size: int = 100_000, workers: Optional[int] = None,
+               engine: str = "compiled", progress_interval: float = 2.0) -> dict:
+    """
+    打分入口。workers=0 时在当前进程中执行（不启动进程池）。
+    同时提交的分块数不超过 2 * workers，结果按输入顺序写出，内存占用与文件大小无关
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    print(f"📦 批量打分: {input_path} -> {output_path}（workers={workers}, chunk_size={chunk_size}）")
+
+    chunks, total_rows = read_chunks(input_path, chunk_size)
+    writer = ChunkWriter(output_path)
+    start = last_report = time.perf_counter()
+    rows = failed = missing_category = 0
+
+    def report(final: bool = False):
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        percent = f"（{rows / total_rows:.1%}）" if total_rows else ""
+        icon = "✅" if final else "⏳"
+        missing = f"（其中缺少 {CATEGORICAL_FEATURE} {missing_category:,} 行）" if missing_category else ""
+        print(f"{icon} 已处理 {rows:,} 行{percent} | {rate:,.0f} 行/秒 | 失败 {failed:,} 行{missing} | 用时 {elapsed:.1f}s")
+
+    def emit(chunk, result):
+        nonlocal rows, failed, missing_category, last_report
+        predictions, errors = result
+        writer.write(_attach_results(chunk, predictions, errors))
+        rows += len(chunk)
+        failed += len(errors)
+        missing_category += sum(message == MISSING_CATEGORY_ERROR for message in errors.values())
+        if time.perf_counter() - last_report >= progress_interval:
+            last_report = time.perf_counter()
+            report()
+
+    try:
+        if workers == 0:
+            scorer = BatchScorer.load(model_path, artifacts_dir, engine)
+            for chunk in chunks:
+                emit(chunk, scorer.score(*_split_inputs(chunk)))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, artifacts_dir, engine)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((chunk, pool.submit(_score_chunk, *_split_inputs(chunk))))
+                    # 队首完成后按顺序写出；限制在途分块数，避免读取速度快于打分时占满内存
+                    while pending and (len(pending) >= 2 * workers or pending[0][1].done()):
+                        head, future = pending.popleft()
+                        emit(head, future.result())
+                while pending:
+                    head, future = pending.popleft()
+                    emit(head, future.result())
+    finally:
+        writer.close()
+
+    report(final=True)
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "failed": failed, "missing_category": missing_category, "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线批量打分（CSV / Parquet）")
+    parser.add_argument("input", help="输入文件（.csv / .parquet），需包含原始特征列和 ocean_proximity")
+    parser.add_argument("output", help="输出文件（.csv / .parquet）")
+    parser.add_argument("--model", default="models/rf_model.pkl")
+    parser.add_argument("--artifacts_dir", default="models", help="ocean_encoder.pkl / scaler.pkl / feature_columns.pkl 所在目录")
+    parser.add_argument("--chunk_size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数；0 表示不使用进程池")
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled")
+    args = parser.parse_args(argv)
+
+    return score_file(args.input, args.output, args.model, args.artifacts_dir,
+                      args.chunk_size, args.workers, args.engine)
@@ -1,70 +1,336 @@
 """
 训练随机森林回归模型
+
+用法（在 experiment_03 目录下）：
+    python -m src.models.train_model --n_estimators 100 --max_depth 5
+    python -m src.models.train_model --search --n_estimators 150 --budget_cpu_seconds 600
 """
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import train_test_split
 import mlflow
 from mlflow.models import infer_signature
-import pandas as pd
+from itertools import product
+import numpy as np
 import joblib
 import argparse
+import copy
+import json
+import math
 import os
+import sys
+import time
+
+if __package__:
+    from ..data.processed_data import load_processed, load_target
+else:
+    # 直接以脚本运行（python src/models/train_model.py ...）时没有包上下文，把 experiment_03 加入搜索路径后按绝对路径导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from src.data.processed_data import load_processed, load_target
 
 # 配置 MLflow
 TRACKING_URI = "http://localhost:5555"
 EXPERIMENT_NAME = "housing-price-experiment"
 RUN_NAME = "housing_price_rf_test"
+SEARCH_RUN_NAME = "housing_price_rf_search"
+SEARCH_BEST_RUN_NAME = "housing_price_rf_search_best"  # 搜索最优模型的 Run，不与按 n/d 查找的网格训练 Run 混淆
+
 
-mlflow.set_tracking_uri(TRACKING_URI)
-mlflow.set_experiment(EXPERIMENT_NAME)
+def configure_mlflow():
+    """设置 Tracking URI 和实验（训练时调用，导入本模块不连接 Tracking Server）"""
+    mlflow.set_tracking_uri(TRACKING_URI)
+    mlflow.set_experiment(EXPERIMENT_NAME)
 
-def train_model(n_estimators=100, max_depth=5):
-    print("🧠 正在训练模型...")
 
-    params = {
+def build_params(n_estimators, max_depth, **overrides):
+    """默认训练参数；overrides 覆盖其余超参数（如搜索时的 min_samples_leaf / max_features）"""
+    return {
         "n_estimators": n_estimators,
         "max_depth": max_depth,
         "min_samples_split": 10,
         "min_samples_leaf": 4,
         "bootstrap": True,
         "oob_score": False,
-        "random_state": 42
+        "random_state": 42,
+        **overrides
     }
 
-    x_train = pd.read_csv("data/processed/x_train.csv")
-    y_train = pd.read_csv("data/processed/y_train.csv").values.ravel()
 
-    model = RandomForestRegressor(**params)
-    model.fit(x_train, y_train)
+def serving_signature(model, x_train):
+    """
+    返回 (签名, 输入样例)，输入按 float64 推断：服务端以 float64 DataFrame 调用 pyfunc 模型，
+    特征以 float32 保存时若按原 dtype 推断签名，schema 校验会拒绝所有预测请求
+    """
+    x_serving = x_train.astype("float64")
+    return infer_signature(x_serving, model.predict(x_serving)), x_serving[:1]
+
+
+def save_and_log(model, params, x_train, model_filename=None, run_name=RUN_NAME, tags=None):
+    """
+    保存模型文件并在 MLflow 中记录一个训练 Run，返回 run_id。
+    默认按 n/d 命名模型文件、使用 RUN_NAME（evaluate 按这两个参数查找）；其他来源的模型需传入自己的文件名和 Run 名称
+    """
+    n_estimators, max_depth = params["n_estimators"], params["max_depth"]
 
     # 保存模型
     os.makedirs("models", exist_ok=True)
-    model_filename = f"rf_model_n{n_estimators}_d{max_depth}.pkl" # 按参数命名
+    model_filename = model_filename or f"rf_model_n{n_estimators}_d{max_depth}.pkl" # 按参数命名
     model_path = os.path.join("models", model_filename)
     joblib.dump(model, model_path)
     print(f"✅ 模型已保存至 models/{model_filename}")
 
-    with mlflow.start_run(run_name=RUN_NAME) as run: # 获取 run_id，便于后续关联
+    with mlflow.start_run(run_name=run_name) as run: # 获取 run_id，便于后续关联
         # 1.记录模型训练参数
         mlflow.log_params(params)
+        if tags:
+            mlflow.set_tags(tags)
 
         # 2.记录其他关键资产作为 artifacts
         mlflow.log_artifact("models/ocean_encoder.pkl")
         mlflow.log_artifact("models/scaler.pkl")
         mlflow.log_artifact("models/feature_columns.pkl")
 
-        # 调用 infer_signature 函数，生产签名对象
-        signature = infer_signature(x_train, model.predict(x_train))
+        # 生成签名对象和输入样例（按服务端的 float64 输入）
+        signature, input_example = serving_signature(model, x_train)
         # 3.记录模型
         artifact_path = f"rf_housing_price_n{n_estimators}_d{max_depth}"  # 当前实验 run 记录列表中Models字段值
         mlflow.sklearn.log_model(
-            model, name=artifact_path, signature=signature, input_example=x_train[:1]  # 提供一个输入样例
+            model, name=artifact_path, signature=signature, input_example=input_example  # 提供一个输入样例
         )
-        print(f"✅ MLflow Run ID: {mlflow.active_run().info.run_id}")
+        print(f"✅ MLflow Run ID: {run.info.run_id}")
+    return run.info.run_id
+
+
+def train_model(n_estimators=100, max_depth=5, x_train=None, y_train=None, n_jobs=None):
+    """
+    训练并记录到 MLflow，返回 (model, run_id)。
+    x_train / y_train 为空时从 data/processed 读取；参数扫描时由调用方传入共享的数据
+    """
+    print(f"🧠 正在训练模型: n_estimators={n_estimators}, max_depth={max_depth}")
+    configure_mlflow()
+    params = build_params(n_estimators, max_depth)
+
+    if x_train is None:
+        x_train = load_processed("x_train")
+        y_train = load_target("y_train")
+
+    model = RandomForestRegressor(**params, n_jobs=n_jobs)  # n_jobs 不影响结果，不记录为参数
+    model.fit(x_train, y_train)
+    return model, save_and_log(model, params, x_train)
+
+
+def grow_forest(n_estimators_list, max_depth, x_train, y_train, n_jobs=None):
+    """
+    warm_start 逐步增加树的数量，按 n_estimators 升序依次产出 (n_estimators, model)。
+    sklearn 在 warm_start 时会跳过已有树消耗的随机种子，因此前 n 棵树与从头训练 n_estimators=n 的森林逐位一致；
+    产出的 model 是独立的快照（warm_start=False），之后继续增长不会影响它
+    """
+    forest = RandomForestRegressor(**build_params(1, max_depth), n_jobs=n_jobs, warm_start=True)
+    for n_estimators in sorted(set(n_estimators_list)):
+        forest.set_params(n_estimators=n_estimators).fit(x_train, y_train)
+        snapshot = copy.copy(forest)
+        snapshot.estimators_ = list(forest.estimators_)
+        snapshot.set_params(warm_start=False)
+        yield n_estimators, snapshot
+
+
+def train_model_warm_start(n_estimators_list, max_depth=5, x_train=None, y_train=None, n_jobs=None):
+    """
+    同一 max_depth 的多个 n_estimators 共用一个逐步增长的森林，每个规模照常保存模型文件并记录 MLflow Run。
+    依次产出 (n_estimators, model, run_id)；结果与逐个调用 train_model 相同，但只训练最大规模所需的树
+    """
+    configure_mlflow()
+    if x_train is None:
+        x_train = load_processed("x_train")
+        y_train = load_target("y_train")
+
+    for n_estimators, model in grow_forest(n_estimators_list, max_depth, x_train, y_train, n_jobs):
+        print(f"🧠 已增长到: n_estimators={n_estimators}, max_depth={max_depth}（warm start）")
+        yield n_estimators, model, save_and_log(model, build_params(n_estimators, max_depth), x_train)
+
+
+# ======================================
+# 🪜 逐次减半搜索（successive halving）
+# ======================================
+# 默认搜索空间：5 × 4 × 3 = 60 组候选
+SEARCH_SPACE = {
+    "max_depth": [5, 7, 9, 12, 16],
+    "min_samples_leaf": [1, 2, 4, 8],
+    "max_features": [1.0, 0.5, 0.33],
+}
+
+
+def candidate_grid(space):
+    """搜索空间 {参数: [取值]} 展开为候选参数列表"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in product(*(space[name] for name in names))]
+
+
+def rung_schedule(n_candidates, n_samples, max_n_estimators, eta=3, min_samples=200, min_n_estimators=5):
+    """
+    每一级的 (训练样本数, 树的数量)。级数使最后一级约剩 1~eta 个候选；
+    每升一级资源乘以 eta，最后一级使用全部样本和 max_n_estimators 棵树
+    """
+    if eta < 2:
+        raise ValueError(f"eta 必须 >= 2，当前为 {eta}")
+    rungs = int(math.log(max(n_candidates, 1), eta) + 1e-9) + 1
+    schedule = []
+    for rung in range(rungs):
+        fraction = eta ** (rung - rungs + 1)
+        schedule.append((
+            min(n_samples, max(min_samples, int(n_samples * fraction))),
+            min(max_n_estimators, max(min_n_estimators, int(round(max_n_estimators * fraction)))),
+        ))
+    return schedule
+
+
+def _take(data, index):
+    return data.iloc[index] if hasattr(data, "iloc") else data[index]
+
+
+def successive_halving(candidates, x_train, y_train, x_val, y_val, max_n_estimators=150, eta=3,
+                       budget_cpu_seconds=None, min_samples=200, min_n_estimators=5, n_jobs=None,
+                       seed=42, on_rung=None, max_depth=5):
+    """
+    逐次减半：全部候选先用少量样本、少量树训练，按验证集 RMSE 只保留前 1/eta 进入下一级，
+    下一级的样本数和树的数量乘以 eta，直到最后一级（全部样本、max_n_estimators 棵树）。
+
+    各级的样本是同一个随机排列的前 n 行（嵌套子样本）；进入下一级的候选按上一级名次依次训练。
+    CPU 时间（process_time，包含全部训练线程）不超过 budget_cpu_seconds：每次训练前按本级已完成训练的平均耗时
+    （本级尚无记录时按上一级的平均耗时乘以资源增长倍数）估算，预计超出预算时不再训练新的候选，
+    以已到达的最高一级的结果决出最优（因此最后一级可能只训练部分晋级的候选）。估算有误差，预算是近似上限。on_rung(rung, results) 在每一级结束后调用（用于记录 MLflow）。
+    候选只需包含要搜索的参数：未包含 max_depth 时使用参数 max_depth，其余参数使用 build_params 的默认值。
+
+    返回 {"best": 最优候选的实际参数（含 max_depth）, "best_result": 其最后一次记录, "history": 全部训练记录,
+          "schedule": 各级资源, "cpu_seconds": 累计 CPU 秒数, "budget_exhausted": 是否因预算提前结束}
+    """
+    schedule = rung_schedule(len(candidates), len(x_train), max_n_estimators, eta, min_samples, min_n_estimators)
+    candidates = [{"max_depth": max_depth, **candidate} for candidate in candidates]
+    order = np.random.default_rng(seed).permutation(len(x_train))
+    alive = list(range(len(candidates)))
+    history, best, used, exhausted = [], None, 0.0, False
+    previous_cost = 0.0  # 上一级每次训练的平均 CPU 秒数，已按本级资源放大
+
+    for rung, (n_samples, n_estimators) in enumerate(schedule):
+        x_rung, y_rung = _take(x_train, order[:n_samples]), _take(y_train, order[:n_samples])
+        results = []
+        for index in alive:
+            # 成本估算：本级已训练过的按本级平均值，否则按上一级放大后的平均值
+            estimate = sum(row["cpu_seconds"] for row in results) / len(results) if results else previous_cost
+            if budget_cpu_seconds is not None and used + estimate > budget_cpu_seconds:
+                exhausted = True
+                break
+            start = time.process_time()
+            model = RandomForestRegressor(**build_params(n_estimators, **candidates[index]), n_jobs=n_jobs)
+            model.fit(x_rung, y_rung)
+            rmse = float(np.sqrt(mean_squared_error(y_val, model.predict(x_val))))
+            cpu_seconds = time.process_time() - start
+            used += cpu_seconds
+            results.append({"rung": rung, "candidate": index, **candidates[index], "n_samples": n_samples,
+                            "n_estimators": n_estimators, "val_rmse": rmse, "cpu_seconds": cpu_seconds})
+        if not results:
+            break
+
+        results.sort(key=lambda row: row["val_rmse"])
+        last = rung == len(schedule) - 1 or exhausted
+        survivors = [row["candidate"] for row in results[:max(1, math.ceil(len(alive) / eta))]]
+        for row in results:
+            row["promoted"] = not last and row["candidate"] in survivors
+        history.extend(results)
+        best = results[0]
+        if on_rung is not None:
+            on_rung(rung, results)
+        if last:
+            break
+        next_samples, next_estimators = schedule[rung + 1]
+        previous_cost = (sum(row["cpu_seconds"] for row in results) / len(results)
+                         * next_samples / n_samples * next_estimators / n_estimators)
+        alive = survivors
+
+    if best is None:
+        raise RuntimeError("CPU 预算不足以训练任何候选")
+    return {"best": candidates[best["candidate"]], "best_result": best, "history": history, "schedule": schedule,
+            "cpu_seconds": used, "budget_exhausted": exhausted}
+
+
+def search_model(max_n_estimators=150, max_depth=5, eta=3, budget_cpu_seconds=600.0, space=None, val_size=0.2,
+                 n_jobs=None):
+    """
+    在训练集中划出验证集做逐次减半搜索（测试集不参与选择），每一级的每个候选记录为搜索 Run 下的嵌套 Run；
+    搜索空间未包含 max_depth 时固定使用参数 max_depth。
+    搜索结束后用最优参数在全部训练数据上训练 max_n_estimators 棵树（这次训练不计入 CPU 预算，耗时另行记录），
+    保存为 models/rf_model_search_<搜索 Run ID 前 8 位>.pkl 并记录为 SEARCH_BEST_RUN_NAME Run，
+    不覆盖按 n/d 命名的网格训练模型。返回 (model, run_id, result)
+    """
+    configure_mlflow()
+    space = space or SEARCH_SPACE
+    candidates = candidate_grid(space)
+    x_train = load_processed("x_train")
+    y_train = load_target("y_train")
+    x_fit, x_val, y_fit, y_val = train_test_split(x_train, y_train, test_size=val_size, random_state=42)
+    schedule = rung_schedule(len(candidates), len(x_fit), max_n_estimators, eta)
+    print(f"🪜 逐次减半搜索: {len(candidates)} 组候选，{len(schedule)} 级 "
+          f"{' -> '.join(f'{n}行/{t}棵' for n, t in schedule)}，CPU 预算 {budget_cpu_seconds}s")
+
+    def log_rung(rung, results):
+        for row in results:
+            with mlflow.start_run(run_name=f"rung{rung}_c{row['candidate']}", nested=True):
+                keys = dict.fromkeys(("max_depth", *space, "n_estimators", "n_samples", "rung", "candidate"))
+                mlflow.log_params({key: row[key] for key in keys})
+                mlflow.log_metrics({"val_rmse": row["val_rmse"], "cpu_seconds": row["cpu_seconds"]})
+                mlflow.set_tag("promoted", str(row["promoted"]).lower())
+        promoted = sum(row["promoted"] for row in results)
+        print(f"✅ 第 {rung} 级: 训练 {len(results)} 组，晋级 {promoted} 组 | "
+              f"最优 val RMSE: {results[0]['val_rmse']:.2f} ({results[0]['cpu_seconds']:.1f}s CPU)")
+
+    with mlflow.start_run(run_name=SEARCH_RUN_NAME) as search_run:
+        mlflow.log_params({"strategy": "successive_halving", "eta": eta, "budget_cpu_seconds": budget_cpu_seconds,
+                           "n_candidates": len(candidates), "max_n_estimators": max_n_estimators,
+                           "max_depth": max_depth, "val_size": val_size, "search_space": json.dumps(space)})
+        result = successive_halving(candidates, x_fit, y_fit, x_val, y_val, max_n_estimators, eta,
+                                    budget_cpu_seconds, n_jobs=n_jobs, on_rung=log_rung, max_depth=max_depth)
+        mlflow.log_params({f"best_{key}": value for key, value in result["best"].items()})
+        mlflow.log_metrics({"best_val_rmse": result["best_result"]["val_rmse"],
+                            "search_cpu_seconds": result["cpu_seconds"],
+                            "rungs_completed": result["best_result"]["rung"] + 1,
+                            "models_trained": len(result["history"])})
+        mlflow.set_tag("budget_exhausted", str(result["budget_exhausted"]).lower())
+        mlflow.log_dict({"schedule": result["schedule"], "history": result["history"]}, "successive_halving.json")
+
+    exhausted = "（CPU 预算已用完，提前结束）" if result["budget_exhausted"] else ""
+    print(f"🏆 最优参数: {result['best']} | val RMSE: {result['best_result']['val_rmse']:.2f} | "
+          f"共训练 {len(result['history'])} 个模型，CPU {result['cpu_seconds']:.1f}s{exhausted}")
+
+    search_id = search_run.info.run_id
+    params = build_params(max_n_estimators, **result["best"])
+    print(f"🧠 正在用全部训练数据训练最终模型: {params}")
+    start = time.process_time()
+    model = RandomForestRegressor(**params, n_jobs=n_jobs).fit(x_train, y_train)
+    refit_cpu_seconds = time.process_time() - start
+    print(f"✅ 最终模型训练完成，CPU {refit_cpu_seconds:.1f}s（不计入搜索预算）")
+    run_id = save_and_log(model, params, x_train, model_filename=f"rf_model_search_{search_id[:8]}.pkl",
+                          run_name=SEARCH_BEST_RUN_NAME, tags={"search_run_id": search_id})
+    client = mlflow.MlflowClient()
+    client.set_tag(search_id, "best_run_id", run_id)
+    client.log_metric(search_id, "refit_cpu_seconds", refit_cpu_seconds)
+    return model, run_id, result
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument("--n_estimators", type=int, default=100)
-    parser.add_argument("--max_depth", type=int, default=5)
+    parser.add_argument("--n_estimators", type=int, default=100, help="搜索模式下为最后一级和最终模型的树的数量")
+    parser.add_argument("--max_depth", type=int, default=5, help="搜索模式下为搜索空间未包含 max_depth 时的取值")
+    parser.add_argument("--search", action="store_true", help="逐次减半搜索 SEARCH_SPACE（或 --search_space）")
+    parser.add_argument("--search_space", type=json.loads, default=None, help='JSON，如 {"max_depth": [5, 9]}')
+    parser.add_argument("--eta", type=int, default=3, help="每级保留前 1/eta，资源乘以 eta")
+    parser.add_argument("--budget_cpu_seconds", type=float, default=600.0,
+                        help="逐次减半各级训练的 CPU 时间预算（按已完成训练的耗时估算，预计超出时停止，为近似上限）；"
+                             "最后用最优参数在全部训练数据上的重新训练不计入预算")
+    parser.add_argument("--n_jobs", type=int, default=None)
     args = parser.parse_args()
 
-    train_model(args.n_estimators, args.max_depth)
\ No newline at end of file
+    if args.search:
+        search_model(args.n_estimators, args.max_depth, args.eta, args.budget_cpu_seconds, args.search_space,
+                     n_jobs=args.n_jobs)
+    else:
+        train_model(args.n_estimators, args.max_depth, n_jobs=args.n_jobs)
\ No newline at end of file
@@ -0,0 +1,361 @@
+"""
+压测 / 延迟基准：启动 app_fast（使用本地 sqlite MLflow 替身）或 app_local（直接读 models/），
+以指定并发驱动 /predict、/predict/batch、/predict/stream，
+统计吞吐、p50/p95/p99 延迟、服务进程 RSS 和 CPU 时间，结果保存为 reports/ 下的 JSON，便于跨提交对比。
+
+用法（在 experiment_03 目录下）：
+    python -m src.scripts.benchmark --target fast --concurrency 1,8,32 --duration 10
+    python -m src.scripts.benchmark --target local --scenarios predict
+    python -m src.scripts.benchmark --target fast --compare reports/benchmark_fast_xxx.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]  # experiment_03
+
+# 与 app_fast 中的注册模型名和别名一致
+MODEL_NAME = "HousingPriceModel"
+MODEL_ALIAS = "production_v1"
+
+EXAMPLE_ROW = {
+    "longitude": -122.23, "latitude": 37.88, "housing_median_age": 15, "total_rooms": 5612,
+    "total_bedrooms": 1283, "population": 1015, "households": 478, "median_income": 1.4936,
+    "ocean_proximity": "<1H OCEAN"
+}
+
+# 各目标支持的场景
+TARGET_SCENARIOS = {
+    "fast": ("predict", "batch", "stream"),
+    "local": ("predict",),
+}
+
+
+# ======================================
+# 📥 请求数据
+# ======================================
+def sample_rows(data_path: str, n: int, seed: int = 0) -> List[dict]:
+    """从原始数据中抽样请求体（去掉标签列和含缺失值的行）；数据不存在时使用示例记录"""
+    path = PROJECT_DIR / data_path
+    if not path.exists():
+        print(f"⚠️ 未找到 {data_path}，使用示例记录")
+        return [EXAMPLE_ROW]
+    import pandas as pd
+    df = pd.read_csv(path).drop(columns=["median_house_value"], errors="ignore").dropna()
+    df = df.sample(n=min(n, len(df)), random_state=seed)
+    return df.to_dict(orient="records")
+
+
+# ======================================
+# 🗄️ MLflow 替身
+# ======================================
+def setup_registry_stand_in(workdir: Path, model_path: str, artifacts_dir: str) -> str:
+    """
+    在 workdir 中创建 sqlite Tracking Store，按 train_model.py 的布局登记一个 run
+    （根目录下的 encoder / scaler / feature_columns + 模型），注册模型并设置别名。
+    返回 tracking URI
+    """
+    import joblib
+    import mlflow
+
+    tracking_uri = f"sqlite:///{workdir / 'mlflow.db'}"
+    mlflow.set_tracking_uri(tracking_uri)
+    experiment_id = mlflow.create_experiment("benchmark", artifact_location=(workdir / "artifacts").as_uri())
+    model = joblib.load(PROJECT_DIR / model_path)
+    with mlflow.start_run(experiment_id=experiment_id):
+        for name in ("ocean_encoder.pkl", "scaler.pkl", "feature_columns.pkl"):
+            mlflow.log_artifact(str(PROJECT_DIR / artifacts_dir / name))
+        # 本地自产模型，使用 cloudpickle 避免 skops 的类型白名单校验
+        mlflow.sklearn.log_model(model, name="model", registered_model_name=MODEL_NAME,
+                                 serialization_format="cloudpickle")
+    client = mlflow.MlflowClient()
+    version = max(int(mv.version) for mv in client.search_model_versions(f"name='{MODEL_NAME}'"))
+    client.set_registered_model_alias(MODEL_NAME, MODEL_ALIAS, str(version))
+    return tracking_uri
+
+
+# ======================================
+# 🖥️ 服务进程
+# ======================================
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_process_stats(pid: int) -> Optional[dict]:
+    """从 /proc 读取 RSS、峰值 RSS 和 CPU 时间（非 Linux 返回 None）"""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "rss_mb": int(fields["VmRSS"].split()[0]) / 1024,
+        "peak_rss_mb": int(fields["VmHWM"].split()[0]) / 1024,
+        "cpu_seconds": (int(stat[11]) + int(stat[12])) / ticks,  # utime + stime
+    }
+
+
+# app_fast 在后台加载并预热模型，/ready 返回 200 之后才计时；app_local 导入时即完成加载
+READY_PATHS = {"fast": "/ready", "local": "/openapi.json"}
+
+
+@contextmanager
+def run_server(target: str, port: int, env: Dict[str, str], startup_timeout: float = 120):
+    """以子进程方式启动 uvicorn，等待服务就绪（app_fast 为 /ready，app_local 为 /openapi.json）后返回进程对象"""
+    command = [sys.executable, "-m", "uvicorn", f"src.app_{target}:app",
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + startup_timeout
+        start = time.perf_counter()
+        while True:
+            if process.poll() is not None:
+                log.seek(0)
+                raise RuntimeError(f"服务启动失败:\n{log.read().decode(errors='replace')[-4000:]}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{READY_PATHS[target]}", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"服务 {startup_timeout}s 内未就绪")
+            time.sleep(0.1)
+        process.startup_seconds = time.perf_counter() - start
+        print(f"✅ app_{target} 已启动（pid={process.pid}，{process.startup_seconds:.1f}s）")
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+
+# ======================================
+# 🚦 压测
+# ======================================
+def build_request(scenario: str, rows: List[dict], i: int, batch_size: int):
+    """返回 (path, 请求参数, 本次请求包含的记录数)"""
+    if scenario == "predict":
+        return "/predict", {"json": rows[i % len(rows)]}, 1
+    records = [rows[(i * batch_size + k) % len(rows)] for k in range(batch_size)]
+    if scenario == "batch":
+        return "/predict/batch", {"json": records}, batch_size
+    body = "\n".join(json.dumps(record) for record in records)
+    return "/predict/stream", {"content": body}, batch_size
+
+
+async def drive(base_url: str, scenario: str, concurrency: int, duration: float, rows: List[dict],
+                batch_size: int, headers: dict) -> dict:
+    """concurrency 个协程在 duration 秒内循环发送请求（闭环压测）"""
+    latencies, statuses = [], Counter()
+    records = 0
+    counter = iter(range(sys.maxsize))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal records
+            while time.perf_counter() < deadline:
+                path, kwargs, n_records = build_request(scenario, rows, next(counter), batch_size)
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, **kwargs)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+                if status == 200:
+                    records += n_records
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    lat_ms = np.asarray(latencies) * 1000
+    ok = statuses.get(200, 0)
+    return {
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 1),
+        "records_per_second": round(records / elapsed, 1),
+        "latency_ms": {
+            "mean": round(float(lat_ms.mean()), 3),
+            "p50": round(float(np.percentile(lat_ms, 50)), 3),
+            "p95": round(float(np.percentile(lat_ms, 95)), 3),
+            "p99": round(float(np.percentile(lat_ms, 99)), 3),
+            "max": round(float(lat_ms.max()), 3),
+        } if len(lat_ms) else {},
+    }
+
+
+async def sample_rss(pid: int, peak: dict, interval: float = 0.2):
+    while True:
+        stats = read_process_stats(pid)
+        if stats is not None:
+            peak["rss_mb"] = max(peak.get("rss_mb", 0.0), stats["rss_mb"])
+        await asyncio.sleep(interval)
+
+
+async def run_case(base_url: str, pid: int, scenario: str, concurrency: int, args, rows, headers) -> dict:
+    # 预热：触发惰性初始化、建立连接，不计入结果
+    await drive(base_url, scenario, concurrency, args.warmup, rows, args.batch_size, headers)
+
+    before = read_process_stats(pid)
+    peak = {}
+    sampler = asyncio.create_task(sample_rss(pid, peak))
+    try:
+        result = await drive(base_url, scenario, concurrency, args.duration, rows, args.batch_size, headers)
+    finally:
+        sampler.cancel()
+    after = read_process_stats(pid)
+
+    result.update({"scenario": scenario, "concurrency": concurrency,
+                   "batch_size": args.batch_size if scenario != "predict" else 1})
+    if before is not None and after is not None:
+        cpu = after["cpu_seconds"] - before["cpu_seconds"]
+        result["server"] = {
+            "rss_mb": round(after["rss_mb"], 1),
+            "peak_rss_mb_during_run": round(peak.get("rss_mb", after["rss_mb"]), 1),
+            "peak_rss_mb_lifetime": round(after["peak_rss_mb"], 1),
+            "cpu_seconds": round(cpu, 3),
+            "cpu_ms_per_request": round(cpu * 1000 / result["ok"], 3) if result["ok"] else None,
+        }
+    return result
+
+
+# ======================================
+# 📊 报告
+# ======================================
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: List[dict], baseline: Optional[List[dict]] = None):
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline or []}
+
+    def delta(new, old):
+        return f" ({(new - old) / old:+.0%})" if old else ""
+
+    print(f"{'scenario':<10}{'conc':>6}{'rps':>18}{'p50 ms':>18}{'p95 ms':>12}{'p99 ms':>18}{'rss MB':>10}{'errors':>8}")
+    for r in results:
+        old = previous.get((r["scenario"], r["concurrency"]))
+        lat = r["latency_ms"]
+        rps = f"{r['throughput_rps']:.0f}" + (delta(r["throughput_rps"], old["throughput_rps"]) if old else "")
+        p50 = f"{lat.get('p50', 0):.2f}" + (delta(lat.get("p50", 0), old["latency_ms"].get("p50")) if old else "")
+        p99 = f"{lat.get('p99', 0):.2f}" + (delta(lat.get("p99", 0), old["latency_ms"].get("p99")) if old else "")
+        rss = r.get("server", {}).get("peak_rss_mb_during_run", "-")
+        errors = r["requests"] - r["ok"]
+        print(f"{r['scenario']:<10}{r['concurrency']:>6}{rps:>18}{p50:>18}{lat.get('p95', 0):>12.2f}{p99:>18}{rss:>10}{errors:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="app_fast / app_local 压测与延迟基准")
+    parser.add_argument("--target", choices=sorted(TARGET_SCENARIOS), default="fast")
+    parser.add_argument("--scenarios", default="predict,batch", help="逗号分隔：predict,batch,stream")
+    parser.add_argument("--concurrency", default="1,8,32", help="逗号分隔的并发数列表")
+    parser.add_argument("--duration", type=float, default=10, help="每个场景的压测时长（秒）")
+    parser.add_argument("--warmup", type=float, default=2, help="每个场景的预热时长（秒）")
+    parser.add_argument("--batch_size", type=int, default=100, help="batch / stream 场景每个请求的记录数")
+    parser.add_argument("--rows", type=int, default=1000, help="从数据中抽样的请求记录数")
+    parser.add_argument("--data", default="data/raw/housing.csv")
+    parser.add_argument("--model", default="models/rf_model.pkl", help="app_fast 替身注册的模型文件")
+    parser.add_argument("--artifacts_dir", default="models")
+    parser.add_argument("--cache", action="store_true", help="开启预测结果缓存（默认关闭，测量完整推理路径）")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="传给服务进程的环境变量，如 --env INFERENCE_ENGINE=compiled")
+    parser.add_argument("--output_dir", default="reports")
+    parser.add_argument("--compare", help="与之前的报告 JSON 对比")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unsupported = [s for s in scenarios if s not in TARGET_SCENARIOS[args.target]]
+    if unsupported:
+        print(f"⚠️ app_{args.target} 不支持场景 {unsupported}，已跳过")
+        scenarios = [s for s in scenarios if s not in unsupported]
+    concurrencies = [int(c) for c in args.concurrency.split(",") if c]
+    rows = sample_rows(args.data, args.rows)
+
+    env = dict(item.split("=", 1) for item in args.env)
+    env.setdefault("PREDICTION_CACHE_ENABLED", "true" if args.cache else "false")
+
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+        if args.target == "fast":
+            print("🗄️ 创建 MLflow 替身（sqlite + 本地 artifact 目录）...")
+            env.setdefault("MLFLOW_TRACKING_URI", setup_registry_stand_in(Path(workdir), args.model, args.artifacts_dir))
+            env.setdefault("ARTIFACT_CACHE_DIR", str(Path(workdir) / "artifact_cache"))
+            env.setdefault("MODEL_WATCH_ENABLED", "false")
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        with run_server(args.target, port, env) as server:
+            headers = {}
+            if args.target == "fast":
+                token = httpx.post(f"{base_url}/token").json()["access_token"]
+                headers["Authorization"] = f"Bearer {token}"
+
+            results = []
+            for scenario in scenarios:
+                for concurrency in concurrencies:
+                    print(f"🚦 {scenario} × {concurrency} 并发，{args.duration:.0f}s ...")
+                    results.append(asyncio.run(run_case(base_url, server.pid, scenario, concurrency, args, rows, headers)))
+            startup_seconds = server.startup_seconds
+
+    report = {
+        "target": args.target,
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "server_env": {k: v for k, v in env.items() if k != "MLFLOW_TRACKING_URI"},
+        "config": {"duration": args.duration, "warmup": args.warmup, "batch_size": args.batch_size,
+                   "rows": len(rows), "model": args.model},
+        "startup_seconds": round(startup_seconds, 3),
+        "results": results,
+    }
+
+    output_dir = PROJECT_DIR / args.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_path = output_dir / f"benchmark_{args.target}_{stamp}_{report['commit'] or 'nogit'}.json"
+    output_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+    print_table(results, baseline)
+    print(f"✅ 结果已保存: {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+导入耗时分析：在干净的子进程中用 python -X importtime 导入服务入口，
+按顶层包汇总耗时，检查总耗时是否超出预算、是否加载了不应在导入时加载的重量级依赖。
+结果保存为 reports/ 下的 JSON；超出预算或加载了禁止的模块时以非 0 状态退出，可直接用于 CI。
+
+用法（在 experiment_03 目录下）：
+    python -m src.scripts.import_profile
+    python -m src.scripts.import_profile --module src.app_local --budget_ms 3000 --forbid ""
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]  # experiment_03
+
+# 服务入口的导入预算（毫秒，取多次导入的中位数）
+DEFAULT_BUDGET_MS = 800
+# 服务入口在导入时不应加载的模块：首次加载模型时才按需导入
+DEFAULT_FORBIDDEN = ("mlflow", "pandas", "sklearn", "joblib", "pyarrow")
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """解析 -X importtime 输出，返回 {模块名: 自身耗时（毫秒）}"""
+    self_ms = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        self_ms[parts[2].strip()] = int(parts[0]) / 1000
+    return self_ms
+
+
+def profile_import(module: str) -> dict:
+    """在子进程中导入 module 一次，返回 {total_ms, packages, modules}"""
+    code = f"import {module}, sys, json; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+
+    self_ms = parse_importtime(proc.stderr)
+    packages = Counter()
+    for name, ms in self_ms.items():
+        packages[name.split(".")[0]] += ms
+    return {
+        "total_ms": round(sum(self_ms.values()), 1),
+        "packages": {name: round(ms, 1) for name, ms in packages.most_common()},
+        "modules": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def run_profile(module: str, repeat: int = 3, budget_ms: float = DEFAULT_BUDGET_MS,
+                forbidden=DEFAULT_FORBIDDEN) -> dict:
+    """导入 repeat 次（第一次可能包含 .pyc 编译），以中位数作为结果并与预算比较"""
+    runs = [profile_import(module) for _ in range(max(1, repeat))]
+    median = sorted(runs, key=lambda run: run["total_ms"])[len(runs) // 2]
+    loaded = sorted(name for name in forbidden if name in median["modules"])
+    total_ms = statistics.median(run["total_ms"] for run in runs)
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "runs_ms": [run["total_ms"] for run in runs],
+        "total_ms": total_ms,
+        "budget_ms": budget_ms,
+        "packages": median["packages"],
+        "forbidden_loaded": loaded,
+        "passed": total_ms <= budget_ms and not loaded,
+    }
+
+
+def print_report(report: dict, top: int = 15, compare: Optional[dict] = None):
+    print(f"\n📦 导入 {report['module']}: {report['total_ms']:.0f} ms"
+          f"（预算 {report['budget_ms']:.0f} ms，各次 {report['runs_ms']}）")
+    previous = compare["packages"] if compare else {}
+    header = f"{'包':<28}{'耗时(ms)':>10}"
+    print(header + (f"{'对比(ms)':>12}" if compare else ""))
+    for name, ms in list(report["packages"].items())[:top]:
+        line = f"{name:<28}{ms:>10.1f}"
+        if compare:
+            line += f"{ms - previous.get(name, 0.0):>+12.1f}"
+        print(line)
+    if compare:
+        print(f"{'总计':<28}{report['total_ms']:>10.1f}{report['total_ms'] - compare['total_ms']:>+12.1f}")
+
+    if report["forbidden_loaded"]:
+        print(f"❌ 导入时加载了重量级依赖: {report['forbidden_loaded']}")
+    if report["total_ms"] > report["budget_ms"]:
+        print(f"❌ 导入耗时超出预算 {report['total_ms'] - report['budget_ms']:.0f} ms")
+    if report["passed"]:
+        print("✅ 导入耗时在预算内")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="服务入口导入耗时分析与预算检查")
+    parser.add_argument("--module", default="src.app_fast")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget_ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN),
+                        help="逗号分隔的禁止在导入时加载的模块，空字符串表示不检查")
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最多的前 N 个包")
+    parser.add_argument("--output_dir", default="reports")
+    parser.add_argument("--compare", help="与之前的报告 JSON 对比")
+    args = parser.parse_args(argv)
+
+    forbidden = [name for name in args.forbid.split(",") if name]
+    report = run_profile(args.module, args.repeat, args.budget_ms, forbidden)
+    compare = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    print_report(report, args.top, compare)
+
+    output_dir = Path(args.output_dir)
+    if not output_dir.is_absolute():
+        output_dir = PROJECT_DIR / output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"import_profile_{datetime.now():%Y%m%d_%H%M%S}.json"
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"📝 报告已保存: {path}")
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main()["passed"] else 1)
@@ -0,0 +1,289 @@
+"""
+流水线运行器：按依赖关系运行 data / features / model / bundle / evaluate 各阶段。
+每个阶段的指纹由输入文件内容、参数、命令和代码文件内容计算；指纹未变且输出文件与上次运行一致时跳过，
+不再需要手动设置 SKIP_DATA / SKIP_FEATURES，也不会在输入变化后误用旧结果。
+互不依赖的阶段（不同参数的 model、同一模型的 bundle 与 evaluate）并行运行。
+
+阶段状态保存在 .pipeline_cache/ 下，各阶段的输出日志在 .pipeline_cache/logs/。
+
+用法（在 experiment_03 目录下）：
+    python -m src.scripts.pipeline
+    python -m src.scripts.pipeline --n_estimators 100,150 --max_depth 5,7 --workers 4
+    python -m src.scripts.pipeline --dry_run
+    python -m src.scripts.pipeline --force features
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]  # experiment_03
+CACHE_DIR = ".pipeline_cache"
+
+RAN = "ran"
+CACHED = "cached"
+STALE = "stale"  # dry_run：需要运行
+FAILED = "failed"
+SKIPPED = "skipped"  # 上游阶段失败
+
+
+class Stage(NamedTuple):
+    """
+    一个流水线阶段；路径均相对于工作目录（experiment_03）。
+    没有 inputs 的阶段（如获取原始数据）视为数据源：输出文件存在即跳过，不会覆盖已有数据，
+    数据内容的变化通过下游阶段的输入指纹传递
+    """
+    name: str
+    command: List[str]  # 解释器之后的参数
+    deps: Sequence[str] = ()
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    code: Sequence[str] = ()
+    params: Optional[dict] = None
+
+
+class FileHasher:
+    """文件内容的 sha256，按 (size, mtime_ns) 记忆，未修改的文件不重复读取"""
+
+    def __init__(self, root: Path, memo_path: Path):
+        self.root = root
+        self.memo_path = memo_path
+        self._lock = threading.Lock()
+        try:
+            self._memo = json.loads(memo_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._memo = {}
+
+    def hash(self, path: str) -> Optional[str]:
+        """文件不存在时返回 None"""
+        full = self.root / path
+        try:
+            stat = full.stat()
+        except FileNotFoundError:
+            return None
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            cached = self._memo.get(path)
+        if cached is not None and cached[:2] == key:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(full, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self._memo[path] = [*key, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def save(self):
+        with self._lock:
+            self.memo_path.parent.mkdir(parents=True, exist_ok=True)
+            self.memo_path.write_text(json.dumps(self._memo, indent=1), encoding="utf-8")
+
+
+def fingerprint(stage: Stage, hasher: FileHasher) -> str:
+    payload = {
+        "command": stage.command,
+        "params": stage.params or {},
+        "python": list(sys.version_info[:2]),
+        "inputs": {path: hasher.hash(path) for path in stage.inputs},
+        "code": {path: hasher.hash(path) for path in stage.code},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _state_path(cache_dir: Path, name: str) -> Path:
+    return cache_dir / "stages" / (re.sub(r"[^\w.-]+", "_", name) + ".json")
+
+
+def is_cached(stage: Stage, stage_fingerprint: str, hasher: FileHasher, cache_dir: Path) -> bool:
+    """指纹一致，且每个输出文件都存在、内容与上次运行后记录的一致"""
+    try:
+        state = json.loads(_state_path(cache_dir, stage.name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    if state.get("fingerprint") != stage_fingerprint:
+        return False
+    outputs = state.get("outputs", {})
+    return all(outputs.get(path) is not None and hasher.hash(path) == outputs[path] for path in stage.outputs)
+
+
+# ======================================
+# 🏃 调度
+# ======================================
+def run_stage(stage: Stage, hasher: FileHasher, cache_dir: Path, cwd: Path, python: str,
+              force: bool, dry_run: bool) -> dict:
+    """检查缓存，必要时在子进程中运行阶段（同步，运行在调度线程池中）"""
+    stage_fingerprint = fingerprint(stage, hasher)
+    if not force and not stage.inputs and stage.outputs and all(hasher.hash(path) for path in stage.outputs):
+        return {"status": CACHED, "seconds": 0.0}
+    if not force and is_cached(stage, stage_fingerprint, hasher, cache_dir):
+        return {"status": CACHED, "seconds": 0.0}
+    if dry_run:
+        return {"status": STALE, "seconds": 0.0}
+
+    log_path = cache_dir / "logs" / (_state_path(cache_dir, stage.name).stem + ".log")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with open(log_path, "wb") as log:
+        returncode = subprocess.run([python, *stage.command], cwd=cwd, stdout=log, stderr=subprocess.STDOUT).returncode
+    seconds = round(time.perf_counter() - start, 2)
+
+    missing = [path for path in stage.outputs if hasher.hash(path) is None]
+    if returncode != 0 or missing:
+        tail = log_path.read_text(encoding="utf-8", errors="replace").splitlines()[-30:]
+        reason = f"退出码 {returncode}" if returncode != 0 else f"缺少输出 {missing}"
+        print(f"❌ [{stage.name}] 失败（{reason}），日志 {log_path}:\n" + "\n".join(f"    {line}" for line in tail))
+        return {"status": FAILED, "seconds": seconds, "error": reason}
+
+    state_path = _state_path(cache_dir, stage.name)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps({
+        "name": stage.name,
+        "fingerprint": stage_fingerprint,  # 运行前计算：运行期间输入被修改时，下次会重新运行
+        "outputs": {path: hasher.hash(path) for path in stage.outputs},
+        "seconds": seconds,
+        "finished_at": time.time(),
+    }, indent=2), encoding="utf-8")
+    return {"status": RAN, "seconds": seconds}
+
+
+def run_pipeline(stages: Sequence[Stage], cwd: Path = PROJECT_DIR, cache_dir: str = CACHE_DIR,
+                 workers: Optional[int] = None, force: Iterable[str] = (), dry_run: bool = False,
+                 python: str = sys.executable) -> Dict[str, dict]:
+    """
+    按依赖顺序运行各阶段，依赖都完成的阶段立即并行启动；上游失败时下游标记为 skipped。
+    force 中的阶段（"all" 表示全部）忽略缓存；dry_run 只报告各阶段是否需要运行。
+    返回 {阶段名: {"status", "seconds"}}，顺序与 stages 一致
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.deps if dep not in names]
+        if unknown:
+            raise ValueError(f"阶段 {stage.name} 依赖未定义的阶段: {unknown}")
+    force = set(force)
+    cwd = Path(cwd)
+    cache_path = cwd / cache_dir
+    hasher = FileHasher(cwd, cache_path / "file_hashes.json")
+
+    results: Dict[str, dict] = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="stage") as pool:
+        while pending or running:
+            progressed = True
+            while progressed:  # 标记为 skipped / stale 的阶段可能立即解锁其他阶段
+                progressed = False
+                for name, stage in list(pending.items()):
+                    upstream = [results.get(dep, {}).get("status") for dep in stage.deps]
+                    if any(status in (FAILED, SKIPPED) for status in upstream):
+                        results[name] = {"status": SKIPPED, "seconds": 0.0}
+                    elif dry_run and STALE in upstream:
+                        results[name] = {"status": STALE, "seconds": 0.0}  # 上游会重新运行，下游必然需要运行
+                    elif all(status is not None for status in upstream):
+                        print(f"▶️ [{name}] 检查中...")
+                        future = pool.submit(run_stage, stage, hasher, cache_path, cwd, python,
+                                             "all" in force or name in force, dry_run)
+                        running[future] = name
+                    else:
+                        continue
+                    del pending[name]
+                    progressed = True
+
+            if not running:
+                if pending:
+                    raise ValueError(f"阶段之间存在循环依赖: {sorted(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                status = results[name]["status"]
+                if status == RAN:
+                    print(f"✅ [{name}] 完成（{results[name]['seconds']:.1f}s）")
+                elif status == CACHED:
+                    print(f"⏭️  [{name}] 输入、参数和代码未变化，使用缓存")
+    hasher.save()
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+# ======================================
+# 🧱 本项目的阶段定义
+# ======================================
+FEATURE_ARTIFACTS = ("models/ocean_encoder.pkl", "models/scaler.pkl", "models/feature_columns.pkl")
+PROCESSED = {name: f"data/processed/{name}.parquet" for name in ("x_train", "y_train", "x_test", "y_test")}
+
+
+def build_stages(n_estimators: Sequence[int], max_depth: Sequence[int], dtype: str = "float64",
+                 bundle: bool = True) -> List[Stage]:
+    """每组 (n_estimators, max_depth) 一个 model + evaluate 阶段；bundle 导出第一组参数的模型"""
+    stages = [
+        Stage("data", ["-m", "src.data.make_dataset"],
+              outputs=["data/raw/housing.csv"], code=["src/data/make_dataset.py"]),
+        Stage("features", ["-m", "src.features.build_features", "--dtype", dtype], deps=["data"],
+              inputs=["data/raw/housing.csv"], outputs=[*PROCESSED.values(), *FEATURE_ARTIFACTS],
+              code=["src/features/build_features.py", "src/data/processed_data.py"], params={"dtype": dtype}),
+    ]
+    for i, (n, d) in enumerate(product(n_estimators, max_depth)):
+        model_name, model_path = f"model[n{n}_d{d}]", f"models/rf_model_n{n}_d{d}.pkl"
+        stages.append(Stage(
+            model_name, ["-m", "src.models.train_model", "--n_estimators", str(n), "--max_depth", str(d)],
+            deps=["features"], inputs=[PROCESSED["x_train"], PROCESSED["y_train"], *FEATURE_ARTIFACTS],
+            outputs=[model_path], code=["src/models/train_model.py", "src/data/processed_data.py"],
+            params={"n_estimators": n, "max_depth": d},
+        ))
+        stages.append(Stage(
+            f"evaluate[n{n}_d{d}]", ["-m", "src.evaluate.evaluate", "--n_estimators", str(n), "--max_depth", str(d)],
+            deps=[model_name], inputs=[model_path, PROCESSED["x_test"], PROCESSED["y_test"]],
+            outputs=[f"reports/metrics_n{n}_d{d}.json"],
+            code=["src/evaluate/evaluate.py", "src/data/processed_data.py"],
+        ))
+        if bundle and i == 0:
+            stages.append(Stage(
+                "bundle", ["-m", "src.models.model_bundle", "--model", model_path, "--output", "models/model.bundle"],
+                deps=[model_name], inputs=[model_path, *FEATURE_ARTIFACTS], outputs=["models/model.bundle"],
+                code=["src/models/model_bundle.py", "src/models/compiled_forest.py", "src/features/transformer.py"],
+            ))
+    return stages
+
+
+def print_summary(stages: Sequence[Stage], results: Dict[str, dict]):
+    labels = {RAN: "✅ 运行", CACHED: "⏭️ 缓存", STALE: "🔄 需运行", FAILED: "❌ 失败", SKIPPED: "⛔ 跳过"}
+    print(f"\n{'阶段':<24}{'状态':<10}{'耗时(s)':>10}")
+    for stage in stages:
+        result = results[stage.name]
+        print(f"{stage.name:<24}{labels[result['status']]:<10}{result['seconds']:>10.1f}")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="带内容指纹缓存的训练流水线")
+    parser.add_argument("--n_estimators", type=_int_list, default=[100], help="逗号分隔，可多个")
+    parser.add_argument("--max_depth", type=_int_list, default=[5], help="逗号分隔，可多个")
+    parser.add_argument("--dtype", choices=("float32", "float64"), default="float64", help="处理后特征的浮点类型")
+    parser.add_argument("--no_bundle", action="store_true", help="不导出模型包")
+    parser.add_argument("--workers", type=int, default=None, help="并行阶段数，默认 CPU 核数")
+    parser.add_argument("--force", default="", help="逗号分隔的阶段名，忽略缓存强制运行；all 表示全部")
+    parser.add_argument("--dry_run", action="store_true", help="只检查哪些阶段需要运行")
+    args = parser.parse_args(argv)
+
+    stages = build_stages(args.n_estimators, args.max_depth, args.dtype, bundle=not args.no_bundle)
+    force = [name for name in args.force.split(",") if name]
+    results = run_pipeline(stages, workers=args.workers, force=force, dry_run=args.dry_run)
+    print_summary(stages, results)
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(1 if any(result["status"] == FAILED for result in main().values()) else 0)
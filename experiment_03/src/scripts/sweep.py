@@ -0,0 +1,257 @@
+"""
+进程内并行参数扫描：处理后的数据只在主进程读取一次，放入共享内存，
+进程池中的每个 worker 只导入一次 sklearn / mlflow，并以只读视图直接使用共享数据（不复制、不重新解析文件）。
+多组参数在 CPU 预算内并行训练 + 评估，结果汇总为一张表（终端输出 + reports/sweep_*.csv）。
+
+CPU 预算：worker 数 = min(预算, 任务数)，每个模型训练使用 预算 // worker 数 个线程。
+
+--warm_start：同一 max_depth 的各个 n_estimators 共用一个逐步增长的森林（一个任务），
+在每个规模上保存、记录和评估，结果与逐个从头训练逐位一致，重复的树只训练一次。
+
+用法（在 experiment_03 目录下）：
+    python -m src.scripts.sweep
+    python -m src.scripts.sweep --n_estimators 100,120,150 --max_depth 5,7,9 --cpus 4
+    python -m src.scripts.sweep --warm_start
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]  # experiment_03
+DEFAULT_N_ESTIMATORS = (100, 120, 150)
+DEFAULT_MAX_DEPTH = (5, 7, 9)
+METRICS = ("rmse", "mae", "r2")
+
+
+class SharedArrays:
+    """
+    把若干 NumPy 数组放入一块共享内存。主进程创建并负责释放；
+    子进程用 handle 重新打开，得到的是同一块物理内存上的只读视图
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = (offset, array.dtype.str, array.shape)
+            offset += (array.nbytes + 63) // 64 * 64
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.layout = layout
+        for name, array in arrays.items():
+            self.view(self._shm, layout[name], writeable=True)[...] = array
+
+    @property
+    def handle(self) -> Tuple[str, dict]:
+        return self._shm.name, self.layout
+
+    @staticmethod
+    def view(shm, spec, writeable: bool = False) -> np.ndarray:
+        offset, dtype, shape = spec
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        array.flags.writeable = writeable
+        return array
+
+    @classmethod
+    def attach(cls, handle: Tuple[str, dict]):
+        """在子进程中打开共享内存，返回 (shm, {名称: 只读数组})；shm 需在数组使用期间保持引用"""
+        name, layout = handle
+        shm = shared_memory.SharedMemory(name=name)
+        return shm, {key: cls.view(shm, spec) for key, spec in layout.items()}
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+# ======================================
+# 👷 worker 进程
+# ======================================
+_worker = {}  # 每个 worker 进程的共享数据
+
+
+def _init_worker(handle, columns: List[str]):
+    """进程池初始化：打开共享内存，构造不复制数据的 DataFrame"""
+    import pandas as pd
+
+    shm, arrays = SharedArrays.attach(handle)
+    _worker.update(
+        shm=shm,
+        x_train=pd.DataFrame(arrays["x_train"], columns=columns, copy=False),
+        y_train=arrays["y_train"],
+        x_test=pd.DataFrame(arrays["x_test"], columns=columns, copy=False),
+        y_test=arrays["y_test"],
+    )
+
+
+def run_config(n_estimators: int, max_depth: int, n_jobs: int) -> List[dict]:
+    """训练 + 评估一组参数（运行在 worker 进程中）；失败时返回错误信息，不中断其他组合"""
+    from ..models.train_model import train_model
+
+    start = time.perf_counter()
+    try:
+        model, run_id = train_model(n_estimators, max_depth, _worker["x_train"], _worker["y_train"], n_jobs=n_jobs)
+    except Exception as e:
+        return [_error_row(n_estimators, max_depth, e, start)]
+    return [_evaluate_row(n_estimators, max_depth, model, run_id, start, time.perf_counter())]
+
+
+def run_warm_group(n_estimators_list: Sequence[int], max_depth: int, n_jobs: int) -> List[dict]:
+    """同一 max_depth 的全部 n_estimators：森林按升序逐步增长，每个规模评估一次（运行在 worker 进程中）"""
+    from ..models.train_model import train_model_warm_start
+
+    rows = []
+    start = time.perf_counter()
+    grown = train_model_warm_start(n_estimators_list, max_depth, _worker["x_train"], _worker["y_train"], n_jobs=n_jobs)
+    pending = sorted(set(n_estimators_list))
+    try:
+        for n_estimators, model, run_id in grown:
+            # 训练耗时只计增量部分：本规模新增的树 + 保存记录
+            rows.append(_evaluate_row(n_estimators, max_depth, model, run_id, start, time.perf_counter()))
+            pending.remove(n_estimators)
+            start = time.perf_counter()
+    except Exception as e:
+        rows.extend(_error_row(n_estimators, max_depth, e, start) for n_estimators in pending)
+    return rows
+
+
+def _evaluate_row(n_estimators, max_depth, model, run_id, start, trained) -> dict:
+    from ..evaluate.evaluate import evaluate_model
+
+    try:
+        metrics = evaluate_model(n_estimators, max_depth, model, _worker["x_test"], _worker["y_test"], run_id=run_id)
+    except Exception as e:
+        return _error_row(n_estimators, max_depth, e, start)
+    return {
+        "n_estimators": n_estimators,
+        "max_depth": max_depth,
+        **{name: float(metrics[name]) for name in METRICS},
+        "train_seconds": round(trained - start, 2),
+        "seconds": round(time.perf_counter() - start, 2),
+        "run_id": run_id,
+        "pid": os.getpid(),
+    }
+
+
+def _error_row(n_estimators, max_depth, error: Exception, start) -> dict:
+    return {"n_estimators": n_estimators, "max_depth": max_depth, "error": f"{type(error).__name__}: {error}",
+            "seconds": round(time.perf_counter() - start, 2), "pid": os.getpid()}
+
+
+# ======================================
+# 🧭 调度
+# ======================================
+def plan(n_configs: int, cpus: Optional[int] = None) -> Tuple[int, int]:
+    """按 CPU 预算分配 (worker 数, 每个模型的训练线程数)"""
+    cpus = max(1, cpus or os.cpu_count() or 1)
+    workers = max(1, min(cpus, n_configs))
+    return workers, max(1, cpus // workers)
+
+
+def load_shared_data(directory: Optional[str] = None) -> Tuple[SharedArrays, List[str]]:
+    """读取一次处理后的数据并放入共享内存"""
+    from ..data.processed_data import PROCESSED_DIR, load_processed, load_target
+
+    directory = directory or PROCESSED_DIR
+    x_train = load_processed("x_train", directory)
+    x_test = load_processed("x_test", directory, columns=x_train.columns.tolist())
+    shared = SharedArrays({
+        "x_train": np.ascontiguousarray(x_train.to_numpy()),
+        "y_train": load_target("y_train", directory),
+        "x_test": np.ascontiguousarray(x_test.to_numpy()),
+        "y_test": load_target("y_test", directory),
+    })
+    return shared, x_train.columns.tolist()
+
+
+def run_sweep(n_estimators: Sequence[int] = DEFAULT_N_ESTIMATORS, max_depth: Sequence[int] = DEFAULT_MAX_DEPTH,
+              cpus: Optional[int] = None, data_dir: Optional[str] = None, warm_start: bool = False) -> List[dict]:
+    """并行运行全部参数组合，返回排序后的结果（见 rank）；warm_start 时每个 max_depth 一个任务"""
+    grid = list(product(n_estimators, max_depth))
+    trees = sum(n for n, _ in grid)
+    if warm_start:
+        tasks = [(run_warm_group, list(n_estimators), d) for d in max_depth]
+        print(f"🌱 warm start: 共训练 {len(max_depth) * max(n_estimators)} 棵树（逐个从头训练需 {trees} 棵）")
+    else:
+        tasks = [(run_config, n, d) for n, d in grid]
+    workers, n_jobs = plan(len(tasks), cpus)
+    print(f"🔍 参数扫描: {len(grid)} 组参数，{len(tasks)} 个任务，{workers} 个 worker × 每个模型 {n_jobs} 线程")
+
+    start = time.perf_counter()
+    shared, columns = load_shared_data(data_dir)
+    try:
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.handle, columns)) as pool:
+            futures = [pool.submit(fn, n, d, n_jobs) for fn, n, d in tasks]
+            for future in as_completed(futures):
+                for row in future.result():
+                    rows.append(row)
+                    label = f"n_estimators={row['n_estimators']}, max_depth={row['max_depth']}"
+                    if "error" in row:
+                        print(f"❌ 失败：{label}: {row['error']}")
+                    else:
+                        print(f"✅ 完成：{label} | RMSE: {row['rmse']:.2f} | R²: {row['r2']:.4f}（{row['seconds']:.1f}s）")
+    finally:
+        shared.close()
+    print(f"🎉 参数扫描完成！共 {len(grid)} 组，总耗时 {time.perf_counter() - start:.1f}s")
+    return rank(rows)
+
+
+def rank(rows: List[dict]) -> List[dict]:
+    """按 rmse 升序排列，失败的组合排在最后"""
+    return sorted(rows, key=lambda row: ("error" in row, row.get("rmse", 0.0)))
+
+
+def print_table(rows: List[dict]):
+    print(f"\n{'n_estimators':>12}{'max_depth':>10}{'RMSE':>12}{'MAE':>12}{'R²':>8}{'训练(s)':>9}{'总计(s)':>9}")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['n_estimators']:>12}{row['max_depth']:>10}  ❌ {row['error']}")
+            continue
+        print(f"{row['n_estimators']:>12}{row['max_depth']:>10}{row['rmse']:>12.2f}{row['mae']:>12.2f}"
+              f"{row['r2']:>8.4f}{row['train_seconds']:>9.1f}{row['seconds']:>9.1f}")
+
+
+def write_table(rows: List[dict], output_dir: str = "reports") -> Path:
+    output = Path(output_dir)
+    if not output.is_absolute():
+        output = PROJECT_DIR / output
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / f"sweep_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    fields = ["n_estimators", "max_depth", *METRICS, "train_seconds", "seconds", "run_id", "pid", "error"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="进程内并行参数扫描（训练 + 评估）")
+    parser.add_argument("--n_estimators", type=_int_list, default=list(DEFAULT_N_ESTIMATORS), help="逗号分隔")
+    parser.add_argument("--max_depth", type=_int_list, default=list(DEFAULT_MAX_DEPTH), help="逗号分隔")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU 预算，默认全部核心")
+    parser.add_argument("--warm_start", action="store_true", help="同一 max_depth 的 n_estimators 共用逐步增长的森林")
+    parser.add_argument("--output_dir", default="reports")
+    args = parser.parse_args(argv)
+
+    rows = run_sweep(args.n_estimators, args.max_depth, args.cpus, warm_start=args.warm_start)
+    print_table(rows)
+    print(f"📝 汇总表已保存: {write_table(rows, args.output_dir)}")
+    return rows
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if any("error" in row for row in main()) else 0)
@@ -1,6 +1,6 @@
 #!/bin/bash
 # sweep.sh - 参数扫描脚本（支持虚拟环境）
-# 使用方法: ./sweep.sh [python_interpreter_path]
+# 使用方法: ./sweep.sh [python_interpreter_path] [sweep.py 参数...]
 # 示例: ./sweep.sh ../.venv/Scripts/python.exe
 
 # 获取传入的 Python 解释器路径，如果未传入则尝试自动检测或使用默认
@@ -16,30 +16,8 @@ if ! "$PYTHON" --version >/dev/null 2>&1; then
 fi
 
 echo "🔍 使用 Python 解释器: $($PYTHON --version 2>&1)"
-echo "🔍 开始参数扫描..."
+echo "🔍 开始参数扫描（进程内并行，见 src/scripts/sweep.py）..."
 
-# 超参数组合遍历
-for n in 100 120 150; do
-  for d in 5 7 9; do
-    echo "🚀 训练：n_estimators=$n, max_depth=$d"
-    "$PYTHON" src/models/train_model.py --n_estimators "$n" --max_depth "$d"
-
-    if [ $? -ne 0 ]; then
-      echo "❌ 训练失败：n_estimators=$n, max_depth=$d"
-      exit 1
-    fi
-
-    echo "📊 评估：n_estimators=$n, max_depth=$d"
-    "$PYTHON" src/evaluate/evaluate.py --n_estimators "$n" --max_depth "$d"
-
-    if [ $? -ne 0 ]; then
-      echo "❌ 评估失败：n_estimators=$n, max_depth=$d"
-      exit 1
-    fi
-
-    echo "✅ 完成：n=$n, d=$d"
-    echo "---"
-  done
-done
-
-echo "🎉 参数扫描完成！共运行 9 次实验（训练 + 评估）"
\ No newline at end of file
+# 超参数组合、CPU 预算等参数原样传给扫描引擎，如: ./sweep.sh python --n_estimators 100,150 --cpus 4
+[ $# -gt 0 ] && shift
+"$PYTHON" -m src.scripts.sweep "$@"
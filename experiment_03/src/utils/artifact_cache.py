@@ -0,0 +1,163 @@
+# artifact_cache.py
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional
+
+
+class ArtifactCache:
+    """
+    持久化的本地 artifact 缓存（内容寻址）。
+
+    目录结构：
+        objects/<sha256[:2]>/<sha256>   单个文件，按内容哈希存储（相同内容只存一份）
+        trees/<key>/                    目录型 artifact（如 pyfunc 模型目录）
+        refs/<key>.json                 (run_id, artifact_path) -> 内容哈希
+        named/<name>.json               其它需要离线兜底的元数据（如模型别名的解析结果）
+
+    run 下的 artifact 不可变，因此 (run_id, artifact_path) 可以安全地作为缓存 key。
+    所有写入都先写临时文件再 os.replace，多个进程同时写入也不会读到半个文件；
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root).expanduser()
+        self.max_bytes = max_bytes
+
+    # ------------------------------------------------------------------
+    # key 与路径
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(run_id: str, artifact_path: str) -> str:
+        return hashlib.sha256(f"{run_id}/{artifact_path.strip('/')}".encode('utf-8')).hexdigest()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def _tmp_path(self) -> Path:
+        """临时文件与最终文件位于同一文件系统，保证 os.replace 是原子操作"""
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / uuid.uuid4().hex
+
+    def _write_json(self, path: Path, data: dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp_path()
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[dict]:
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _touch(path: Path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # 文件型 artifact
+    # ------------------------------------------------------------------
+    def get_file(self, run_id: str, artifact_path: str) -> Optional[Path]:
+        ref = self._read_json(self.root / "refs" / f"{self.make_key(run_id, artifact_path)}.json")
+        if ref is None:
+            return None
+        path = self._object_path(ref["sha256"])
+        if not path.is_file():
+            return None
+        self._touch(path)
+        return path
+
+    def put_file(self, run_id: str, artifact_path: str, src: str) -> Path:
+        sha256 = hashlib.sha256()
+        with open(src, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+
+        path = self._object_path(digest)
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._tmp_path()
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, path)
+        self._write_json(self.root / "refs" / f"{self.make_key(run_id, artifact_path)}.json", {
+            "run_id": run_id,
+            "artifact_path": artifact_path,
+            "sha256": digest,
+            "size": path.stat().st_size,
+        })
+        self.evict(keep=path)
+        return path
+
+    # ------------------------------------------------------------------
+    # 目录型 artifact
+    # ------------------------------------------------------------------
+    def get_dir(self, run_id: str, artifact_path: str) -> Optional[Path]:
+        path = self.root / "trees" / self.make_key(run_id, artifact_path)
+        if not path.is_dir():
+            return None
+        self._touch(path)
+        return path
+
+    def put_dir(self, run_id: str, artifact_path: str, src: str) -> Path:
+        path = self.root / "trees" / self.make_key(run_id, artifact_path)
+        if not path.is_dir():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._tmp_path()
+            shutil.copytree(src, tmp)
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                # 其它进程已经写入了同一份内容
+                shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=path)
+        return path
+
+    # ------------------------------------------------------------------
+    # 具名元数据
+    # ------------------------------------------------------------------
+    def get_named(self, name: str) -> Optional[dict]:
+        return self._read_json(self.root / "named" / f"{name}.json")
+
+    def put_named(self, name: str, data: dict):
+        self._write_json(self.root / "named" / f"{name}.json", data)
+
+    # ------------------------------------------------------------------
+    # 淘汰
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _size(path: Path) -> int:
+        if path.is_file():
+            return path.stat().st_size
+        return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+    def evict(self, keep: Optional[Path] = None):
+        """总大小超过上限时，按最近访问时间从旧到新删除（keep 不会被删除）"""
+        entries = list((self.root / "objects").glob("*/*")) + list((self.root / "trees").glob("*"))
+        sized = []
+        for entry in entries:
+            try:
+                sized.append((entry.stat().st_mtime, self._size(entry), entry))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in sized)
+        for _, size, entry in sorted(sized, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and entry == keep:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+            total -= size
+
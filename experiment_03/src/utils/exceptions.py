@@ -1,6 +1,7 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from ..config.settings import settings
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return JSONResponse(
@@ -20,4 +21,23 @@ async def general_exception_handler(request: Request, exc: Exception):
             "detail": str(exc),
             "message": "服务暂时不可用，请稍后重试"
         }
-    )
\ No newline at end of file
+    )
+
+class ServiceOverloadedError(Exception):
+    """推理队列已满，需要客户端稍后重试"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+async def overload_exception_handler(request: Request, exc: ServiceOverloadedError):
+    return JSONResponse(
+        status_code=settings.OVERLOAD_STATUS_CODE,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={
+            "error": "服务繁忙",
+            "detail": str(exc),
+            "message": f"请在 {exc.retry_after} 秒后重试"
+        }
+    )
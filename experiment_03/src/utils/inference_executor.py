@@ -0,0 +1,120 @@
+# inference_executor.py
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .exceptions import ServiceOverloadedError
+
+
+class AdmissionSlot:
+    """
+    一个准入名额。调用方用完后 close()，名额在 close() 之后、且 track() 登记的任务全部结束时才释放，
+    因此客户端断开（请求被取消）时仍在排队或执行的工作会继续计入负载。
+    track() 可接收 concurrent.futures.Future 或 asyncio.Future
+    """
+
+    def __init__(self, release: Callable[[], None]):
+        self._release = release
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._closed = False
+        self._released = False
+
+    def track(self, future):
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        if not future.cancelled():
+            future.exception()  # 请求已取消时无人读取结果，标记为已读取，避免 "exception was never retrieved"
+        with self._lock:
+            self._pending -= 1
+        self._maybe_release()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._maybe_release()
+
+    def _maybe_release(self):
+        with self._lock:
+            if self._released or not self._closed or self._pending:
+                return
+            self._released = True
+        self._release()
+
+
+class InferenceExecutor:
+    """
+    专用推理线程池 + 有界准入队列。
+
+    同时被接纳的任务数（执行中 + 排队中）不超过 max_workers + max_queue_size，
+    超出时立即抛出 ServiceOverloadedError（由异常处理器转换为 429/503 + Retry-After），
+    而不是让请求在无界的默认线程池中排队直到超时。
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue_size: int = 64, retry_after: int = 1):
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(0, max_queue_size)
+        self.capacity = self.max_workers + self.max_queue_size
+        self.retry_after = retry_after
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise ServiceOverloadedError(
+                    f"推理队列已满（容量 {self.capacity}），请稍后重试", retry_after=self.retry_after
+                )
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def admit(self) -> AdmissionSlot:
+        """占用一个准入名额（用于不直接提交到线程池的路径，如流式接口）；队列已满时立即拒绝"""
+        self._acquire()
+        return AdmissionSlot(self._release)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """在推理线程池中执行 fn；队列已满时立即拒绝"""
+        slot = self.admit()
+        try:
+            # 名额在任务真正结束时释放（即使客户端提前断开）
+            future = slot.track(self.pool.submit(functools.partial(fn, *args, **kwargs)))
+        finally:
+            slot.close()
+        return await asyncio.wrap_future(future)
+
+    async def run_queued(self, submit: Callable[[], "asyncio.Future"]) -> Any:
+        """
+        占用一个名额后调用 submit() 取得 asyncio.Future（如微批调度器中排队的请求）并等待其结果。
+        名额在 future 完成时释放；客户端断开只取消本次等待，不取消已排队的请求，也不提前释放名额
+        """
+        slot = self.admit()
+        try:
+            future = slot.track(submit())
+        finally:
+            slot.close()
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,299 @@
+# metrics.py
+"""
+轻量的 Prometheus 指标（文本格式 0.0.4），不依赖 prometheus_client。
+
+热路径上的一次 observe 只有一次 bisect 和一次加锁的计数，
+标签组合在模块加载时预先绑定（labels()），请求中不做字符串拼接。
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# 请求级耗时（接口整体）
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 阶段耗时（单个阶段常在微秒级）
+STAGE_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        name + '="' + str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """
+    带标签的指标族；labels(...) 返回绑定了标签值的子指标，子类通过 _new_child 决定子指标的类型。
+    计数器和仪表盘提供 fn 时在导出时调用 fn() 取值（用于线程池、缓存等已有的统计）
+    """
+
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """创建一个新的子指标（每种标签值组合一个）"""
+
+    def labels(self, *labelvalues):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {labelvalues}")
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def _samples(self):
+        if self.fn is not None:
+            yield f"{self.name} {_format_value(self.fn())}"
+            return
+        for labelvalues, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Gauge(_Metric):
+    TYPE = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)  # 第一个 >= value 的桶，即 le 语义
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for labelvalues, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_count{labels} {cumulative}"
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+
+
+class MetricsRegistry:
+    """指标注册表：按注册顺序导出为 Prometheus 文本格式"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                fn: Optional[Callable[[], float]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, fn=fn))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, fn=fn))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = REQUEST_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+# ======================================
+# 📈 服务指标
+# ======================================
+registry = MetricsRegistry()
+
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Number of HTTP requests currently being processed")
+http_requests_total = registry.counter(
+    "http_requests_total", "Total HTTP requests", ("method", "path", "status"))
+http_request_errors_total = registry.counter(
+    "http_request_errors_total", "HTTP requests that ended with status >= 400 or an unhandled exception",
+    ("path", "status"))
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "path"))
+prediction_stage_seconds = registry.histogram(
+    "prediction_stage_seconds", "Latency of each stage of the prediction path", ("stage",),
+    buckets=STAGE_BUCKETS)
+
+
+# 每个请求一份时钟：记录开始时间和需要从“解析与校验”中扣除的依赖耗时（如 JWT）。
+# 同步依赖运行在线程池中，拷贝的上下文共享同一个 _RequestClock 对象
+class _RequestClock:
+    __slots__ = ("start", "excluded")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.excluded = 0.0
+
+
+_request_clock: ContextVar[Optional[_RequestClock]] = ContextVar("request_clock", default=None)
+
+
+def observe_parse_stage(stage):
+    """
+    在接口函数入口调用：请求进入中间件到进入接口函数之间的耗时，
+    扣除已单独计时的依赖，即请求体读取、JSON 解析和 pydantic 校验的耗时
+    """
+    clock = _request_clock.get()
+    if clock is not None:
+        stage.observe(time.perf_counter() - clock.start - clock.excluded)
+
+
+def timed_dependency(stage, dependency: Callable) -> Callable:
+    """包装同步依赖（如 jwt_manager.verify_token），记录其耗时；签名保持不变，FastAPI 照常注入参数"""
+
+    @wraps(dependency)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return dependency(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stage.observe(elapsed)
+            clock = _request_clock.get()
+            if clock is not None:
+                clock.excluded += elapsed
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件（不经过 BaseHTTPMiddleware 的额外任务和流包装）：
+    记录进行中的请求数、请求总数、错误数和请求耗时。
+    path 标签取匹配到的路由模板，未匹配的请求统一记为 "unmatched"，避免标签基数失控
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = _request_clock.set(_RequestClock(start))
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            _request_clock.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration_seconds.labels(method, path).observe(time.perf_counter() - start)
+            http_requests_total.labels(method, path, str(status)).inc()
+            if status >= 400:
+                http_request_errors_total.labels(path, str(status)).inc()
@@ -0,0 +1,167 @@
+# micro_batcher.py
+import asyncio
+import time
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatchError(RuntimeError):
+    """整批推理失败或调度器已停止；每个等待中的请求各自得到一个实例（__cause__ 为原始异常）"""
+
+
+class MicroBatcher:
+    """
+    动态微批调度器：把并发到达的单条请求收集到队列中，
+    在达到 max_batch_size 或等待超过 max_wait_us 时合并成一次批量调用。
+
+    batch_fn 接收 items 列表，返回等长的结果列表；
+    结果为 Exception 实例时只让对应请求失败，其余请求不受影响（每条结果应是独立的异常实例）；
+    batch_fn 自身抛出异常时整批请求以 MicroBatchError 失败。
+    """
+
+    # 批大小直方图的桶上界
+    SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 64,
+                 max_wait_us: int = 2000, executor=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_us / 1_000_000
+        self.executor = executor  # None 时使用事件循环默认线程池
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight = set()
+
+        # 统计信息
+        self.batches = 0
+        self.items = 0
+        self.flush_by_size = 0
+        self.flush_by_timeout = 0
+        self.batch_seconds = 0.0
+        self.size_histogram = {bucket: 0 for bucket in self.SIZE_BUCKETS + (float('inf'),)}
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._collect())
+        print(f"✅ 微批调度已启用: max_batch_size={self.max_batch_size}, "
+              f"max_wait_us={int(self.max_wait * 1_000_000)}")
+
+    async def stop(self):
+        """停止收集：已在推理中的批次照常完成，仍在排队的请求立即以 MicroBatchError 失败"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._fail(pending, "微批调度器已停止")
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def enqueue(self, item: Any) -> asyncio.Future:
+        """提交单条请求，返回在所属批次完成后得到结果的 future"""
+        if self._worker is None:
+            raise MicroBatchError("微批调度器未运行")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return future
+
+    async def submit(self, item: Any) -> Any:
+        """提交单条请求并等待其结果"""
+        return await self.enqueue(item)
+
+    @staticmethod
+    def _fail(batch, message: str, cause: Optional[BaseException] = None):
+        """让 batch 中尚未完成的请求失败，每个 future 使用独立的异常实例（重新抛出时各自的 traceback 互不影响）"""
+        for _, future in batch:
+            if not future.done():
+                error = MicroBatchError(message)
+                error.__cause__ = cause
+                future.set_exception(error)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+
+                while len(batch) < self.max_batch_size:
+                    # 先取走已经排队的请求，再在剩余时间窗口内等待新的请求
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                if len(batch) >= self.max_batch_size:
+                    self.flush_by_size += 1
+                else:
+                    self.flush_by_timeout += 1
+
+                # 推理放到后台任务中执行，收集协程立即开始下一批
+                task = asyncio.create_task(self._flush(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # 停止时已取出、尚未提交推理的请求
+            self._fail(batch, "微批调度器已停止")
+            raise
+
+    async def _flush(self, batch):
+        items = [item for item, _ in batch]
+        start = time.perf_counter()
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.batch_fn, items)
+        except Exception as e:
+            self._fail(batch, f"批量推理失败: {e}", cause=e)
+            return
+        finally:
+            self._record(len(items), time.perf_counter() - start)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # 客户端已断开
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _record(self, size: int, seconds: float):
+        self.batches += 1
+        self.items += size
+        self.batch_seconds += seconds
+        for bucket in self.size_histogram:
+            if size <= bucket:
+                self.size_histogram[bucket] += 1
+                break
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_us": int(self.max_wait * 1_000_000),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "avg_batch_ms": round(self.batch_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "flush_by_size": self.flush_by_size,
+            "flush_by_timeout": self.flush_by_timeout,
+            "batch_size_histogram": {
+                ("+Inf" if bucket == float('inf') else str(bucket)): count
+                for bucket, count in self.size_histogram.items()
+            },
+        }
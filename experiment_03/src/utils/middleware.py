@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from ..config.settings import settings
+from .metrics import MetricsMiddleware, registry
 
 class MiddlewareManager:
-    """CORS 中间件管理类"""
+    """中间件管理类：CORS、Prometheus 指标"""
 
     @staticmethod
     def setup_cors(app: FastAPI):
@@ -18,6 +20,19 @@ class MiddlewareManager:
         )
         print(f"✅ CORS 已启用，允许来源: {settings.ALLOWED_ORIGINS}")
 
+    @staticmethod
+    def setup_metrics(app: FastAPI):
+        """注册请求指标中间件和 /metrics 接口（Prometheus 文本格式）"""
+        if not settings.METRICS_ENABLED:
+            return
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            return Response(registry.render(), media_type=registry.CONTENT_TYPE)
+
+        print("✅ Prometheus 指标已启用: /metrics")
+
 
 # 实例化
-middleware_manager = MiddlewareManager()
\ No newline at end of file
+middleware_manager = MiddlewareManager()
@@ -1,21 +1,115 @@
 # mlflow_artifact_loader.py
-from mlflow import artifacts
-from mlflow.exceptions import MlflowException
-import joblib
+# mlflow / joblib / yaml 在首次加载时才导入：导入本模块（以及 app_fast）不加载 MLflow 全家桶
+import hashlib
 import json
-import yaml
 import pickle
-from typing import Any, Dict, Union, Optional
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Union, Optional, Tuple
 import tempfile
 
+from .artifact_cache import ArtifactCache
+from ..config.settings import settings
+
+# runs:/<run_id>/<artifact_path> 形式的 URI 指向不可变内容，可以缓存到本地
+_RUNS_URI = re.compile(r"^runs:/(?P<run_id>[^/]+)/(?P<path>.+)$")
+
+
+def _bad_request(message: str) -> Exception:
+    from mlflow.exceptions import MlflowException
+    return MlflowException(message, error_code="BAD_REQUEST")
+
+# 反序列化锁：并行加载时下载可以并发，但多个线程同时 unpickle 会并发触发
+# sklearn 等模块的首次导入，可能导致 "deadlock detected by _ModuleLock"
+_deserialize_lock = threading.Lock()
+
+# 本地持久化缓存（可通过配置关闭）
+artifact_cache = ArtifactCache(
+    settings.ARTIFACT_CACHE_DIR, settings.ARTIFACT_CACHE_MAX_MB * 1024 * 1024
+) if settings.ARTIFACT_CACHE_ENABLED else None
+
+
+class SharedArtifactPool:
+    """
+    按文件内容哈希复用反序列化后的对象：多个模型版本引用内容相同的
+    encoder / scaler / feature_columns 时只在内存中保留一份（这些对象在推理时只读）
+    """
+
+    def __init__(self):
+        self._objects: Dict[str, Any] = {}  # sha256 -> 对象
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    @staticmethod
+    def digest(path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def get(self, digest: str) -> Optional[Any]:
+        with self._lock:
+            obj = self._objects.get(digest)
+            if obj is not None:
+                self.hits += 1
+            return obj
+
+    def put(self, digest: str, obj: Any) -> Any:
+        """写入并返回池中的对象（并发加载同一内容时以先写入的为准）"""
+        with self._lock:
+            return self._objects.setdefault(digest, obj)
+
+    def prune(self, live: Iterable[Any]):
+        """只保留仍被引用的对象（按对象身份判断）"""
+        live_ids = {id(obj) for obj in live}
+        with self._lock:
+            self._objects = {k: v for k, v in self._objects.items() if id(v) in live_ids}
+
+    def stats(self) -> dict:
+        return {"objects": len(self._objects), "hits": self.hits}
+
+
 class MLflowArtifactLoader:
     """
     仿 mlflow.artifacts.load_dict 的通用 artifact 加载工具类，
     支持 joblib、json、yaml、pickle 等格式。
+
+    runs:/<run_id>/<path> 形式的 URI 会缓存到本地 ArtifactCache，
+    重复加载直接读本地文件，Tracking Server 不可用时也能从缓存启动。
     """
 
     @staticmethod
-    def load_joblib(artifact_uri: str, tracking_uri: Optional[str] = None) -> Any:
+    def _run_artifact(artifact_uri: str) -> Optional[Tuple[str, str]]:
+        match = _RUNS_URI.match(artifact_uri)
+        if match is None or artifact_cache is None:
+            return None
+        return match.group("run_id"), match.group("path")
+
+    @staticmethod
+    @contextmanager
+    def _local_file(artifact_uri: str, tracking_uri: Optional[str] = None):
+        """得到 artifact 的本地路径：优先命中本地缓存，否则下载到临时目录（可缓存的顺便写入缓存）"""
+        run_artifact = MLflowArtifactLoader._run_artifact(artifact_uri)
+        cached = artifact_cache.get_file(*run_artifact) if run_artifact else None
+        if cached is not None:
+            yield str(cached)
+        else:
+            from mlflow import artifacts
+            with tempfile.TemporaryDirectory() as tmpdir:
+                local_path = artifacts.download_artifacts(
+                    artifact_uri=artifact_uri,
+                    dst_path=tmpdir,
+                    tracking_uri=tracking_uri
+                )
+                if run_artifact:
+                    local_path = str(artifact_cache.put_file(*run_artifact, local_path))
+                yield local_path
+
+    @staticmethod
+    def load_joblib(artifact_uri: str, tracking_uri: Optional[str] = None,
+                    shared: Optional[SharedArtifactPool] = None) -> Any:
         """
         从远程 URI 加载 joblib 保存的文件（.pkl, .joblib）
 
@@ -25,6 +119,7 @@ class MLflowArtifactLoader:
                 - runs:/abc123/artifacts/models/scaler.pkl
                 - s3://bucket/path/to/file.pkl
             tracking_uri: MLflow Tracking Server 地址（可选）
+            shared: 共享对象池（可选）；内容相同的文件返回同一个对象
 
         Returns:
             joblib.load() 加载的对象
@@ -34,79 +129,65 @@ class MLflowArtifactLoader:
                 "models:/HousingPriceModel@Production/models/ocean_encoder.pkl"
             )
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            local_path = artifacts.download_artifacts(
-                artifact_uri=artifact_uri,
-                dst_path=tmpdir,
-                tracking_uri=tracking_uri
-            )
+        import joblib
+
+        with MLflowArtifactLoader._local_file(artifact_uri, tracking_uri) as local_path:
+            digest = shared.digest(local_path) if shared is not None else None
+            cached = shared.get(digest) if digest is not None else None
+            if cached is not None:
+                return cached
             try:
-                return joblib.load(local_path)
+                with _deserialize_lock:
+                    obj = joblib.load(local_path)
             except Exception as e:
-                raise MlflowException(f"Failed to load joblib artifact from {artifact_uri}: {e}", error_code="BAD_REQUEST")
+                raise _bad_request(f"Failed to load joblib artifact from {artifact_uri}: {e}")
+            return shared.put(digest, obj) if digest is not None else obj
 
     @staticmethod
     def load_pickle(artifact_uri: str, tracking_uri: Optional[str] = None) -> Any:
         """
         加载标准 pickle 文件（.pkl）
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            local_path = artifacts.download_artifacts(
-                artifact_uri=artifact_uri,
-                dst_path=tmpdir,
-                tracking_uri=tracking_uri
-            )
+        with MLflowArtifactLoader._local_file(artifact_uri, tracking_uri) as local_path:
             with open(local_path, 'rb') as f:
                 try:
-                    return pickle.load(f)
+                    with _deserialize_lock:
+                        return pickle.load(f)
                 except Exception as e:
-                    raise MlflowException(f"Failed to unpickle artifact from {artifact_uri}: {e}", error_code="BAD_REQUEST")
+                    raise _bad_request(f"Failed to unpickle artifact from {artifact_uri}: {e}")
 
     @staticmethod
     def load_json(artifact_uri: str, tracking_uri: Optional[str] = None) -> Dict[str, Any]:
         """
         加载 JSON 文件（.json）
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            local_path = artifacts.download_artifacts(
-                artifact_uri=artifact_uri,
-                dst_path=tmpdir,
-                tracking_uri=tracking_uri
-            )
+        with MLflowArtifactLoader._local_file(artifact_uri, tracking_uri) as local_path:
             with open(local_path, 'r', encoding='utf-8') as f:
                 try:
                     return json.load(f)
                 except json.JSONDecodeError as e:
-                    raise MlflowException(f"Invalid JSON in {artifact_uri}: {e}", error_code="BAD_REQUEST")
+                    raise _bad_request(f"Invalid JSON in {artifact_uri}: {e}")
 
     @staticmethod
     def load_yaml(artifact_uri: str, tracking_uri: Optional[str] = None) -> Dict[str, Any]:
         """
         加载 YAML 文件（.yml, .yaml）
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            local_path = artifacts.download_artifacts(
-                artifact_uri=artifact_uri,
-                dst_path=tmpdir,
-                tracking_uri=tracking_uri
-            )
+        import yaml
+
+        with MLflowArtifactLoader._local_file(artifact_uri, tracking_uri) as local_path:
             with open(local_path, 'r', encoding='utf-8') as f:
                 try:
                     return yaml.safe_load(f)
                 except yaml.YAMLError as e:
-                    raise MlflowException(f"Invalid YAML in {artifact_uri}: {e}", error_code="BAD_REQUEST")
+                    raise _bad_request(f"Invalid YAML in {artifact_uri}: {e}")
 
     @staticmethod
     def load_text(artifact_uri: str, tracking_uri: Optional[str] = None) -> str:
         """
         加载纯文本文件（.txt, .log, .md 等）
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            local_path = artifacts.download_artifacts(
-                artifact_uri=artifact_uri,
-                dst_path=tmpdir,
-                tracking_uri=tracking_uri
-            )
+        with MLflowArtifactLoader._local_file(artifact_uri, tracking_uri) as local_path:
             with open(local_path, 'r', encoding='utf-8') as f:
                 return f.read()
 
@@ -115,15 +196,35 @@ class MLflowArtifactLoader:
         """
         加载二进制文件（如图片、PDF 等）
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            local_path = artifacts.download_artifacts(
-                artifact_uri=artifact_uri,
-                dst_path=tmpdir,
-                tracking_uri=tracking_uri
-            )
+        with MLflowArtifactLoader._local_file(artifact_uri, tracking_uri) as local_path:
             with open(local_path, 'rb') as f:
                 return f.read()
 
+    @staticmethod
+    def load_pyfunc_model(model_uri: str, run_id: Optional[str] = None, tracking_uri: Optional[str] = None):
+        """
+        加载 pyfunc 模型。提供 run_id 时模型目录以 (run_id, model_uri) 为 key 缓存到本地，
+        要求 model_uri 指向不可变的内容（如 models:/Name/<version>，不能是别名）
+
+        Example:
+            model = MLflowArtifactLoader.load_pyfunc_model("models:/HousingPriceModel/3", run_id=run_id)
+        """
+        from mlflow import artifacts, pyfunc
+
+        cacheable = run_id is not None and artifact_cache is not None
+        local_dir = artifact_cache.get_dir(run_id, model_uri) if cacheable else None
+        with tempfile.TemporaryDirectory() as tmpdir:
+            if local_dir is None:
+                local_dir = artifacts.download_artifacts(
+                    artifact_uri=model_uri,
+                    dst_path=tmpdir,
+                    tracking_uri=tracking_uri
+                )
+                if cacheable:
+                    local_dir = artifact_cache.put_dir(run_id, model_uri, local_dir)
+            with _deserialize_lock:
+                return pyfunc.load_model(str(local_dir))
+
     @staticmethod
     def download_to_path(artifact_uri: str, dst_path: str, tracking_uri: Optional[str] = None) -> str:
         """
@@ -132,8 +233,10 @@ class MLflowArtifactLoader:
         Returns:
             下载后的本地路径
         """
+        from mlflow import artifacts
+
         return artifacts.download_artifacts(
             artifact_uri=artifact_uri,
             dst_path=dst_path,
             tracking_uri=tracking_uri
-        )
\ No newline at end of file
+        )
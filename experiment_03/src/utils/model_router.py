@@ -0,0 +1,139 @@
+# model_router.py
+import random
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ModelRouter:
+    """
+    多版本路由：每个别名对应一个服务状态（ServingState），请求按权重随机分流到已加载的别名。
+
+    影子别名（shadow_alias）不参与分流：主版本响应后，影子版本在独立的单线程池中
+    对同一请求打分，只记录耗时和预测差异，不影响响应；积压超过 shadow_max_pending 时丢弃。
+    状态替换是单次字典赋值，进行中的请求继续持有旧状态的引用。
+    """
+
+    def __init__(self, weights: Dict[str, float], shadow_alias: Optional[str] = None,
+                 shadow_max_pending: int = 100, seed: Optional[int] = None):
+        if not weights or any(weight < 0 for weight in weights.values()) or sum(weights.values()) <= 0:
+            raise ValueError(f"无效的分流权重: {weights}")
+        self.weights = dict(weights)
+        self.shadow_alias = shadow_alias or None
+        self.shadow_max_pending = shadow_max_pending
+        self.states: Dict[str, Any] = {}
+
+        self._random = random.Random(seed)
+        self._routes: Tuple[List[str], List[float]] = ([], [])
+        self._lock = threading.Lock()
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow") if self.shadow_alias else None
+
+        # 统计信息
+        self.routed = {alias: 0 for alias in self.weights}
+        self.shadow_scored = 0
+        self.shadow_errors = 0
+        self.shadow_dropped = 0
+        self.shadow_pending = 0
+        self.shadow_seconds = 0.0
+        self.shadow_abs_delta = 0.0
+        self.shadow_max_abs_delta = 0.0
+
+    @property
+    def aliases(self) -> List[str]:
+        """需要加载的全部别名（分流别名 + 影子别名）"""
+        aliases = list(self.weights)
+        if self.shadow_alias and self.shadow_alias not in aliases:
+            aliases.append(self.shadow_alias)
+        return aliases
+
+    def get(self, alias: str):
+        return self.states.get(alias)
+
+    def set(self, alias: str, state):
+        """替换某个别名的服务状态，并重建分流表（只包含已加载的别名）"""
+        self.states[alias] = state
+        loaded = [alias for alias in self.weights if alias in self.states and self.weights[alias] > 0]
+        self._routes = (loaded, list(accumulate(self.weights[alias] for alias in loaded)))
+
+    def live_states(self) -> List[Any]:
+        return list(self.states.values())
+
+    def choose(self) -> Tuple[str, Any]:
+        """按权重选择一个已加载的别名，返回 (alias, state)"""
+        aliases, cumulative = self._routes
+        if not aliases:
+            raise RuntimeError("没有已加载的模型版本")
+        if len(aliases) == 1:
+            alias = aliases[0]
+        else:
+            alias = aliases[bisect_right(cumulative, self._random.random() * cumulative[-1])]
+        with self._lock:
+            self.routed[alias] += 1
+        return alias, self.states[alias]
+
+    # ------------------------------------------------------------------
+    # 影子打分
+    # ------------------------------------------------------------------
+    def submit_shadow(self, fn: Callable, *args) -> bool:
+        """提交影子打分任务；未配置影子、影子未加载或积压已满时返回 False"""
+        if self._shadow_pool is None or self.get(self.shadow_alias) is None:
+            return False
+        with self._lock:
+            if self.shadow_pending >= self.shadow_max_pending:
+                self.shadow_dropped += 1
+                return False
+            self.shadow_pending += 1
+        future = self._shadow_pool.submit(fn, self.get(self.shadow_alias), *args)
+        future.add_done_callback(self._shadow_done)
+        return True
+
+    def _shadow_done(self, future):
+        with self._lock:
+            self.shadow_pending -= 1
+            if future.exception() is not None:
+                self.shadow_errors += 1
+
+    def record_shadow(self, primary_value: float, shadow_value: float, seconds: float):
+        delta = abs(shadow_value - primary_value)
+        with self._lock:
+            self.shadow_scored += 1
+            self.shadow_seconds += seconds
+            self.shadow_abs_delta += delta
+            self.shadow_max_abs_delta = max(self.shadow_max_abs_delta, delta)
+
+    def shutdown(self, wait: bool = False):
+        """停止影子线程池；wait=False 时丢弃尚未开始的影子任务"""
+        if self._shadow_pool is not None:
+            self._shadow_pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def stats(self) -> dict:
+        total_weight = sum(self.weights[alias] for alias in self._routes[0]) or 1.0
+        with self._lock:
+            routed = dict(self.routed)
+        stats = {
+            "routes": {
+                alias: {
+                    "weight": self.weights[alias],
+                    "effective_share": round(self.weights[alias] / total_weight, 4) if alias in self._routes[0] else 0.0,
+                    "version": getattr(self.states.get(alias), "version", None),
+                    "routed": routed[alias],
+                }
+                for alias in self.weights
+            },
+        }
+        if self.shadow_alias:
+            scored = self.shadow_scored
+            stats["shadow"] = {
+                "alias": self.shadow_alias,
+                "version": getattr(self.states.get(self.shadow_alias), "version", None),
+                "scored": scored,
+                "errors": self.shadow_errors,
+                "dropped": self.shadow_dropped,
+                "pending": self.shadow_pending,
+                "avg_ms": round(self.shadow_seconds / scored * 1000, 3) if scored else 0.0,
+                "mean_abs_delta": round(self.shadow_abs_delta / scored, 2) if scored else 0.0,
+                "max_abs_delta": round(self.shadow_max_abs_delta, 2),
+            }
+        return stats
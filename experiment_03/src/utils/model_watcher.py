@@ -0,0 +1,101 @@
+# model_watcher.py
+import asyncio
+import time
+from typing import Any, Callable, Optional, Tuple
+
+
+class ModelWatcher:
+    """
+    模型热更新：后台定期轮询注册表别名，别名指向新版本时在请求路径之外加载，
+    加载完成后通过 on_swap 一次性替换服务状态。
+
+    - resolve_fn() -> (version, run_id)，在线程中执行
+    - load_fn(version, run_id) -> state，在线程中执行（下载 + 反序列化 + 编译）
+    - on_swap(state)，在事件循环中执行，只做引用替换
+    - current_version_fn() -> 当前正在服务的版本
+
+    解析或加载失败只记录日志，继续使用旧版本；同一版本加载失败后
+    在下一个轮询周期重试。
+    """
+
+    def __init__(self, resolve_fn: Callable[[], Tuple[str, str]], load_fn: Callable[[str, str], Any],
+                 on_swap: Callable[[Any], None], current_version_fn: Callable[[], Optional[str]],
+                 interval_seconds: float = 30, name: str = ""):
+        self.resolve_fn = resolve_fn
+        self.load_fn = load_fn
+        self.on_swap = on_swap
+        self.current_version_fn = current_version_fn
+        self.interval_seconds = interval_seconds
+        self.name = name  # 日志中区分多个别名的监视器
+
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_check_at: Optional[float] = None
+        self.last_reload_at: Optional[float] = None
+        self.last_reload_ms: Optional[float] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._watch())
+        print(f"✅ 模型热更新已启用{self._label}: 每 {self.interval_seconds}s 检查一次别名")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def _label(self) -> str:
+        return f"（{self.name}）" if self.name else ""
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.check()
+
+    async def check(self) -> bool:
+        """检查一次别名，版本变化时加载并替换；返回是否发生了替换"""
+        self.checks += 1
+        self.last_check_at = time.time()
+        try:
+            version, run_id = await asyncio.to_thread(self.resolve_fn)
+            current = self.current_version_fn()
+            if version == current:
+                return False
+
+            print(f"🔄 检测到模型别名变化{self._label}: v{current} -> v{version}，后台加载中...")
+            start = time.perf_counter()
+            state = await asyncio.to_thread(self.load_fn, version, run_id)
+            self.on_swap(state)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"⚠️ 模型热更新失败{self._label}，继续使用当前版本: {e}")
+            return False
+
+        self.reloads += 1
+        self.last_reload_at = time.time()
+        self.last_reload_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"✅ 模型{self._label}已切换到 v{version}（加载耗时 {self.last_reload_ms:.0f} ms）")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "interval_seconds": self.interval_seconds,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_check_at": self.last_check_at,
+            "last_reload_at": self.last_reload_at,
+            "last_reload_ms": self.last_reload_ms,
+        }
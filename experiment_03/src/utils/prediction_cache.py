@@ -0,0 +1,92 @@
+# prediction_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class PredictionCache:
+    """
+    进程内预测结果缓存（LRU + TTL）。
+
+    key = 规范化 HouseFeatures 字段 + 模型版本 的哈希，
+    命中时跳过特征构造和推理；模型版本变化时（bind_version）自动清空。
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        self.max_size = max(0, max_size)
+        self.ttl_seconds = ttl_seconds
+        self.model_version = None
+
+        self._data = OrderedDict()  # key -> (过期时间, 结果)
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(features: dict, model_version: Any) -> str:
+        """字段按名称排序后序列化，保证相同输入得到相同 key"""
+        canonical = json.dumps(features, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.blake2b(f"{model_version}|{canonical}".encode('utf-8'), digest_size=16).hexdigest()
+
+    def bind_version(self, model_version: Any):
+        """绑定当前模型版本；版本变化时清空缓存"""
+        with self._lock:
+            if model_version != self.model_version:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self.model_version = model_version
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "model_version": self.model_version,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,47 @@
+# readiness.py
+import time
+from typing import Optional
+
+STARTING = "starting"
+LOADING = "loading"
+WARMING_UP = "warming_up"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """
+    服务就绪状态（/ready）：starting -> loading -> warming_up -> ready。
+    主版本加载或预热失败时为 failed，之后热更新加载成功会恢复为 ready；
+    进入 ready 后不再回退（热更新失败时继续服务旧版本）。
+    """
+
+    def __init__(self):
+        self.phase = STARTING
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self._start = time.perf_counter()
+        self._time_to_ready: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == READY
+
+    def set_phase(self, phase: str, error: Optional[str] = None):
+        if self.ready:
+            return
+        self.phase = phase
+        self.error = error
+        if phase == READY:
+            self.ready_at = time.time()
+            self._time_to_ready = time.perf_counter() - self._start
+
+    def stats(self) -> dict:
+        return {
+            "status": self.phase,
+            "error": self.error,
+            "started_at": self.started_at,
+            "ready_at": self.ready_at,
+            "time_to_ready_ms": round(self._time_to_ready * 1000, 1) if self._time_to_ready is not None else None,
+        }
@@ -1,3 +1,7 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
@@ -9,6 +13,81 @@ from ..config.settings import settings
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 
+class VerifiedTokenCache:
+    """
+    已验证令牌缓存：key 为令牌摘要，缓存有效期不超过令牌的 exp（也不超过 ttl_seconds）。
+    命中时跳过 jwt.decode 的签名校验；密钥或算法变化时自动清空。
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()  # 摘要 -> (失效时间, payload)
+        self._lock = threading.Lock()
+        self._signing_key = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+    def _check_signing_key(self):
+        signing_key = (settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+        if signing_key != self._signing_key:
+            self._data.clear()
+            self._signing_key = signing_key
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        with self._lock:
+            self._check_signing_key()
+            entry = self._data.get(digest)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._data[digest]
+                self.misses += 1
+                return None
+            self._data.move_to_end(digest)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, digest: bytes, payload: dict):
+        expires_at = time.time() + self.ttl_seconds
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = min(expires_at, payload["exp"])
+        with self._lock:
+            self._check_signing_key()
+            self._data[digest] = (expires_at, payload)
+            self._data.move_to_end(digest)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = VerifiedTokenCache(
+    max_size=settings.JWT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.JWT_CACHE_TTL_SECONDS
+) if settings.JWT_CACHE_ENABLED else None
+
+
 class JWTManager:
     """JWT 工具类"""
 
@@ -22,11 +101,25 @@ class JWTManager:
 
     @staticmethod
     def decode_token(token: str):
+        digest = None
+        if token_cache is not None:
+            digest = token_cache.digest(token)
+            payload = token_cache.get(digest)
+            if payload is not None:
+                return dict(payload)
         try:
             payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-            return payload
         except JWTError:
             return None
+        if digest is not None:
+            token_cache.put(digest, payload)
+        return payload
+
+    @staticmethod
+    def invalidate_token_cache():
+        """密钥轮换等场景下手动清空已验证令牌缓存"""
+        if token_cache is not None:
+            token_cache.clear()
 
     @staticmethod
     def verify_token(token: str = Depends(oauth2_scheme)):
@@ -0,0 +1,122 @@
+# streaming.py
+import asyncio
+import tempfile
+from typing import AsyncIterator, Callable, List, Optional
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+
+async def iter_ndjson_chunks(byte_stream: AsyncIterator[bytes], chunk_size: int,
+                             max_line_bytes: int) -> AsyncIterator[List[bytes]]:
+    """
+    把请求体字节流切分为 NDJSON 行，每 chunk_size 行产出一次（跳过空行）。
+    内存中最多保留一个分块和一行未完成的数据；单行超过 max_line_bytes 时抛出 ValueError
+    """
+    chunk_size = max(1, chunk_size)
+    pending = b""
+    lines = []
+    async for data in byte_stream:
+        pending += data
+        if b"\n" not in data:
+            if len(pending) > max_line_bytes:
+                raise ValueError(f"单行超过 {max_line_bytes} 字节")
+            continue
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            if len(line) > max_line_bytes:
+                raise ValueError(f"单行超过 {max_line_bytes} 字节")
+            if line.strip():
+                lines.append(line)
+        while len(lines) >= chunk_size:
+            yield lines[:chunk_size]
+            lines = lines[chunk_size:]
+    if pending.strip():
+        lines.append(pending)
+    if lines:
+        yield lines
+
+
+class SpooledPipe:
+    """
+    单生产者 / 单消费者的异步字节管道，数据先写入临时文件（超过 max_memory_bytes 后落盘）。
+
+    多数 HTTP/1.1 客户端（requests、httpx 等）在上传完请求体之前不会读取响应。
+    如果推理结果直接写入网络连接，服务端会阻塞在写响应上、不再读取请求体，
+    双方互相等待。经过管道后，生产者写入永不阻塞：客户端边传边读时结果即时流出，
+    否则结果暂存在临时文件中，上传结束后再发送。读者追上写者时文件被截断复用。
+    """
+
+    READ_SIZE = 1 << 16
+
+    def __init__(self, max_memory_bytes: int = 1 << 20):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+        self._read_pos = 0
+        self._write_pos = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._readable = asyncio.Event()
+
+    def write(self, data: bytes):
+        self._file.seek(self._write_pos)
+        self._file.write(data)
+        self._write_pos += len(data)
+        self._readable.set()
+
+    def close(self, error: Optional[BaseException] = None):
+        """生产者结束；error 不为空时消费者在读完已有数据后抛出该异常"""
+        self._closed = True
+        self._error = error
+        self._readable.set()
+
+    def discard(self):
+        self._file.close()
+
+    async def __aiter__(self):
+        while True:
+            if self._read_pos < self._write_pos:
+                self._file.seek(self._read_pos)
+                data = self._file.read(min(self.READ_SIZE, self._write_pos - self._read_pos))
+                self._read_pos += len(data)
+                if self._read_pos == self._write_pos:
+                    self._file.seek(0)
+                    self._file.truncate()
+                    self._read_pos = self._write_pos = 0
+                yield data
+            elif self._closed:
+                if self._error is not None:
+                    raise self._error
+                return
+            else:
+                self._readable.clear()
+                await self._readable.wait()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    边读请求体边写响应的流式响应。
+
+    StreamingResponse 在 ASGI spec_version < 2.4（如 uvicorn）时会另起任务循环调用 receive()
+    监听客户端断开，与接口中读取请求体争抢消息。这里不单独监听：客户端断开时
+    读取请求体会抛出 ClientDisconnect，写响应失败会抛出 OSError。
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, content, on_close: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close  # 响应结束（包括客户端断开）时调用，如释放推理名额
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            if self.on_close is not None:
+                self.on_close()
+        if self.background is not None:
+            await self.background()
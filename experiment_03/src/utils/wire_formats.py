@@ -0,0 +1,181 @@
+# wire_formats.py
+"""
+预测接口的传输格式：JSON（默认）、MessagePack、Arrow IPC（列式，仅批量接口），按 Content-Type / Accept 协商。
+
+- JSON 使用 orjson 序列化（未安装时回退到标准库 json）
+- MessagePack 需要安装 msgpack，未安装时视为不支持的格式（415 / 406）
+- Arrow IPC 请求体直接转换为 NumPy 数组，不为每行构造 Python 对象；响应同样是列式的
+"""
+import importlib.util
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# 常见的别名
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.file": None,  # 只支持流式 IPC 格式
+}
+
+
+def is_available(media_type: str) -> bool:
+    """格式对应的依赖是否已安装（不导入，避免拖慢启动）"""
+    if media_type == MSGPACK:
+        return importlib.util.find_spec("msgpack") is not None
+    if media_type == ARROW:
+        return importlib.util.find_spec("pyarrow") is not None
+    return media_type == JSON
+
+
+def _canonical(media_type: str) -> Optional[str]:
+    media_type = media_type.split(";", 1)[0].strip().lower()
+    return _ALIASES.get(media_type, media_type)
+
+
+# ======================================
+# 🤝 内容协商
+# ======================================
+def request_format(content_type: Optional[str], supported: Sequence[str]) -> str:
+    """请求体格式：未声明时按 JSON 处理；不支持或依赖未安装时返回 415"""
+    media_type = _canonical(content_type) if content_type else JSON
+    if media_type not in supported or not is_available(media_type):
+        raise HTTPException(status_code=415, detail=f"不支持的请求格式: {content_type}，可选: {list(supported)}")
+    return media_type
+
+
+def response_format(accept: Optional[str], supported: Sequence[str]) -> str:
+    """按 Accept（含 q 值）选择响应格式；未声明或为 */* 时返回 JSON，没有可用格式时返回 406"""
+    if not accept:
+        return JSON
+    candidates = []
+    for order, item in enumerate(accept.split(",")):
+        media_type, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        candidates.append((-q, order, media_type.strip().lower()))
+
+    for neg_q, _, media_type in sorted(candidates):
+        if neg_q == 0:
+            break
+        if media_type in ("*/*", "application/*"):
+            return JSON
+        media_type = _canonical(media_type)
+        if media_type in supported and is_available(media_type):
+            return media_type
+    raise HTTPException(status_code=406, detail=f"不支持的响应格式: {accept}，可选: {list(supported)}")
+
+
+# ======================================
+# 📤 序列化
+# ======================================
+def dumps_json(content) -> bytes:
+    """紧凑 UTF-8 JSON（与 JSONResponse 的输出格式一致）"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson 渲染的 JSONResponse"""
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+
+def render(content, media_type: str, headers: Optional[dict] = None) -> Response:
+    """按协商结果渲染字典 / 列表（JSON 或 MessagePack）"""
+    if media_type == MSGPACK:
+        import msgpack
+        return Response(msgpack.packb(content, use_bin_type=True), media_type=MSGPACK, headers=headers)
+    return FastJSONResponse(content, headers=headers)
+
+
+def render_arrow_batch(predictions: np.ndarray, errors: Dict[int, str]) -> Response:
+    """批量结果的列式响应：index、predicted_price（失败行为 null）、error（成功行为 null）"""
+    import pyarrow as pa
+
+    n = len(predictions)
+    failed = np.zeros(n, dtype=bool)
+    failed[list(errors)] = True
+    error_column = [None] * n
+    for i, message in errors.items():
+        error_column[i] = message
+    table = pa.table({
+        "index": pa.array(np.arange(n, dtype=np.int64)),
+        "predicted_price": pa.array(predictions.round(2), mask=failed),
+        "error": pa.array(error_column, type=pa.string()),
+    }, metadata={"count": str(n), "failed": str(len(errors))})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW)
+
+
+# ======================================
+# 📥 反序列化
+# ======================================
+def loads_msgpack(body: bytes):
+    import msgpack
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"无效的 MessagePack 请求体: {e}")
+
+
+def columns_to_arrays(columns: Dict[str, Sequence], numeric: Sequence[str],
+                      categorical: str) -> Tuple[np.ndarray, List]:
+    """列式数据 {列名: 值列表} -> (数值矩阵 shape=(n, len(numeric)), 类别列)"""
+    missing = [name for name in (*numeric, categorical) if name not in columns]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"缺少列: {missing}")
+    n = len(columns[categorical])
+    if any(len(columns[name]) != n for name in numeric):
+        raise HTTPException(status_code=422, detail="各列长度不一致")
+    raw = np.empty((n, len(numeric)))
+    for j, name in enumerate(numeric):
+        try:
+            raw[:, j] = np.asarray(columns[name], dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=f"列 {name} 不是数值: {e}")
+    return raw, list(columns[categorical])
+
+
+def read_arrow(body: bytes, numeric: Sequence[str], categorical: str) -> Tuple[np.ndarray, List]:
+    """Arrow IPC 流 -> (数值矩阵, 类别列)；数值列中的 null 转为 NaN（之后按无效行处理）"""
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"无效的 Arrow IPC 请求体: {e}")
+    missing = [name for name in (*numeric, categorical) if name not in table.column_names]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"缺少列: {missing}")
+
+    raw = np.empty((table.num_rows, len(numeric)))
+    for j, name in enumerate(numeric):
+        try:
+            raw[:, j] = table.column(name).cast(pa.float64()).to_numpy()
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"列 {name} 不是数值: {e}")
+    return raw, table.column(categorical).cast(pa.string()).to_pylist()
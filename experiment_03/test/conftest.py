@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder
+
+from ..src import app_fast
+from ..src.utils.model_router import ModelRouter
+
+OCEAN_CATEGORIES = ['<1H OCEAN', 'INLAND', 'ISLAND', 'NEAR BAY', 'NEAR OCEAN']
+
+
+@pytest.fixture
+def serving_artifacts(monkeypatch):
+    """用随机数据拟合一套小型 encoder/model，替代 lifespan 中从 MLflow 加载的依赖"""
+    rng = np.random.default_rng(0)
+    n = 200
+    raw = pd.DataFrame({
+        'longitude': rng.uniform(-124, -114, n),
+        'latitude': rng.uniform(32, 42, n),
+        'housing_median_age': rng.uniform(1, 52, n),
+        'total_rooms': rng.uniform(100, 8000, n),
+        'total_bedrooms': rng.uniform(20, 1500, n),
+        'population': rng.uniform(50, 5000, n),
+        'households': rng.uniform(20, 1500, n),
+        'median_income': rng.uniform(0.5, 15, n),
+    })
+    raw['rooms_per_household'] = raw['total_rooms'] / raw['households']
+    raw['bedrooms_per_room'] = raw['total_bedrooms'] / raw['total_rooms']
+    raw['population_per_household'] = raw['population'] / raw['households']
+
+    encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    categories = pd.DataFrame({'ocean_proximity': rng.choice(OCEAN_CATEGORIES, n)})
+    encoded = encoder.fit_transform(categories)
+    encoded_df = pd.DataFrame(encoded, columns=encoder.get_feature_names_out(['ocean_proximity']))
+    x = pd.concat([raw, encoded_df], axis=1)
+    y = raw['median_income'] * 50000 + rng.normal(0, 1000, n)
+
+    model = RandomForestRegressor(n_estimators=5, max_depth=4, random_state=42).fit(x, y)
+
+    monkeypatch.setattr(app_fast, "router", ModelRouter({app_fast.MODEL_ALIAS: 1.0}))
+    app_fast.swap_state(app_fast.MODEL_ALIAS, app_fast.ServingState("test", None, model, encoder, None, x.columns.tolist()))
+    if app_fast.prediction_cache is not None:
+        app_fast.prediction_cache.clear()
+    return model, encoder, x.columns.tolist()
@@ -20,4 +20,251 @@ def test_predict_missing_field():
     token = get_token()
     headers = {"Authorization": f"Bearer {token}"}
     response = client.post("/predict", json={}, headers=headers)
-    assert response.status_code == 422  # 验证失败是预期行为
\ No newline at end of file
+    assert response.status_code == 422  # 验证失败是预期行为
+
+HOUSE = {
+    "longitude": -122.23,
+    "latitude": 37.88,
+    "housing_median_age": 15,
+    "total_rooms": 5612,
+    "total_bedrooms": 1283,
+    "population": 1015,
+    "households": 478,
+    "median_income": 1.4936,
+    "ocean_proximity": "<1H OCEAN"
+}
+
+def test_predict_batch_matches_single(serving_artifacts):
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    single = client.post("/predict", json=HOUSE, headers=headers).json()
+    batch = client.post("/predict/batch", json=[HOUSE, {**HOUSE, "households": 0}, HOUSE], headers=headers)
+    assert batch.status_code == 200
+    body = batch.json()
+    assert body["count"] == 3 and body["failed"] == 1
+    assert body["results"][0]["predicted_price"] == single["predicted_price"]
+    assert body["results"][2]["predicted_price"] == single["predicted_price"]
+    assert "error" in body["results"][1]
+
+def test_predict_batch_too_large(monkeypatch):
+    from ..src.config.settings import settings
+    monkeypatch.setattr(settings, "BATCH_MAX_SIZE", 1)
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    response = client.post("/predict/batch", json=[HOUSE, HOUSE], headers=headers)
+    assert response.status_code == 413
+
+def test_predict_uses_swapped_model(serving_artifacts):
+    from sklearn.dummy import DummyRegressor
+    from ..src import app_fast
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    before = client.post("/predict", json=HOUSE, headers=headers).json()
+
+    model, encoder, columns = serving_artifacts
+    _, current = app_fast.router.choose()
+    x = current.transformer.to_frame(current.transformer.transform_one(app_fast.HouseFeatures(**HOUSE)).copy())
+    dummy = DummyRegressor(strategy="constant", constant=123.0).fit(x, [0.0])
+    app_fast.swap_state(app_fast.MODEL_ALIAS, app_fast.ServingState("next", None, dummy, encoder, None, columns))
+
+    response = client.post("/predict", json=HOUSE, headers=headers)
+    assert response.json() == {"predicted_price": 123.0} != before
+    assert response.headers["X-Model-Version"] == "next"
+    assert client.get("/stats").json()["model"]["routes"][app_fast.MODEL_ALIAS]["version"] == "next"
+
+
+def test_predict_shadow_scores_without_changing_response(serving_artifacts, monkeypatch):
+    from sklearn.dummy import DummyRegressor
+    from ..src import app_fast
+    from ..src.utils.model_router import ModelRouter
+    model, encoder, columns = serving_artifacts
+    router = ModelRouter({app_fast.MODEL_ALIAS: 1.0}, shadow_alias="challenger")
+    monkeypatch.setattr(app_fast, "router", router)
+    primary = app_fast.ServingState("1", None, model, encoder, None, columns)
+    app_fast.swap_state(app_fast.MODEL_ALIAS, primary)
+    x = primary.transformer.to_frame(primary.transformer.transform_one(app_fast.HouseFeatures(**HOUSE)).copy())
+    dummy = DummyRegressor(strategy="constant", constant=123.0).fit(x, [0.0])
+    app_fast.swap_state("challenger", app_fast.ServingState("2", None, dummy, encoder, None, columns))
+
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    response = client.post("/predict", json=HOUSE, headers=headers)
+    router.shutdown(wait=True)
+
+    price = response.json()["predicted_price"]
+    assert response.headers["X-Model-Version"] == "1" and price != 123.0
+    shadow = client.get("/stats").json()["model"]["shadow"]
+    assert shadow["version"] == "2" and shadow["scored"] == 1
+    assert shadow["max_abs_delta"] == round(abs(price - 123.0), 2)
+
+def test_metrics_report_prediction_stages(serving_artifacts):
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    client.post("/predict", json=HOUSE, headers=headers)
+    client.post("/predict", json={}, headers=headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ("parse_validate", "jwt", "features", "encoding", "inference", "serialization"):
+        assert f'prediction_stage_seconds_count{{stage="{stage}"}}' in response.text
+    assert 'http_request_errors_total{path="/predict",status="422"}' in response.text
+    assert 'http_requests_in_flight 1.0' in response.text  # 仅 /metrics 自身
+
+def test_predict_stream_matches_batch(serving_artifacts, monkeypatch):
+    import json
+    from ..src.config.settings import settings
+    monkeypatch.setattr(settings, "STREAM_CHUNK_SIZE", 2)
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    records = [HOUSE, {**HOUSE, "households": 0}, {**HOUSE, "median_income": 8.0}, HOUSE]
+    batch = client.post("/predict/batch", json=records, headers=headers).json()["results"]
+
+    lines = [json.dumps(r) for r in records[:2]] + ["", '{"longitude": 1}'] + [json.dumps(r) for r in records[2:]]
+    response = client.post("/predict/stream", content="\n".join(lines), headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0] == batch[0] and results[3] == {**batch[2], "index": 3}
+    assert "error" in results[1] and results[2]["error"].startswith("无效记录")
+
+
+def test_shared_model_is_mapped_instead_of_loaded(serving_artifacts, monkeypatch, tmp_path):
+    from types import SimpleNamespace
+    from ..src import app_fast
+    from ..src.config.settings import settings
+    model, encoder, columns = serving_artifacts
+    monkeypatch.setattr(settings, "SHARED_MODEL_ENABLED", True)
+    monkeypatch.setattr(settings, "SHARED_MODEL_DIR", str(tmp_path))
+    calls = []
+
+    def fake_load(version, run_id, load_model=True):
+        calls.append(("artifacts", load_model))
+        return None, encoder, None, columns
+
+    def fake_load_pyfunc(version, run_id):
+        calls.append(("model", version))
+        return SimpleNamespace(get_raw_model=lambda: model)
+
+    monkeypatch.setattr(app_fast, "get_client", lambda: None)
+    monkeypatch.setattr(app_fast, "load_model_artifacts", fake_load)
+    monkeypatch.setattr(app_fast, "load_pyfunc_model", fake_load_pyfunc)
+    first = app_fast.load_serving_state("7", "run")  # 第一个 worker：编译并写入共享目录
+    second = app_fast.load_serving_state("7", "run")  # 后续 worker：直接映射，不加载模型
+    assert sorted(calls) == [("artifacts", False), ("artifacts", False), ("model", "7")]
+    assert first.model is None and second.model is None
+
+    _, current = app_fast.router.choose()
+    x = current.transformer.transform_one(app_fast.HouseFeatures(**HOUSE))
+    assert first.predictor(x) == second.predictor(x) == current.predictor(x)
+
+
+def test_predict_batch_arrow_matches_json(serving_artifacts):
+    import numpy as np
+    import pyarrow as pa
+    records = [HOUSE, {**HOUSE, "households": 0}, {**HOUSE, "ocean_proximity": "INLAND"}]
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    expected = client.post("/predict/batch", json=records, headers=headers).json()
+
+    table = pa.table({name: [r[name] for r in records] for name in HOUSE})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post("/predict/batch", content=sink.getvalue().to_pybytes(), headers={
+        **headers, "content-type": "application/vnd.apache.arrow.stream",
+        "accept": "application/vnd.apache.arrow.stream"})
+
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.schema.metadata[b"failed"] == b"1"
+    prices = result.column("predicted_price").to_pylist()
+    assert prices[1] is None and result.column("error").to_pylist()[1] == expected["results"][1]["error"]
+    np.testing.assert_allclose([prices[0], prices[2]],
+                               [expected["results"][0]["predicted_price"], expected["results"][2]["predicted_price"]])
+
+
+def test_predict_content_negotiation_errors():
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    assert client.post("/predict", json=HOUSE, headers={**headers, "accept": "text/csv"}).status_code == 406
+    response = client.post("/predict", content=b"x", headers={**headers, "content-type": "text/csv"})
+    assert response.status_code == 415
+
+
+def test_predict_msgpack_roundtrip(serving_artifacts):
+    import msgpack
+    headers = {"Authorization": f"Bearer {get_token()}", "content-type": "application/msgpack",
+               "accept": "application/msgpack"}
+    expected = client.post("/predict", json=HOUSE, headers={"Authorization": headers["Authorization"]}).json()
+    response = client.post("/predict", content=msgpack.packb(HOUSE), headers=headers)
+    assert msgpack.unpackb(response.content) == expected
+
+    columns = {name: [HOUSE[name]] * 2 for name in HOUSE}
+    response = client.post("/predict/batch", content=msgpack.packb(columns), headers=headers)
+    assert [r["predicted_price"] for r in msgpack.unpackb(response.content)["results"]] == [expected["predicted_price"]] * 2
+
+
+def test_ready_after_models_are_loaded_and_warmed(serving_artifacts, monkeypatch):
+    import asyncio
+    from ..src import app_fast
+    from ..src.utils.model_router import ModelRouter
+    from ..src.utils.readiness import Readiness
+    model, encoder, columns = serving_artifacts
+    monkeypatch.setattr(app_fast, "router", ModelRouter({app_fast.MODEL_ALIAS: 1.0}))
+    monkeypatch.setattr(app_fast, "readiness", Readiness())
+    monkeypatch.setattr(app_fast, "resolve_model_alias", lambda alias: ("7", "run"))
+    monkeypatch.setattr(app_fast, "load_serving_state",
+                        lambda version, run_id: app_fast.ServingState(version, run_id, model, encoder, None, columns))
+
+    # 加载完成前：存活检查正常，就绪检查 503，预测请求 503
+    assert client.get("/health").status_code == 200
+    assert client.get("/ready").status_code == 503
+    headers = {"Authorization": f"Bearer {get_token()}"}
+    assert client.post("/predict", json=HOUSE, headers=headers).status_code == 503
+
+    asyncio.run(app_fast.load_models())
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["status"] == "ready"
+    loaded = response.json()["models"][app_fast.MODEL_ALIAS]
+    assert loaded["version"] == "7" and loaded["warmup"]["predictions"] == app_fast.settings.WARMUP_PREDICTIONS
+
+
+
+def test_warm_up_runs_on_every_inference_thread_without_recording_metrics(serving_artifacts, monkeypatch):
+    import threading
+    from ..src import app_fast
+    from ..src.utils.inference_executor import InferenceExecutor
+    monkeypatch.setattr(app_fast, "inference_executor", InferenceExecutor(max_workers=3))
+    _, state = app_fast.router.choose()
+    threads = set()
+    predict_one = app_fast.predict_one
+
+    def tracking_predict_one(*args, **kwargs):
+        threads.add(threading.current_thread().name)
+        return predict_one(*args, **kwargs)
+
+    monkeypatch.setattr(app_fast, "predict_one", tracking_predict_one)
+    stage_counts = lambda: [sum(stage.counts) for stage in (app_fast.STAGE_INFERENCE, app_fast.STAGE_BATCH_INFERENCE)]
+    before = stage_counts()
+
+    monkeypatch.setattr(app_fast.settings, "WARMUP_PREDICTIONS", 7)
+    stats = app_fast.warm_up(state)
+    assert stats["predictions"] == 7 and stats["threads"] == 3 and stats["batch_size"] > 0
+    assert len(threads) == 3 and all(name.startswith("inference") for name in threads)
+
+    # 不做单条预测时仍预热批量路径
+    monkeypatch.setattr(app_fast.settings, "WARMUP_PREDICTIONS", 0)
+    stats = app_fast.warm_up(state)
+    assert stats["predictions"] == 0 and stats["batch_size"] == app_fast.settings.WARMUP_BATCH_SIZE
+    assert stage_counts() == before
+
+def test_ready_reports_failed_load(monkeypatch):
+    import asyncio
+    from ..src import app_fast
+    from ..src.utils.model_router import ModelRouter
+    from ..src.utils.readiness import Readiness
+    monkeypatch.setattr(app_fast, "router", ModelRouter({app_fast.MODEL_ALIAS: 1.0}))
+    monkeypatch.setattr(app_fast, "readiness", Readiness())
+
+    def unreachable(alias):
+        raise ConnectionError("registry unreachable")
+
+    monkeypatch.setattr(app_fast, "resolve_model_alias", unreachable)
+    asyncio.run(app_fast.load_models())
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed" and "unreachable" in response.json()["error"]
@@ -0,0 +1,46 @@
+import os
+
+import joblib
+
+from ..src.utils import mlflow_artifact_loader
+from ..src.utils.artifact_cache import ArtifactCache
+from ..src.utils.mlflow_artifact_loader import MLflowArtifactLoader
+
+
+def test_repeat_loads_are_served_from_cache(tmp_path, monkeypatch):
+    source = tmp_path / "remote" / "scaler.pkl"
+    source.parent.mkdir()
+    joblib.dump({"mean": [1.0, 2.0]}, source)
+    downloads = []
+
+    def fake_download(artifact_uri, dst_path, tracking_uri=None):
+        downloads.append(artifact_uri)
+        target = os.path.join(dst_path, "scaler.pkl")
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            dst.write(src.read())
+        return target
+
+    monkeypatch.setattr("mlflow.artifacts.download_artifacts", fake_download)  # 加载器按需导入 mlflow.artifacts
+    monkeypatch.setattr(mlflow_artifact_loader, "artifact_cache", ArtifactCache(str(tmp_path / "cache"), 1 << 20))
+
+    for _ in range(3):
+        assert MLflowArtifactLoader.load_joblib("runs:/abc123/scaler.pkl") == {"mean": [1.0, 2.0]}
+    assert downloads == ["runs:/abc123/scaler.pkl"]
+
+    # 其它 run 的相同内容只存一份
+    MLflowArtifactLoader.load_joblib("runs:/def456/scaler.pkl")
+    assert len(list((tmp_path / "cache" / "objects").glob("*/*"))) == 1
+
+
+def test_eviction_keeps_size_bounded(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=250)
+    for i in range(5):
+        src = tmp_path / f"blob{i}"
+        src.write_bytes(bytes([i]) * 100)
+        os.utime(src)
+        cache.put_file("run", f"blob{i}", str(src))
+
+    assert cache.get_file("run", "blob4") is not None
+    assert cache.get_file("run", "blob0") is None
+    total = sum(p.stat().st_size for p in (tmp_path / "cache" / "objects").glob("*/*"))
+    assert total <= 250
@@ -0,0 +1,24 @@
+import json
+import os
+
+from ..src.scripts.benchmark import build_request, read_process_stats, EXAMPLE_ROW
+
+
+def test_build_request_shapes_payload_per_scenario():
+    rows = [{**EXAMPLE_ROW, "households": i + 1} for i in range(3)]
+    assert build_request("predict", rows, 4, 10) == ("/predict", {"json": rows[1]}, 1)
+
+    path, kwargs, n = build_request("batch", rows, 1, 2)
+    assert path == "/predict/batch" and n == 2 and kwargs["json"] == [rows[2], rows[0]]
+
+    path, kwargs, n = build_request("stream", rows, 0, 4)
+    lines = [json.loads(line) for line in kwargs["content"].splitlines()]
+    assert path == "/predict/stream" and n == 4 and lines == rows + rows[:1]
+
+
+def test_read_process_stats_reports_current_process():
+    stats = read_process_stats(os.getpid())
+    if stats is None:  # 非 Linux
+        return
+    assert 0 < stats["rss_mb"] <= stats["peak_rss_mb"]
+    assert stats["cpu_seconds"] > 0
@@ -0,0 +1,48 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from ..src.models.compiled_forest import CompiledForest
+
+
+def test_predictions_are_bitwise_identical():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(500, 6))
+    y = x[:, 0] * 3 + np.sin(x[:, 1]) + rng.normal(scale=0.1, size=500)
+    x[rng.random(x.shape) < 0.05] = np.nan  # 训练数据含缺失值时树会记录 missing_go_to_left
+    forest = RandomForestRegressor(n_estimators=15, max_depth=7, min_samples_leaf=2, random_state=42).fit(x, y)
+
+    compiled = CompiledForest.from_sklearn(forest)
+    x_test = rng.normal(size=(300, 6))
+    x_test[rng.random(x_test.shape) < 0.1] = np.nan
+
+    np.testing.assert_array_equal(compiled.predict(x_test), forest.predict(x_test))
+    np.testing.assert_array_equal(compiled.predict(x_test[:1]), forest.predict(x_test[:1]))
+    assert compiled.matches(forest)
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(300, 4))
+    forest = RandomForestRegressor(n_estimators=8, max_depth=5, random_state=0).fit(x, x[:, 0] - x[:, 2])
+    compiled = CompiledForest.from_sklearn(forest)
+
+    compiled.save(str(tmp_path / "forest"))
+    compiled.save(str(tmp_path / "forest"))  # 目录已存在（另一个进程先写完）时保留已有副本
+    loaded = CompiledForest.load(str(tmp_path / "forest"))
+
+    assert isinstance(loaded.threshold, np.memmap) and not loaded.threshold.flags.writeable
+    np.testing.assert_array_equal(loaded.predict(x), forest.predict(x))
+    assert [p.name for p in tmp_path.iterdir()] == ["forest"]
+
+
+def test_compact_forest_is_smaller_and_identical():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=(400, 5))
+    x[rng.random(x.shape) < 0.05] = np.nan
+    y = np.nan_to_num(x[:, 0]) * 2 - np.nan_to_num(x[:, 3])
+    forest = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0).fit(x, y)
+    compact = CompiledForest.from_sklearn(forest).compact()
+
+    assert compact.threshold.dtype == np.float32 and compact.feature.dtype == np.int32
+    np.testing.assert_array_equal(compact.predict(x), forest.predict(x))
+    assert compact.matches(forest)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import BaseModel
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from ..src.features.transformer import FeatureTransformer
+
+CATEGORIES = ['<1H OCEAN', 'INLAND', 'ISLAND', 'NEAR BAY', 'NEAR OCEAN']
+
+
+class House(BaseModel):
+    longitude: float
+    latitude: float
+    housing_median_age: float
+    total_rooms: float
+    total_bedrooms: float
+    population: float
+    households: float
+    median_income: float
+    ocean_proximity: str
+
+
+def pandas_features(houses, encoder, columns, scaler):
+    """原 predict_price 中的 pandas 实现，作为对照"""
+    df = pd.DataFrame([h.model_dump() for h in houses])
+    df['rooms_per_household'] = df['total_rooms'] / df['households']
+    df['bedrooms_per_room'] = df['total_bedrooms'] / df['total_rooms']
+    df['population_per_household'] = df['population'] / df['households']
+    numerical_cols = [col for col in df.columns if col != 'ocean_proximity']
+    encoded = encoder.transform(df[['ocean_proximity']])
+    encoded_df = pd.DataFrame(encoded, columns=encoder.get_feature_names_out(['ocean_proximity']), index=df.index)
+    x = pd.concat([df[numerical_cols], encoded_df], axis=1).reindex(columns=columns, fill_value=0)
+    return scaler.transform(x) if scaler is not None else x.to_numpy()
+
+
+@pytest.fixture
+def fitted():
+    rng = np.random.default_rng(1)
+    houses = [
+        House(longitude=rng.uniform(-124, -114), latitude=rng.uniform(32, 42),
+              housing_median_age=rng.uniform(1, 52), total_rooms=rng.uniform(100, 8000),
+              total_bedrooms=rng.uniform(20, 1500), population=rng.uniform(50, 5000),
+              households=rng.uniform(20, 1500), median_income=rng.uniform(0.5, 15),
+              ocean_proximity=str(rng.choice(CATEGORIES)))
+        for _ in range(50)
+    ]
+    encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    encoder.fit(pd.DataFrame({'ocean_proximity': CATEGORIES}))
+    columns = [
+        'longitude', 'latitude', 'housing_median_age', 'total_rooms', 'total_bedrooms',
+        'population', 'households', 'median_income',
+        'rooms_per_household', 'bedrooms_per_room', 'population_per_household',
+    ] + list(encoder.get_feature_names_out(['ocean_proximity']))
+    scaler = StandardScaler().fit(pandas_features(houses, encoder, columns, None))
+    return houses, encoder, columns, scaler
+
+
+@pytest.mark.parametrize("with_scaler", [False, True])
+def test_transform_matches_pandas(fitted, with_scaler):
+    houses, encoder, columns, scaler = fitted
+    scaler = scaler if with_scaler else None
+    transformer = FeatureTransformer(encoder, columns, scaler=scaler)
+    expected = pandas_features(houses, encoder, columns, scaler)
+
+    for house, row in zip(houses, expected):
+        np.testing.assert_array_equal(transformer.transform_one(house)[0], row)
+
+    x, valid_mask, errors = transformer.transform_batch(houses)
+    assert valid_mask.all() and not errors
+    np.testing.assert_array_equal(x, expected)
+
+
+def test_unknown_category_and_bad_rows(fitted):
+    houses, encoder, columns, _ = fitted
+    transformer = FeatureTransformer(encoder, columns)
+    unknown = houses[0].model_copy(update={"ocean_proximity": "MARS"})
+    np.testing.assert_array_equal(
+        transformer.transform_one(unknown)[0], pandas_features([unknown], encoder, columns, None)[0])
+
+    zero = houses[1].model_copy(update={"households": 0})
+    x, valid_mask, errors = transformer.transform_batch([houses[0], zero])
+    assert valid_mask.tolist() == [True, False]
+    assert x.shape == (1, len(columns)) and 1 in errors
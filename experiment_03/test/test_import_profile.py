@@ -0,0 +1,16 @@
+from ..src.scripts.import_profile import parse_importtime, profile_import, DEFAULT_FORBIDDEN
+
+
+def test_parse_importtime_skips_header():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   json.decoder\n"
+              "import time:      1500 |       1620 | json\n"
+              "some warning\n")
+    assert parse_importtime(stderr) == {"json.decoder": 0.12, "json": 1.5}
+
+
+def test_serving_app_imports_without_heavy_dependencies():
+    # 在干净的子进程中导入：不加载 mlflow / pandas 等，也不创建 MlflowClient
+    result = profile_import("src.app_fast")
+    assert not [name for name in DEFAULT_FORBIDDEN if name in result["modules"]]
+    assert result["total_ms"] > 0 and "fastapi" in result["packages"]
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from ..src.utils.exceptions import ServiceOverloadedError
+from ..src.utils.inference_executor import InferenceExecutor
+
+
+def test_rejects_when_queue_is_full():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, retry_after=3)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceOverloadedError) as exc_info:
+            await executor.run(release.wait)
+        assert exc_info.value.retry_after == 3
+        release.set()
+        await asyncio.gather(*running)
+        return await executor.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["in_flight"] == 0
+
+
+def test_cancelled_queued_request_keeps_its_slot_until_the_work_finishes():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=0)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        queued = loop.create_future()  # 代表仍在微批队列中的请求
+        waiter = asyncio.ensure_future(executor.run_queued(lambda: queued))
+        await asyncio.sleep(0)
+        waiter.cancel()  # 客户端断开
+        await asyncio.gather(waiter, return_exceptions=True)
+        held = executor.stats()["in_flight"]
+        queued.set_exception(ValueError("batch failed"))  # 无人读取，也不应产生警告
+        await asyncio.sleep(0)
+        return held
+
+    assert asyncio.run(scenario()) == 1
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_slot_is_released_after_close_and_tracked_work():
+    executor = InferenceExecutor(max_workers=1, max_queue_size=0)
+    release = threading.Event()
+    slot = executor.admit()
+    chunk = slot.track(executor.pool.submit(release.wait))
+    slot.close()
+    assert executor.stats()["in_flight"] == 1
+    release.set()
+    executor.pool.shutdown(wait=True)  # 等待 worker 线程执行完完成回调
+    assert chunk.done() and executor.stats()["in_flight"] == 0
@@ -0,0 +1,33 @@
+import pytest
+
+from ..src.utils.metrics import MetricsRegistry, _Metric
+
+
+def test_histogram_buckets_are_cumulative_and_labels_escaped():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    errors = registry.counter("errors_total", "Errors", ("path",))
+    registry.gauge("queue_depth", "Queue depth", fn=lambda: 3)
+
+    stage = latency.labels("infer")
+    for value in (0.05, 0.1, 0.5, 2.0):
+        stage.observe(value)
+    errors.labels('/a"b').inc()
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{stage="infer",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{stage="infer",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{stage="infer",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{stage="infer"} 4' in text
+    assert 'latency_seconds_sum{stage="infer"} 2.65' in text
+    assert 'errors_total{path="/a\\"b"} 1.0' in text
+    assert 'queue_depth 3' in text
+
+
+def test_metric_family_without_child_type_cannot_be_created():
+    class Untyped(_Metric):
+        TYPE = "untyped"
+
+    with pytest.raises(TypeError):
+        Untyped("untyped_metric", "No child type")
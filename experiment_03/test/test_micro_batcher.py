@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from ..src.utils.micro_batcher import MicroBatchError, MicroBatcher
+
+
+def test_concurrent_requests_are_batched():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [ValueError("bad") if item < 0 else item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_us=50_000)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+            with pytest.raises(ValueError):
+                await batcher.submit(-1)
+        finally:
+            await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [i * 2 for i in range(20)]
+    assert [len(c) for c in calls[:3]] == [8, 8, 4]
+    assert stats["items"] == 21 and stats["batches"] == 4
+    assert stats["flush_by_size"] == 2
+
+
+def test_batch_failure_and_stop_fail_each_request_with_its_own_error():
+    def batch_fn(items):
+        raise ValueError("model down")
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_us=10_000_000)
+        await batcher.start()
+        failed = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        waiting = asyncio.ensure_future(batcher.submit(3))  # 停在 10 秒的收集窗口中
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return failed, await asyncio.wait_for(asyncio.gather(waiting, return_exceptions=True), 1)
+
+    failed, (stopped,) = asyncio.run(scenario())
+    assert all(isinstance(e, MicroBatchError) and isinstance(e.__cause__, ValueError) for e in failed)
+    assert failed[0] is not failed[1] and failed[0].__cause__ is failed[1].__cause__
+    assert isinstance(stopped, MicroBatchError)
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from ..src.features.transformer import FeatureTransformer
+from ..src.models.model_bundle import MAGIC, ModelBundle, export_bundle
+
+HOUSES = [SimpleNamespace(**house) for house in (
+    {"longitude": -122.23, "latitude": 37.88, "housing_median_age": 41, "total_rooms": 880,
+     "total_bedrooms": 129, "population": 322, "households": 126, "median_income": 8.3252,
+     "ocean_proximity": "NEAR BAY"},
+    {"longitude": -118.5, "latitude": 34.2, "housing_median_age": 12, "total_rooms": 3000,
+     "total_bedrooms": 600, "population": 1500, "households": 500, "median_income": 3.1,
+     "ocean_proximity": "INLAND"},
+    {"longitude": -120.0, "latitude": 36.0, "housing_median_age": 5, "total_rooms": 1000,
+     "total_bedrooms": 200, "population": 400, "households": 150, "median_income": 5.0,
+     "ocean_proximity": "UNKNOWN"},  # 未知类别（handle_unknown="ignore"）one-hot 全为 0
+)]
+
+
+@pytest.fixture
+def bundle_path(serving_artifacts, tmp_path):
+    model, encoder, columns = serving_artifacts
+    scaler = StandardScaler().fit(np.random.default_rng(0).normal(size=(50, len(columns))))
+    bundle = ModelBundle.from_sklearn(model, encoder, None, columns, metadata={"run_id": "test"})
+    path = str(tmp_path / "model.bundle")
+    bundle.save(path)
+    return path, model, encoder, scaler, columns
+
+
+def test_round_trip_matches_sklearn(bundle_path):
+    path, model, encoder, _, columns = bundle_path
+    bundle = ModelBundle.load(path, verify=True)
+
+    assert isinstance(bundle.forest.threshold, np.memmap) and not bundle.forest.threshold.flags.writeable
+    assert bundle.columns == columns and bundle.metadata["run_id"] == "test"
+
+    x, valid, errors = bundle.transformer().transform_batch(HOUSES)
+    expected, expected_valid, expected_errors = FeatureTransformer(encoder, columns).transform_batch(HOUSES)
+    np.testing.assert_array_equal(x, expected)
+    np.testing.assert_array_equal(valid, expected_valid)
+    assert errors == expected_errors and valid.all()
+    np.testing.assert_array_equal(bundle.predict(x), model.predict(pd.DataFrame(expected, columns=columns)))
+
+
+def test_scaler_parameters_round_trip(bundle_path, tmp_path):
+    _, model, encoder, scaler, columns = bundle_path
+    path = str(tmp_path / "scaled.bundle")
+    ModelBundle.from_sklearn(model, encoder, scaler, columns).save(path)
+
+    loaded = ModelBundle.load(path, mmap=False)
+    np.testing.assert_array_equal(loaded.scaler.mean, scaler.mean_)
+    np.testing.assert_array_equal(loaded.scaler.scale, scaler.scale_)
+
+
+def test_rejects_foreign_or_corrupted_files(bundle_path, tmp_path):
+    path = bundle_path[0]
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"not a bundle at all")
+    with pytest.raises(ValueError):
+        ModelBundle.load(str(other))
+
+    data = bytearray(open(path, "rb").read())
+    assert data.startswith(MAGIC)
+    data[-1] ^= 0xFF
+    corrupted = tmp_path / "corrupted.bundle"
+    corrupted.write_bytes(bytes(data))
+    ModelBundle.load(str(corrupted))  # 默认不校验
+    with pytest.raises(ValueError):
+        ModelBundle.load(str(corrupted), verify=True)
+
+
+def test_bundle_records_sources_and_detects_retrained_model(serving_artifacts, tmp_path):
+    import joblib
+    model, encoder, columns = serving_artifacts
+    for name, obj in (("rf_model_n5_d4.pkl", model), ("ocean_encoder.pkl", encoder),
+                      ("scaler.pkl", None), ("feature_columns.pkl", columns)):
+        joblib.dump(obj, tmp_path / name)
+    model_path, output = str(tmp_path / "rf_model_n5_d4.pkl"), str(tmp_path / "model.bundle")
+    export_bundle(model_path, str(tmp_path), output)
+
+    bundle = ModelBundle.load(output)
+    assert set(bundle.metadata["sources"]) == {"model", "ocean_encoder.pkl", "scaler.pkl", "feature_columns.pkl"}
+    assert bundle.metadata["source_files"]["model"] == model_path  # 按导出时的路径检查，与文件名无关
+    assert bundle.stale_sources() == []
+
+    joblib.dump(model, model_path, compress=3)  # 模型文件内容变化（如重新训练）但未重新导出
+    assert bundle.stale_sources() == ["model"]
+    assert ModelBundle(bundle.forest, bundle.categories, None, columns).stale_sources() == ["model"]
@@ -0,0 +1,80 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from ..src.utils.model_router import ModelRouter
+from ..src.utils.mlflow_artifact_loader import SharedArtifactPool
+
+
+def test_choose_follows_weights_over_loaded_aliases():
+    router = ModelRouter({"production": 0.9, "canary": 0.1}, seed=0)
+    router.set("production", SimpleNamespace(version="1"))
+    # 金丝雀未加载时全部流量走主版本
+    assert {router.choose()[0] for _ in range(100)} == {"production"}
+
+    router.set("canary", SimpleNamespace(version="2"))
+    picks = [router.choose()[0] for _ in range(10000)]
+    assert 800 < picks.count("canary") < 1200
+    stats = router.stats()["routes"]
+    assert stats["canary"]["version"] == "2" and stats["canary"]["effective_share"] == 0.1
+
+
+
+def test_routed_counts_are_exact_under_concurrent_requests():
+    router = ModelRouter({"production": 0.5, "canary": 0.5}, seed=0)
+    router.set("production", SimpleNamespace(version="1"))
+    router.set("canary", SimpleNamespace(version="2"))
+    threads = [threading.Thread(target=lambda: [router.choose() for _ in range(5000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(route["routed"] for route in router.stats()["routes"].values()) == 40000
+
+def test_invalid_weights_rejected():
+    with pytest.raises(ValueError):
+        ModelRouter({"production": 0.0})
+    with pytest.raises(RuntimeError):
+        ModelRouter({"production": 1.0}).choose()
+
+
+def test_shadow_records_deltas_and_drops_when_backlogged():
+    router = ModelRouter({"production": 1.0}, shadow_alias="shadow", shadow_max_pending=1)
+    router.set("production", SimpleNamespace(version="1"))
+    assert router.submit_shadow(lambda state: None) is False  # 影子未加载
+
+    router.set("shadow", SimpleNamespace(version="2"))
+    release = threading.Event()
+
+    def score(state, primary):
+        release.wait(5)
+        router.record_shadow(primary, primary + 10.0, 0.002)
+
+    assert router.submit_shadow(score, 100.0) is True
+    assert router.submit_shadow(score, 100.0) is False  # 积压已满，丢弃
+    release.set()
+    router.shutdown(wait=True)
+
+    shadow = router.stats()["shadow"]
+    assert shadow["version"] == "2"
+    assert (shadow["scored"], shadow["dropped"], shadow["pending"]) == (1, 1, 0)
+    assert shadow["mean_abs_delta"] == 10.0 and shadow["avg_ms"] == 2.0
+
+
+def test_shared_artifact_pool_returns_one_object_per_content(tmp_path):
+    import joblib
+    from ..src.utils.mlflow_artifact_loader import MLflowArtifactLoader
+    pool = SharedArtifactPool()
+    for name in ("a.pkl", "b.pkl"):
+        joblib.dump({"columns": ["x", "y"]}, tmp_path / name)
+    joblib.dump({"columns": ["z"]}, tmp_path / "c.pkl")
+
+    a = MLflowArtifactLoader.load_joblib(str(tmp_path / "a.pkl"), shared=pool)
+    b = MLflowArtifactLoader.load_joblib(str(tmp_path / "b.pkl"), shared=pool)
+    c = MLflowArtifactLoader.load_joblib(str(tmp_path / "c.pkl"), shared=pool)
+    assert a is b and a is not c
+    assert pool.stats() == {"objects": 2, "hits": 1}
+
+    pool.prune([a])
+    assert pool.stats()["objects"] == 1
@@ -0,0 +1,43 @@
+import asyncio
+
+from ..src.utils.model_watcher import ModelWatcher
+
+
+def test_swaps_only_when_alias_moves_and_survives_failures():
+    registry = {"version": "1"}
+    served = {"state": "state-1"}
+    loads = []
+
+    def resolve():
+        if registry["version"] is None:
+            raise ConnectionError("tracking server down")
+        return registry["version"], f"run-{registry['version']}"
+
+    def load(version, run_id):
+        loads.append(version)
+        if version == "3":
+            raise RuntimeError("corrupt artifact")
+        return f"state-{version}"
+
+    watcher = ModelWatcher(
+        resolve, load,
+        on_swap=lambda new_state: served.update(state=new_state),
+        current_version_fn=lambda: served["state"].split("-")[1],
+        interval_seconds=3600
+    )
+
+    async def scenario():
+        assert await watcher.check() is False  # 别名未变化，不加载
+        registry["version"] = "2"
+        assert await watcher.check() is True
+        registry["version"] = None
+        assert await watcher.check() is False  # 解析失败，继续服务 v2
+        registry["version"] = "3"
+        assert await watcher.check() is False  # 加载失败，继续服务 v2
+
+    asyncio.run(scenario())
+    assert served["state"] == "state-2"
+    assert loads == ["2", "3"]
+    stats = watcher.stats()
+    assert stats["checks"] == 4 and stats["reloads"] == 1 and stats["failures"] == 2
+    assert stats["last_error"] == "corrupt artifact"
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from ..src.scripts.pipeline import CACHED, FAILED, RAN, SKIPPED, STALE, Stage, build_stages, run_pipeline
+
+# 读取 src.txt，追加一行后写入 dst.txt
+COPY = "import sys; open(sys.argv[2], 'w').write(open(sys.argv[1]).read() + 'x')"
+
+
+def copy_stage(name, src, dst, deps=(), params=None):
+    return Stage(name, ["-c", COPY, src, dst], deps=deps, inputs=[src], outputs=[dst], params=params)
+
+
+def statuses(results):
+    return {name: result["status"] for name, result in results.items()}
+
+
+def test_skips_unchanged_stages_and_reruns_downstream_of_changes(tmp_path):
+    (tmp_path / "raw.txt").write_text("a")
+    stages = [copy_stage("features", "raw.txt", "features.txt"),
+              copy_stage("model", "features.txt", "model.txt", deps=["features"])]
+
+    assert statuses(run_pipeline(stages, cwd=tmp_path)) == {"features": RAN, "model": RAN}
+    assert statuses(run_pipeline(stages, cwd=tmp_path)) == {"features": CACHED, "model": CACHED}
+
+    (tmp_path / "raw.txt").write_text("b")
+    assert statuses(run_pipeline(stages, cwd=tmp_path, dry_run=True)) == {"features": STALE, "model": STALE}
+    assert statuses(run_pipeline(stages, cwd=tmp_path)) == {"features": RAN, "model": RAN}
+    assert (tmp_path / "model.txt").read_text() == "bxx"
+
+    # 参数变化、输出被删除、强制运行
+    stages[1] = copy_stage("model", "features.txt", "model.txt", deps=["features"], params={"max_depth": 7})
+    assert statuses(run_pipeline(stages, cwd=tmp_path)) == {"features": CACHED, "model": RAN}
+    (tmp_path / "model.txt").unlink()
+    assert statuses(run_pipeline(stages, cwd=tmp_path)) == {"features": CACHED, "model": RAN}
+    assert statuses(run_pipeline(stages, cwd=tmp_path, force=["features"]))["features"] == RAN
+
+
+def test_independent_stages_run_in_parallel(tmp_path):
+    sleep = "import sys, time; time.sleep(0.5); open(sys.argv[1], 'w').write('ok')"
+    stages = [Stage(f"s{i}", ["-c", sleep, f"out{i}.txt"], outputs=[f"out{i}.txt"]) for i in range(3)]
+    start = time.perf_counter()
+    assert set(statuses(run_pipeline(stages, cwd=tmp_path, workers=3)).values()) == {RAN}
+    assert time.perf_counter() - start < 1.2
+
+
+def test_failure_skips_dependents_and_source_stages_keep_existing_outputs(tmp_path):
+    (tmp_path / "raw.txt").write_text("a")
+    stages = [Stage("data", ["-c", "raise SystemExit(1)"], outputs=["raw.txt"]),
+              Stage("broken", ["-c", "raise SystemExit(3)"], deps=["data"], inputs=["raw.txt"], outputs=["b.txt"]),
+              copy_stage("after", "b.txt", "c.txt", deps=["broken"])]
+    results = statuses(run_pipeline(stages, cwd=tmp_path))
+    # data 没有输入，raw.txt 已存在时视为数据源，不会重新获取
+    assert results == {"data": CACHED, "broken": FAILED, "after": SKIPPED}
+
+    with pytest.raises(ValueError):
+        run_pipeline([Stage("a", ["-c", ""], deps=["b"]), Stage("b", ["-c", ""], deps=["a"])], cwd=tmp_path)
+
+
+def test_project_stages():
+    stages = {stage.name: stage for stage in build_stages([100, 150], [5], dtype="float32")}
+    assert set(stages) == {"data", "features", "model[n100_d5]", "model[n150_d5]",
+                           "evaluate[n100_d5]", "evaluate[n150_d5]", "bundle"}
+    assert stages["bundle"].deps == ["model[n100_d5]"]
+    assert "--dtype" in stages["features"].command and stages["features"].params == {"dtype": "float32"}
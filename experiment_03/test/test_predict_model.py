@@ -0,0 +1,40 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from ..src.models.predict_model import score_file, BatchScorer, INPUT_COLUMNS
+
+
+def test_score_file_keeps_order_across_workers(serving_artifacts, tmp_path):
+    model, encoder, columns = serving_artifacts
+    joblib.dump(model, tmp_path / "rf_model.pkl")
+    joblib.dump(encoder, tmp_path / "ocean_encoder.pkl")
+    joblib.dump(None, tmp_path / "scaler.pkl")  # 测试模型未做标准化
+    joblib.dump(columns, tmp_path / "feature_columns.pkl")
+
+    rng = np.random.default_rng(1)
+    n = 257
+    df = pd.DataFrame({col: rng.uniform(1, 1000, n) for col in INPUT_COLUMNS[:-1]})
+    df["ocean_proximity"] = rng.choice(["INLAND", "NEAR BAY", "UNKNOWN"], n)
+    df["id"] = np.arange(n)
+    df.loc[3, "households"] = 0  # 除零 -> 无效行
+    df.loc[4, "total_bedrooms"] = np.nan  # 缺失值与训练时一样交给模型
+    df.loc[5, "ocean_proximity"] = np.nan  # 缺少类别 -> 无效行（不按未知类别打分）
+    df.to_csv(tmp_path / "in.csv", index=False)
+
+    common = dict(model_path=str(tmp_path / "rf_model.pkl"), artifacts_dir=str(tmp_path), chunk_size=50)
+    stats = score_file(str(tmp_path / "in.csv"), str(tmp_path / "out.parquet"), workers=2, **common)
+    score_file(str(tmp_path / "in.csv"), str(tmp_path / "out.csv"), workers=0, engine="sklearn", **common)
+
+    pooled = pd.read_parquet(tmp_path / "out.parquet")
+    inline = pd.read_csv(tmp_path / "out.csv")
+    assert stats["rows"] == n and stats["failed"] == 2 and stats["missing_category"] == 1
+    assert pooled["id"].tolist() == list(range(n))
+    assert np.allclose(pooled["predicted_price"], inline["predicted_price"], equal_nan=True)
+    assert np.isnan(pooled.loc[3, "predicted_price"]) and pooled.loc[3, "error"]
+    assert np.isfinite(pooled.loc[4, "predicted_price"])
+    assert np.isnan(pooled.loc[5, "predicted_price"]) and pooled.loc[5, "error"] == "缺少 ocean_proximity"
+
+    scorer = BatchScorer(model, encoder, None, columns, engine="sklearn")
+    expected, _ = scorer.score(df[INPUT_COLUMNS[:-1]].to_numpy(), df["ocean_proximity"].tolist())
+    assert np.array_equal(pooled["predicted_price"].to_numpy(), expected.round(2), equal_nan=True)
@@ -0,0 +1,30 @@
+import time
+
+from ..src.utils.prediction_cache import PredictionCache
+
+HOUSE = {"longitude": -122.23, "latitude": 37.88, "ocean_proximity": "<1H OCEAN"}
+
+
+def test_key_is_canonical_and_versioned():
+    reordered = dict(reversed(list(HOUSE.items())))
+    assert PredictionCache.make_key(HOUSE, "1") == PredictionCache.make_key(reordered, "1")
+    assert PredictionCache.make_key(HOUSE, "1") != PredictionCache.make_key(HOUSE, "2")
+
+
+def test_lru_ttl_and_version_invalidation():
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.bind_version("1")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1      # a 变为最近使用
+    cache.put("c", 3)               # 淘汰最久未使用的 b
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.bind_version("2")
+    assert cache.get("a") is None and cache.stats()["invalidations"] == 1
+
+    cache.ttl_seconds = 0.01
+    cache.put("d", 4)
+    time.sleep(0.02)
+    assert cache.get("d") is None and cache.stats()["expirations"] == 1
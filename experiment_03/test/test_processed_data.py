@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..src.data.processed_data import load_processed, load_target, read_metadata, save_processed
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(100, 4)), columns=["a", "b", "ocean_proximity_<1H OCEAN", "d"])
+    y = pd.DataFrame({"median_house_value": rng.uniform(1e4, 5e5, 100)})
+    return {"x_train": x, "y_train": y}
+
+
+def test_round_trip_is_exact(frames, tmp_path):
+    save_processed(frames, str(tmp_path))
+    pd.testing.assert_frame_equal(load_processed("x_train", str(tmp_path)), frames["x_train"])
+    np.testing.assert_array_equal(load_target("y_train", str(tmp_path)), frames["y_train"].iloc[:, 0].to_numpy())
+
+
+def test_float32_features_keep_float64_targets(frames, tmp_path):
+    save_processed(frames, str(tmp_path), dtype="float32", metadata={"source": "test"})
+    x = load_processed("x_train", str(tmp_path))
+    assert set(x.dtypes) == {np.dtype("float32")}
+    assert load_target("y_train", str(tmp_path)).dtype == np.float64
+
+    metadata = read_metadata("x_train", str(tmp_path))
+    assert metadata["dtype"] == "float32" and metadata["rows"] == 100 and metadata["source"] == "test"
+    assert metadata["columns"] == frames["x_train"].columns.tolist()
+    assert read_metadata("y_train", str(tmp_path))["dtype"] == "float64"
+
+
+def test_column_selective_read(frames, tmp_path):
+    save_processed(frames, str(tmp_path))
+    x = load_processed("x_train", str(tmp_path), columns=["d", "a"])
+    assert x.columns.tolist() == ["d", "a"]
+    np.testing.assert_array_equal(x["d"], frames["x_train"]["d"])
+
+
+def test_falls_back_to_csv(frames, tmp_path):
+    frames["x_train"].to_csv(tmp_path / "x_train.csv", index=False)
+    pd.testing.assert_frame_equal(load_processed("x_train", str(tmp_path), columns=["b"]), frames["x_train"][["b"]])
+    with pytest.raises(FileNotFoundError):
+        load_processed("x_test", str(tmp_path))
+    with pytest.raises(ValueError):
+        save_processed(frames, str(tmp_path), dtype="float16")
@@ -0,0 +1,38 @@
+import time
+
+from ..src.config.settings import settings
+from ..src.utils import security
+from ..src.utils.security import JWTManager
+
+
+def test_verified_tokens_are_cached(monkeypatch):
+    calls = []
+    real_decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    JWTManager.invalidate_token_cache()
+    token = JWTManager.create_access_token({"sub": "svc"})
+
+    for _ in range(5):
+        assert JWTManager.decode_token(token)["sub"] == "svc"
+    assert len(calls) == 1
+
+    # 密钥轮换后缓存自动失效，旧令牌不再有效
+    monkeypatch.setattr(settings, "JWT_SECRET_KEY", "rotated-secret")
+    assert JWTManager.decode_token(token) is None
+
+
+def test_cache_entry_expires_with_token():
+    cache = security.VerifiedTokenCache(max_size=2, ttl_seconds=300)
+    cache.put(b"expired", {"sub": "svc", "exp": time.time() - 1})
+    cache.put(b"valid", {"sub": "svc", "exp": time.time() + 60})
+    assert cache.get(b"expired") is None
+    assert cache.get(b"valid") is not None
+
+    cache.put(b"a", {"sub": "a"})
+    cache.put(b"b", {"sub": "b"})
+    assert cache.get(b"valid") is None and cache.stats()["evictions"] == 1
@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from ..src.utils.streaming import iter_ndjson_chunks
+
+
+def collect(parts, chunk_size=2, max_line_bytes=64):
+    async def byte_stream():
+        for part in parts:
+            yield part
+
+    async def run():
+        return [chunk async for chunk in iter_ndjson_chunks(byte_stream(), chunk_size, max_line_bytes)]
+
+    return asyncio.run(run())
+
+
+def test_lines_split_across_reads_are_reassembled():
+    chunks = collect([b'{"a":', b' 1}\n\n{"a": 2}\n{"a"', b': 3}\n{"a": 4}'])
+    assert chunks == [[b'{"a": 1}', b'{"a": 2}'], [b'{"a": 3}', b'{"a": 4}']]
+
+
+def test_oversized_line_is_rejected():
+    with pytest.raises(ValueError):
+        collect([b"x" * 40, b"x" * 40])
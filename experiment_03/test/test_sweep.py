@@ -0,0 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..src.scripts import sweep
+from ..src.scripts.sweep import SharedArrays, plan, rank
+
+
+def _read_shared(handle):
+    shm, arrays = SharedArrays.attach(handle)
+    try:
+        x = arrays["x"]
+        return float(x.sum()), x.flags.writeable, arrays["y"].tolist()
+    finally:
+        del x, arrays
+        shm.close()
+
+
+def test_shared_arrays_are_read_only_views_in_workers():
+    x = np.arange(12, dtype=np.float32).reshape(3, 4)
+    shared = SharedArrays({"x": x, "y": np.array([1.5, 2.5])})
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            total, writeable, y = pool.submit(_read_shared, shared.handle).result()
+    finally:
+        shared.close()
+    assert total == float(x.sum()) and not writeable and y == [1.5, 2.5]
+
+
+def test_cpu_budget_plan():
+    assert plan(9, cpus=4) == (4, 1)
+    assert plan(2, cpus=8) == (2, 4)
+    assert plan(3, cpus=1) == (1, 1)
+
+
+def test_summary_table_sorted_by_rmse(tmp_path):
+    rows = [{"n_estimators": 100, "max_depth": 5, "error": "boom", "seconds": 0.1},
+            {"n_estimators": 100, "max_depth": 7, "rmse": 1.0, "mae": 1.0, "r2": 0.9, "train_seconds": 1, "seconds": 1},
+            {"n_estimators": 150, "max_depth": 7, "rmse": 0.5, "mae": 0.4, "r2": 0.95, "train_seconds": 1, "seconds": 1}]
+    path = sweep.write_table(rank(rows), str(tmp_path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0].startswith("n_estimators,max_depth,rmse")
+    assert lines[1].startswith("150,7,0.5") and lines[3].endswith("boom")
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from ..src.models.train_model import (
+    build_params, candidate_grid, grow_forest, rung_schedule, serving_signature, successive_halving
+)
+
+
+def test_warm_start_snapshots_match_forests_trained_from_scratch():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(300, 5))
+    y = x[:, 0] * 2 + np.sin(x[:, 1]) + rng.normal(scale=0.1, size=300)
+
+    snapshots = dict(grow_forest([12, 5, 8], max_depth=4, x_train=x, y_train=y))
+    assert list(snapshots) == [5, 8, 12]
+    for n_estimators, model in snapshots.items():
+        scratch = RandomForestRegressor(**build_params(n_estimators, 4)).fit(x, y)
+        assert len(model.estimators_) == n_estimators and not model.warm_start
+        np.testing.assert_array_equal(model.predict(x), scratch.predict(x))
+
+
+def test_rung_schedule_grows_resources_up_to_full_data():
+    schedule = rung_schedule(60, n_samples=13000, max_n_estimators=150, eta=3)
+    assert schedule == [(481, 6), (1444, 17), (4333, 50), (13000, 150)]
+    assert rung_schedule(1, n_samples=500, max_n_estimators=20) == [(500, 20)]
+
+
+def test_successive_halving_promotes_top_fraction_and_respects_budget():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(600, 4))
+    y = x[:, 0] * 3 + rng.normal(scale=0.1, size=600)
+    candidates = candidate_grid({"max_depth": [1, 2, 6], "max_features": [1.0, 0.25, 0.5]})
+    rungs = []
+
+    result = successive_halving(candidates, x[:500], y[:500], x[500:], y[500:], max_n_estimators=9,
+                                min_samples=50, min_n_estimators=1, on_rung=lambda rung, rows: rungs.append(rows))
+    assert [len(rows) for rows in rungs] == [9, 3, 1]
+    assert [rows[0]["n_samples"] for rows in rungs] == [55, 166, 500]
+    for rows, following in zip(rungs, rungs[1:]):
+        promoted = {row["candidate"] for row in rows if row["promoted"]}
+        assert promoted == {row["candidate"] for row in following}
+        assert max(row["val_rmse"] for row in rows if row["promoted"]) <= \
+            min(row["val_rmse"] for row in rows if not row["promoted"])
+    assert result["best"]["max_depth"] == 6 and not result["budget_exhausted"]
+
+    limited = successive_halving(candidates, x[:500], y[:500], x[500:], y[500:], max_n_estimators=9,
+                                 budget_cpu_seconds=1e-9, min_samples=50, min_n_estimators=1)
+    assert limited["budget_exhausted"] and len(limited["history"]) == 1
+    assert limited["best"] == candidates[0] and not limited["history"][0]["promoted"]
+
+
+def test_signature_of_float32_trained_model_accepts_float64_serving_frames():
+    from mlflow.models.utils import _enforce_schema
+
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(100, 3)), columns=["a", "b", "c"]).astype("float32")
+    model = RandomForestRegressor(n_estimators=3, random_state=0).fit(x, rng.normal(size=100))
+
+    signature, example = serving_signature(model, x)
+    served = pd.DataFrame(rng.normal(size=(2, 3)), columns=["a", "b", "c"])  # 与 app_fast 的 to_frame 相同：float64
+    assert (example.dtypes == "float64").all()
+    assert (_enforce_schema(served, signature.inputs).dtypes == "float64").all()
+
+
+def test_candidates_without_max_depth_use_the_base_max_depth():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(300, 3))
+    y = x[:, 0] + rng.normal(scale=0.1, size=300)
+    result = successive_halving(candidate_grid({"min_samples_leaf": [1, 8]}), x[:250], y[:250], x[250:], y[250:],
+                                max_n_estimators=4, min_samples=50, min_n_estimators=1, max_depth=3)
+    assert result["best"]["max_depth"] == 3
+    assert all(row["max_depth"] == 3 for row in result["history"])
+
+
+def test_final_rung_is_clamped_to_the_remaining_budget(monkeypatch):
+    from ..src.models import train_model
+
+    clock = [0.0]
+
+    class CountingForest(RandomForestRegressor):
+        """CPU 时间按 样本数 × 树的数量 计，使预算判断可复现"""
+        def fit(self, x, y, sample_weight=None):
+            clock[0] += len(x) * self.n_estimators
+            return super().fit(x, y, sample_weight)
+
+    monkeypatch.setattr(train_model, "RandomForestRegressor", CountingForest)
+    monkeypatch.setattr(train_model.time, "process_time", lambda: clock[0])
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=(600, 3))
+    y = x[:, 0] + rng.normal(scale=0.1, size=600)
+    candidates = candidate_grid({"min_samples_leaf": [1, 2, 3, 4, 5], "max_features": [1.0, 0.5]})
+
+    # 10 组候选：55行/1棵 × 10 -> 166行/3棵 × 4 -> 500行/9棵 × 2；预算只够最后一级训练 1 组
+    budget = 10 * 55 + 4 * 166 * 3 + 500 * 9 + 100
+    result = successive_halving(candidates, x[:500], y[:500], x[500:], y[500:], max_n_estimators=9,
+                                budget_cpu_seconds=budget, min_samples=50, min_n_estimators=1)
+    assert [row["rung"] for row in result["history"]].count(2) == 1
+    assert result["budget_exhausted"] and result["cpu_seconds"] <= budget